@@ -0,0 +1,416 @@
+"""
+benchmarks.py
+Performance benchmarks for the game engine.
+
+Each benchmark runs offline against the local source tree and returns plain data,
+so results can be written to JSON and compared between runs.  Engine benchmarks are
+parametrized over board sizes and object counts; `--quick` runs a smaller grid.
+
+`python ./src/benchmarks.py --output before.json`
+`python ./src/benchmarks.py --output after.json --compare before.json`
+"""
+# Python standard library
+import argparse
+import copy
+import itertools
+import json
+import logging
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+# Local modules
+from enums import Directions
+from objects import Game, GameBoard, Location, Ship, ShipTemplate
+from pathfinding import PathFinder
+from scheduler import NPCScheduler
+import utils
+
+SOURCE_DIRECTORY = Path(__file__).parent
+
+# (board side length, number of objects on the board)
+BOARD_GRID = ((10, 50), (100, 1_000), (1_000, 10_000), (10_000, 10_000))
+QUICK_BOARD_GRID = ((10, 50), (100, 1_000))
+SCAN_RADII = (2, 10, 100)
+# (NPC ships, fraction of them that act) for the NPC turn benchmark
+NPC_GRID = ((1_000, 1.0), (100_000, 0.0), (100_000, 0.01), (100_000, 1.0))
+QUICK_NPC_GRID = ((1_000, 1.0), (10_000, 0.01))
+# (board size, hazardous locations) for the pathfinding benchmark
+PATH_GRID = ((50, 250), (200, 2_000))
+QUICK_PATH_GRID = ((50, 250),)
+# A result this much slower than the baseline is reported as a regression.
+REGRESSION_THRESHOLD = 0.20
+
+STARTUP_MODULES = ("play_game", "objects", "validate_schema")
+
+_IMPORT_TIMER = (
+    "import time; start = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def time_cold_import(module: str, repeat: int = 10) -> dict:
+    """
+    Time importing `module` in a fresh interpreter, `repeat` times.
+    Every run is a new process, so nothing is cached in memory between runs
+    (compiled bytecode and the resource bundle on disk are, as they would be in production).
+    """
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _IMPORT_TIMER.format(module=module)],
+            cwd=SOURCE_DIRECTORY,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        samples.append(float(result.stdout.strip()))
+
+    return {
+        "module": module,
+        "repeat": repeat,
+        "median_ms": 1000 * statistics.median(samples),
+        "min_ms": 1000 * min(samples),
+        "max_ms": 1000 * max(samples),
+    }
+
+
+def bench_startup(modules: Iterable[str] = STARTUP_MODULES, repeat: int = 10) -> list:
+    """
+    Cold-import time of the game's entry points.
+    """
+    return [time_cold_import(module, repeat) for module in modules]
+
+
+class DictShip(object):
+    """
+    The Ship layout before slots and shared templates: a per-instance __dict__ holding every
+    configuration field and a logger lookup per ship. Kept only as the baseline for bench_memory.
+    """
+
+    def __init__(self, config: dict):
+        self.hit_points = config["hit_points"]
+        self.allowed_actions = config["actions"]
+        self.scan_radius = config["scan_radius"]
+        self.movement_speed = config["movement_speed"]
+        self.alliances = config["alliances"]
+        self.nicknames = config["nicknames"]
+        self.coordinates = (0, 0)
+        self.phrase_key = config["phrase_key"]
+        self.name = config["name"]
+        self.formal_name = config["formal_name"]
+        self.logger = logging.getLogger(f"Ship - {self.formal_name}")
+
+
+def _bytes_per_object(factory, count: int) -> float:
+    factory()  # warm up anything created once per type, such as templates and loggers
+    tracemalloc.start()
+    try:
+        objects = [factory() for _ in range(count)]
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del objects
+    return allocated / count
+
+
+def bench_memory(count: int = 100_000, ship_type: str = "enemy_capital") -> dict:
+    """
+    Memory per ship for a fleet of `count` ships of one type, current layout versus the old one.
+    """
+    config = utils.get_bundle().resources["ships"][ship_type]
+    plain_config = {key: list(v) if isinstance(v, tuple) else v for key, v in config.items()}
+    template = ShipTemplate.from_config(config)
+
+    dict_ship = _bytes_per_object(lambda: DictShip(plain_config), count)
+    slotted_ship = _bytes_per_object(lambda: Ship.from_template(template), count)
+    return {
+        "ships": count,
+        "python": sys.version.split()[0],
+        "dict_ship_bytes": dict_ship,
+        "slotted_ship_bytes": slotted_ship,
+        "reduction": dict_ship / slotted_ship,
+    }
+
+
+def time_per_call(function: Callable[[], object], number: int, repeat: int = 5) -> dict:
+    """
+    Call `function` `number` times per round for `repeat` rounds. Reports microseconds per call.
+    """
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        rounds.append((time.perf_counter() - start) / number)
+    return {"median_us": 1e6 * statistics.median(rounds), "min_us": 1e6 * min(rounds)}
+
+
+def _case(name: str, timing: dict, **params) -> dict:
+    return dict(case=name, params=params, **timing)
+
+
+def populated_board(size: int, n_objects: int, seed: int = 0) -> GameBoard:
+    """
+    Square board of `size` x `size` with `n_objects` ships and locations in random squares.
+    """
+    random.seed(seed)
+    board = GameBoard(size, size)
+    board.output = lambda output: None
+    objects = [
+        Ship(formal_name=f"ship {i}", phrase_key="enemy_capital", scan_radius=2, movement_speed=2)
+        if i % 2
+        else Location(formal_name=f"location {i}", phrase_key="severe_hazard")
+        for i in range(min(n_objects, board.total_squares))
+    ]
+    board.place_many(objects)
+    return board
+
+
+def _time_add(add: Callable, board_size: int, new_objects: list, repeat: int = 5) -> dict:
+    rounds = []
+    for _ in range(repeat):
+        board = GameBoard(board_size, board_size)
+        start = time.perf_counter()
+        for object_ in new_objects:
+            add(board, object_)
+        rounds.append((time.perf_counter() - start) / len(new_objects))
+    return {"median_us": 1e6 * statistics.median(rounds), "min_us": 1e6 * min(rounds)}
+
+
+def bench_board(grid: Iterable[tuple] = BOARD_GRID) -> list:
+    """
+    GameBoard placement, movement and validation on boards of increasing size and density.
+    """
+    results = []
+    for size, n_objects in grid:
+        params = {"board_size": size, "objects": n_objects}
+        board = populated_board(size, n_objects)
+        ships = [
+            obj for square in board.occupied_squares.values() for obj in square if isinstance(obj, Ship)
+        ]
+
+        timing = time_per_call(board.get_random_unoccupied_square, 1000)
+        results.append(_case("get_random_unoccupied_square", timing, **params))
+
+        targets = [(random.randint(0, size), random.randint(0, size)) for _ in range(997)]
+        moves = zip(itertools.cycle(ships), itertools.cycle(targets))
+        timing = time_per_call(lambda: board.move_object(*next(moves)), 1000)
+        results.append(_case("move_object", timing, **params))
+
+        movements = itertools.cycle(
+            [
+                (
+                    (random.randint(0, size), random.randint(0, size)),
+                    (random.choice(list(Directions)), random.randint(0, 5)),
+                )
+                for _ in range(997)
+            ]
+        )
+        timing = time_per_call(
+            lambda: board.calculate_updated_location_and_validate(*next(movements)), 1000
+        )
+        results.append(_case("calculate_updated_location_and_validate", timing, **params))
+
+        count = min(1000, n_objects)
+        timing = _time_add(GameBoard.add_ship_to_board, size, [Ship() for _ in range(count)])
+        results.append(_case("add_ship_to_board", timing, **params))
+        timing = _time_add(GameBoard.add_location_to_board, size, [Location() for _ in range(count)])
+        results.append(_case("add_location_to_board", timing, **params))
+
+    return results
+
+
+def bench_scan(grid: Iterable[tuple] = BOARD_GRID, radii: Iterable[int] = SCAN_RADII) -> list:
+    """
+    Ship.scan for growing scan radii on boards of increasing size and density.
+    """
+    results = []
+    for size, n_objects in grid:
+        board = populated_board(size, n_objects)
+        scanner = Ship(formal_name="scanner", phrase_key="player")
+        board.add_ship_to_board(scanner)
+        for radius in radii:
+            scanner.scan_radius = radius
+            timing = time_per_call(lambda: scanner.scan(board), 100)
+            results.append(_case("scan", timing, board_size=size, objects=n_objects, radius=radius))
+    return results
+
+
+PARSE_INPUTS = (
+    "scan",
+    "engage the FTL jump drive and get us out of here",
+    "launch vipers",
+    "what is our status",
+    "initiate self destruct",
+)
+
+
+def bench_parse() -> list:
+    """
+    utils.check_for_action over a mix of short, long, matching and unmatched commands.
+    """
+    utils.check_for_action("warm up")
+    results = []
+    for input_string in PARSE_INPUTS:
+        timing = time_per_call(lambda: utils.check_for_action(input_string), 10_000)
+        results.append(_case("check_for_action", timing, input=input_string))
+    return results
+
+
+def bench_game_init(grid: Iterable[tuple] = BOARD_GRID) -> list:
+    """
+    Game.__init__ for the default scenario and for bigger boards with large enemy fleets.
+    """
+    timing = time_per_call(lambda: Game(utils.CONFIG), 100)
+    results = [_case("Game.__init__", timing, board_size="default", objects="default")]
+    for size, n_objects in grid:
+        config = copy.deepcopy(utils.CONFIG)
+        config["game_board"]["x_len"] = config["game_board"]["y_len"] = size
+        config["start_conditions"]["ships"]["enemy_capital"] = n_objects // 2
+        timing = time_per_call(lambda: Game(config), 3, repeat=3)
+        results.append(_case("Game.__init__", timing, board_size=size, objects=n_objects))
+    return results
+
+
+def bench_npc_turn(grid: Iterable[tuple] = NPC_GRID, interval: int = 8) -> list:
+    """
+    NPCScheduler.run_turn with many NPC ships, only some of which ever act.
+    Active ships act every 1 to `interval` turns; the cost should follow the ships that act.
+    """
+    results = []
+    for n_ships, active in grid:
+        size = int((4 * n_ships) ** 0.5)
+        board = populated_board(size, 2 * n_ships)
+        ships = [
+            obj for square in board.occupied_squares.values() for obj in square if isinstance(obj, Ship)
+        ]
+        npcs = NPCScheduler(board, 1, interval)
+        for ship in ships[: int(active * len(ships))]:
+            npcs.add(ship)
+
+        def turn() -> None:
+            board.turn += 1
+            npcs.run_turn()
+
+        timing = time_per_call(turn, 50, repeat=3)
+        results.append(_case("NPCScheduler.run_turn", timing, ships=len(ships), active=active))
+    return results
+
+
+def bench_pathfinding(grid: Iterable[tuple] = PATH_GRID, speed: int = 2) -> list:
+    """
+    A* across the board, building a distance field, and repairing it when a hazard moves.
+    """
+    results = []
+    for size, n_hazards in grid:
+        params = {"board_size": size, "hazards": n_hazards}
+        board = GameBoard(size, size, rng=random.Random(0))
+        board.place_many([Location(danger=0.67) for _ in range(n_hazards)])
+        finder = PathFinder(board)
+        corner, target = (0, 0), (size - 1, size - 1)
+
+        timing = time_per_call(lambda: finder.find_path(corner, target, speed), 5, repeat=3)
+        results.append(_case("PathFinder.find_path", timing, **params))
+        timing = time_per_call(lambda: PathFinder(board).field(target, speed), 1, repeat=3)
+        results.append(_case("PathFinder.field", timing, **params))
+
+        field = finder.field(target, speed)
+        hazard = Location(danger=1.0)
+        board.add_location_to_board(hazard, board.get_random_unoccupied_square())
+        squares = itertools.cycle([board.get_random_unoccupied_square() for _ in range(97)])
+
+        def repair() -> None:
+            board.move_object(hazard, next(squares))
+            field.cost(corner)
+
+        timing = time_per_call(repair, 20, repeat=3)
+        results.append(_case("DistanceField repair", timing, **params))
+    return results
+
+
+BENCHMARKS = {
+    "startup": bench_startup,
+    "memory": bench_memory,
+    "board": bench_board,
+    "scan": bench_scan,
+    "parse": bench_parse,
+    "game_init": bench_game_init,
+    "npc_turn": bench_npc_turn,
+    "pathfinding": bench_pathfinding,
+}
+QUICK_ARGUMENTS = {
+    "startup": {"repeat": 3},
+    "memory": {"count": 10_000},
+    "board": {"grid": QUICK_BOARD_GRID},
+    "scan": {"grid": QUICK_BOARD_GRID},
+    "game_init": {"grid": QUICK_BOARD_GRID},
+    "npc_turn": {"grid": QUICK_NPC_GRID},
+    "pathfinding": {"grid": QUICK_PATH_GRID},
+}
+
+
+def run(names: Iterable[str], output: Optional[Path] = None, quick: bool = False) -> dict:
+    results = {}
+    for name in names:
+        kwargs = QUICK_ARGUMENTS.get(name, {}) if quick else {}
+        results[name] = BENCHMARKS[name](**kwargs)
+    if output is not None:
+        output.write_text(json.dumps(results, indent=2))
+    return results
+
+
+def _case_key(case: dict) -> str:
+    return json.dumps([case.get("case", case.get("module")), case.get("params")], sort_keys=True)
+
+
+def compare(results: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """
+    Compare timed cases against a baseline run. Returns one line per case, flagging regressions.
+    """
+    lines = []
+    for name, cases in results.items():
+        if not isinstance(cases, list) or not isinstance(baseline.get(name), list):
+            continue
+        previous = {_case_key(case): case for case in baseline[name]}
+        for case in cases:
+            old = previous.get(_case_key(case))
+            metric = "median_us" if "median_us" in case else "median_ms"
+            if old is None or not old.get(metric):
+                continue
+            ratio = case[metric] / old[metric]
+            flag = "REGRESSION" if ratio > 1 + threshold else "ok"
+            lines.append(
+                f"{flag:10} {name:10} {_case_key(case)} "
+                f"{old[metric]:.2f} -> {case[metric]:.2f} ({ratio:.2f}x)"
+            )
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run engine benchmarks.")
+    parser.add_argument(
+        "benchmarks", nargs="*", help=f"benchmarks to run, default all of: {', '.join(BENCHMARKS)}"
+    )
+    parser.add_argument("--output", type=Path, default=None, help="write results to this JSON file")
+    parser.add_argument("--compare", type=Path, default=None, help="baseline JSON file to compare against")
+    parser.add_argument("--quick", action="store_true", help="smaller boards and fewer repeats")
+    args = parser.parse_args()
+
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = run(args.benchmarks or list(BENCHMARKS), args.output, args.quick)
+    if args.compare is None:
+        print(json.dumps(results, indent=2))
+    else:
+        comparison = compare(results, json.loads(args.compare.read_text()))
+        print("\n".join(comparison))
+        if any(line.startswith("REGRESSION") for line in comparison):
+            sys.exit(1)
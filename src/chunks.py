@@ -0,0 +1,267 @@
+"""
+chunks.py
+Lazily generated sectors for open-ended boards.
+
+In chunked mode the board is split into square sectors of `chunk_size` squares a side, and
+nothing is generated up front.  A sector's locations are created the first time a ship moves
+into it or scans it, from a generator seeded with the game seed and the sector's position, so a
+sector always comes out the same and the game's own random generator is never touched.  The board
+itself stores no per-square state, so it can be made as large as you like.
+
+At most `max_chunks` sectors stay loaded; past that the least recently used are evicted, which
+takes their locations off the board.  A sector that is still exactly as it was generated is
+simply generated again the next time it is needed.  One whose locations have changed is saved,
+to a file in `chunk_dir` if there is one and in memory otherwise, and loaded back instead.
+A sector where a ship shares a square with one of its locations is never evicted.
+
+A chunk directory belongs to one game: snapshots record which sectors are loaded and the
+sectors saved in memory, but not the files.
+"""
+# Python standard library
+import pickle
+import random
+from collections import OrderedDict
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+# Side of a sector in squares. 0 keeps the whole board in memory, generated up front.
+DEFAULT_CHUNK_SIZE = 0
+# Sectors kept loaded, least recently used evicted first.
+DEFAULT_MAX_CHUNKS = 256
+
+# (template, square, hit_points, danger) of one location in a sector
+LocationSpec = Tuple[Any, tuple, int, float]
+ChunkKey = Tuple[int, int]
+
+
+def _spec_order(spec: LocationSpec) -> tuple:
+    return spec[1], spec[0].name
+
+
+class ChunkManager(object):
+    """
+    Loads and evicts the sectors of one board as its ships move around.
+    `contents` is (location template, expected locations per square) for every kind of location
+    sectors are filled with; `location_type` builds a location from a template.
+    """
+
+    def __init__(
+        self,
+        board,
+        chunk_size: int,
+        seed: int,
+        contents: Sequence[Tuple[Any, float]],
+        location_type: type,
+        max_chunks: int = DEFAULT_MAX_CHUNKS,
+        chunk_dir: Optional[Union[str, Path]] = None,
+    ):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1.")
+        self.board = board
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.contents = list(contents)
+        self.location_type = location_type
+        self.max_chunks = max(int(max_chunks), 1)
+        self.chunk_dir = Path(chunk_dir) if chunk_dir else None
+        if self.chunk_dir is not None:
+            self.chunk_dir.mkdir(parents=True, exist_ok=True)
+        # loaded sectors, least recently used first
+        self._loaded: "OrderedDict[ChunkKey, None]" = OrderedDict()
+        # evicted sectors that changed, when there is no chunk_dir
+        self._saved: Dict[ChunkKey, List[LocationSpec]] = {}
+        self._loads = board.metrics.counter("chunks_loaded_total")
+        self._evictions = board.metrics.counter("chunks_evicted_total")
+
+    @classmethod
+    def from_config(
+        cls,
+        board,
+        config: Mapping[str, Any],
+        seed: int,
+        templates: Mapping[str, Any],
+        location_type: type,
+    ) -> Optional["ChunkManager"]:
+        """
+        The chunk manager the config's game_board section asks for, or None for a board kept
+        whole. `templates` maps location names to their templates.
+        """
+        game_board = config["game_board"]
+        chunk_size = game_board.get("chunk_size", DEFAULT_CHUNK_SIZE)
+        if not chunk_size:
+            return None
+        contents = [
+            (templates[name], density)
+            for name, density in game_board.get("chunk_locations", {}).items()
+        ]
+        return cls(
+            board,
+            chunk_size,
+            seed,
+            contents,
+            location_type,
+            game_board.get("max_chunks", DEFAULT_MAX_CHUNKS),
+            game_board.get("chunk_dir") or None,
+        )
+
+    def __len__(self) -> int:
+        return len(self._loaded)
+
+    def __contains__(self, key: ChunkKey) -> bool:
+        return key in self._loaded
+
+    def chunk_of(self, square: tuple) -> ChunkKey:
+        return square[0] // self.chunk_size, square[1] // self.chunk_size
+
+    def bounds(self, key: ChunkKey) -> Tuple[int, int, int, int]:
+        """
+        (x_min, y_min, x_max, y_max) of a sector, edges included and clipped to the board.
+        """
+        size = self.chunk_size
+        x_min, y_min = key[0] * size, key[1] * size
+        x_max = min(x_min + size - 1, self.board.columns)
+        y_max = min(y_min + size - 1, self.board.rows)
+        return x_min, y_min, x_max, y_max
+
+    def load_area(self, square: tuple, radius: int = 0) -> None:
+        """
+        Make sure every sector within `radius` of `square` is loaded, and mark them as used.
+        """
+        size = self.chunk_size
+        board = self.board
+        x, y = square
+        x_first, x_last = max(x - radius, 0) // size, min(x + radius, board.columns) // size
+        y_first, y_last = max(y - radius, 0) // size, min(y + radius, board.rows) // size
+        loaded = self._loaded
+        keys = []
+        for cy in range(y_first, y_last + 1):
+            for cx in range(x_first, x_last + 1):
+                key = (cx, cy)
+                if key in loaded:
+                    loaded.move_to_end(key)
+                else:
+                    self._load(key)
+                keys.append(key)
+        if len(loaded) > self.max_chunks:
+            self._shrink(keys)
+
+    def generate(self, key: ChunkKey) -> List[LocationSpec]:
+        """
+        The locations a sector starts with. The same every time for the same seed and sector.
+        """
+        x_min, y_min, x_max, y_max = self.bounds(key)
+        width, height = x_max - x_min + 1, y_max - y_min + 1
+        if width <= 0 or height <= 0:
+            return []
+        area = width * height
+        rng = random.Random(f"{self.seed}:{key[0]}:{key[1]}")
+
+        counts = []
+        for _, density in self.contents:
+            expected = density * area
+            whole = int(expected)
+            counts.append(whole + (rng.random() < expected - whole))
+        cells = iter(rng.sample(range(area), min(sum(counts), area)))
+
+        specs = []
+        for (template, _), count in zip(self.contents, counts):
+            for cell in islice(cells, count):
+                square = (x_min + cell % width, y_min + cell // width)
+                specs.append((template, square, template.hit_points, template.danger))
+        return specs
+
+    def _path(self, key: ChunkKey) -> Path:
+        return self.chunk_dir / f"{key[0]}_{key[1]}.chunk"
+
+    def _take_saved(self, key: ChunkKey) -> Optional[List[LocationSpec]]:
+        if self.chunk_dir is None:
+            return self._saved.pop(key, None)
+        path = self._path(key)
+        if not path.exists():
+            return None
+        specs = pickle.loads(path.read_bytes())
+        path.unlink()
+        return specs
+
+    def _save(self, key: ChunkKey, specs: List[LocationSpec]) -> None:
+        if self.chunk_dir is None:
+            self._saved[key] = specs
+        else:
+            self._path(key).write_bytes(pickle.dumps(specs, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _load(self, key: ChunkKey) -> None:
+        board = self.board
+        specs = self._take_saved(key)
+        if specs is None:
+            specs = self.generate(key)
+        for template, square, hit_points, danger in specs:
+            location = self.location_type.from_template(template)
+            location.hit_points = hit_points
+            location.danger = danger
+            if square in board.occupied_squares:
+                board.place_object(location, square)
+                if board.entity_store is not None:
+                    board.entity_store.attach(location)
+            else:
+                board.add_location_to_board(location, square)
+        self._loaded[key] = None
+        self._loads.inc()
+
+    def _locations(self, key: ChunkKey) -> Optional[list]:
+        """
+        Every location in a sector, or None if a ship shares a square with one of them.
+        """
+        board = self.board
+        location_type = self.location_type
+        locations = []
+        for square in board.get_squares_in_rect(*self.bounds(key)):
+            objects = board.occupied_squares[square]
+            here = [object_ for object_ in objects if isinstance(object_, location_type)]
+            if here and len(here) < len(objects):
+                return None
+            locations.extend(here)
+        return locations
+
+    def evict(self, key: ChunkKey) -> bool:
+        """
+        Take a loaded sector's locations off the board, saving them if they changed.
+        Returns False, leaving it loaded, if a ship shares a square with one of them.
+        """
+        locations = self._locations(key)
+        if locations is None:
+            return False
+        specs = [
+            (location.template, location.coordinates, location.hit_points, location.danger)
+            for location in locations
+        ]
+        for location in locations:
+            self.board.remove_object(location)
+        specs.sort(key=_spec_order)
+        if specs != sorted(self.generate(key), key=_spec_order):
+            self._save(key, specs)
+        del self._loaded[key]
+        self._evictions.inc()
+        return True
+
+    def _shrink(self, keep: Iterable[ChunkKey]) -> None:
+        """
+        Evict the least recently used sectors, other than `keep`, until within the budget.
+        """
+        keep = set(keep)
+        for key in list(self._loaded):
+            if len(self._loaded) <= self.max_chunks:
+                break
+            if key not in keep:
+                self.evict(key)
+
+    def state(self) -> dict:
+        """
+        What a snapshot needs to carry on: the loaded sectors, oldest first, and those saved in
+        memory.
+        """
+        return {"loaded": list(self._loaded), "saved": dict(self._saved)}
+
+    def set_state(self, state: Mapping[str, Any]) -> None:
+        self._loaded = OrderedDict.fromkeys(tuple(key) for key in state["loaded"])
+        self._saved = dict(state["saved"])
@@ -0,0 +1,250 @@
+"""
+combat.py
+Fighting between ships of hostile alliances.
+
+Two ships are hostile when each belongs to an alliance and they share none.  At the end of every
+turn hostile ships within `weapon_range` squares of each other (0: sharing a square) fight one
+round.  Every engagement of the round is collected first and resolved together: each armed ship
+(one with the launch_fighter action) fires once at every enemy it is engaged with, the damage of
+every shot is drawn in one go and applied in one pass over hit points, and the ships destroyed
+are taken off the board as one batch.  With the board's entity store switched on, that pass is a
+single array operation on the hit point column.
+
+Finding engagements does not search the board.  The board reports every ship that arrives on a
+square, and a round only looks around those ships and the ones that fought in the round before,
+so it costs in proportion to the ships that moved and the fights going on.  The first round after
+a game is set up or restored looks around every ship.
+
+Damage comes from a generator seeded with the game seed and the turn, and engagements are
+resolved in an order that depends only on where the ships are, so combat replays exactly and
+never draws from the board's generator.
+"""
+# Python standard library
+import random
+from time import perf_counter
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+# Local modules
+from enums import Actions, BoardEvent, JournalEvent
+
+DEFAULT_WEAPON_RANGE = 0
+DEFAULT_MIN_DAMAGE = 5
+DEFAULT_MAX_DAMAGE = 15
+# Ships that can launch fighters are armed. The others take damage but do not fire back.
+WEAPON_ACTION = Actions.LAUNCH_FIGHTER.value
+
+# (attacker, target, damage) of one shot
+Attack = Tuple[Any, Any, int]
+
+
+def _pair_order(pair: tuple) -> tuple:
+    ship, other = pair
+    return ship.coordinates, ship.name, other.coordinates, other.name
+
+
+class CombatRound(NamedTuple):
+    """
+    What happened in one round of combat.
+    """
+
+    engagements: int
+    attacks: List[Attack]
+    destroyed: list
+
+
+class CombatResolver(object):
+    """
+    Fights the combat rounds of one board. `ship_type` is the class of the objects that fight;
+    destroyed ships are also taken off `npcs`, the board's NPC scheduler, if given.
+    The player is never taken off the board: a destroyed player ends the game instead.
+    """
+
+    def __init__(
+        self,
+        board,
+        seed: int,
+        ship_type: type,
+        npcs=None,
+        weapon_range: int = DEFAULT_WEAPON_RANGE,
+        min_damage: int = DEFAULT_MIN_DAMAGE,
+        max_damage: int = DEFAULT_MAX_DAMAGE,
+    ):
+        if min_damage > max_damage:
+            raise ValueError("Combat min_damage must not be more than max_damage.")
+        self.board = board
+        self.seed = seed
+        self.ship_type = ship_type
+        self.npcs = npcs
+        self.weapon_range = max(int(weapon_range), 0)
+        self.damage = range(min_damage, max_damage + 1)
+        # id(ship) -> ship, for the ships that arrived on a square since the last round
+        self._arrived: Dict[int, Any] = {}
+        # id(ship) -> ship, for the ships still fighting after the last round
+        self._engaged: Dict[int, Any] = {}
+        # look around every ship in the next round, not only those that arrived or fought
+        self._full_scan = True
+        # (id(template), id(template)) -> whether ships of the two templates fight
+        self._hostile: Dict[Tuple[int, int], bool] = {}
+        self._rounds = board.metrics.counter("combat_rounds_total")
+        self._engagements = board.metrics.counter("combat_engagements_total")
+        self._destroyed = board.metrics.counter("ships_destroyed_total")
+        self._round_time = board.metrics.histogram("combat_round_seconds")
+        board.events.subscribe(BoardEvent.ENTER_SQUARE, self._arrive)
+
+    @classmethod
+    def from_config(
+        cls, board, config: Mapping[str, Any], seed: int, ship_type: type, npcs=None
+    ) -> Optional["CombatResolver"]:
+        """
+        The resolver the config's combat section asks for, or None if combat is switched off
+        or the config has no combat section.
+        """
+        combat = config.get("combat")
+        if not combat or not combat.get("enabled", True):
+            return None
+        return cls(
+            board,
+            seed,
+            ship_type,
+            npcs,
+            combat.get("weapon_range", DEFAULT_WEAPON_RANGE),
+            combat.get("min_damage", DEFAULT_MIN_DAMAGE),
+            combat.get("max_damage", DEFAULT_MAX_DAMAGE),
+        )
+
+    def _arrive(self, event: BoardEvent, object_, square: tuple, other) -> None:
+        if isinstance(object_, self.ship_type):
+            self._arrived[id(object_)] = object_
+
+    def hostile(self, ship, other) -> bool:
+        key = (id(ship.template), id(other.template))
+        hostile = self._hostile.get(key)
+        if hostile is None:
+            mine, theirs = set(ship.alliances), set(other.alliances)
+            hostile = self._hostile[key] = bool(mine and theirs and not mine & theirs)
+        return hostile
+
+    def _candidates(self) -> List[Any]:
+        """
+        The ships to look around this round.
+        """
+        board = self.board
+        ship_type = self.ship_type
+        if self._full_scan:
+            # with a weapon range of 0 only ships sharing a square can fight
+            return [
+                object_
+                for objects in board.occupied_squares.values()
+                if self.weapon_range or len(objects) > 1
+                for object_ in objects
+                if isinstance(object_, ship_type)
+            ]
+        candidates = dict(self._engaged)
+        candidates.update(self._arrived)
+        return [
+            ship
+            for ship in candidates.values()
+            if any(object_ is ship for object_ in board.occupied_squares.get(ship.coordinates, ()))
+        ]
+
+    def engagements(self) -> List[Tuple[Any, Any]]:
+        """
+        Every pair of hostile ships in weapon range of each other, once each, in board order.
+        """
+        board = self.board
+        ship_type = self.ship_type
+        radius = self.weapon_range
+        candidates = self._candidates()
+        self._arrived = {}
+        self._full_scan = False
+
+        pairs: Dict[Tuple[int, int], tuple] = {}
+        for ship in candidates:
+            if not ship.alliances or ship.hit_points <= 0:
+                continue
+            if radius:
+                squares = board.spatial_index.query_radius(ship.coordinates, radius)
+            else:
+                squares = (ship.coordinates,)
+            for square in squares:
+                for other in board.occupied_squares.get(square, ()):
+                    if (
+                        other is ship
+                        or not isinstance(other, ship_type)
+                        or not self.hostile(ship, other)
+                        or other.hit_points <= 0
+                    ):
+                        continue
+                    key = (id(ship), id(other)) if id(ship) < id(other) else (id(other), id(ship))
+                    if key not in pairs:
+                        pair = (ship, other)
+                        pairs[key] = min(pair, pair[::-1], key=_pair_order)
+        return sorted(pairs.values(), key=_pair_order)
+
+    def resolve(self) -> CombatRound:
+        """
+        Fight one round: every engagement on the board at once.
+        """
+        start = perf_counter()
+        board = self.board
+        pairs = self.engagements()
+
+        attackers: List[Any] = []
+        targets: List[Any] = []
+        for ship, other in pairs:
+            if WEAPON_ACTION in ship.allowed_actions:
+                attackers.append(ship)
+                targets.append(other)
+            if WEAPON_ACTION in other.allowed_actions:
+                attackers.append(other)
+                targets.append(ship)
+        rng = random.Random(f"{self.seed}:combat:{board.turn}")
+        damage = rng.choices(self.damage, k=len(targets)) if targets else []
+        destroyed = self._apply_damage(targets, damage)
+
+        for ship in destroyed:
+            board.journal.record(
+                JournalEvent.SHIP_DESTROYED, id(ship), ship.coordinates, None, board.turn
+            )
+            board.object_destroyed(ship)
+        wrecks = [ship for ship in destroyed if ship is not board.player]
+        if self.npcs is not None:
+            for ship in wrecks:
+                self.npcs.remove(ship)
+        board.remove_objects(wrecks)
+        self._engaged = {
+            id(ship): ship for pair in pairs for ship in pair if ship.hit_points > 0
+        }
+
+        self._rounds.inc()
+        self._engagements.inc(len(pairs))
+        self._destroyed.inc(len(destroyed))
+        self._round_time.observe(perf_counter() - start)
+        return CombatRound(len(pairs), list(zip(attackers, targets, damage)), destroyed)
+
+    def _apply_damage(self, targets: List[Any], damage: List[int]) -> list:
+        """
+        Take every shot's damage off its target's hit points. Returns the ships destroyed.
+        """
+        if not targets:
+            return []
+        store = self.board.entity_store
+        if store is not None and all(target._store is store for target in targets):
+            rows = [target._store_index for target in targets]
+            return store.objects_at(store.apply_damage(rows, damage).tolist())
+
+        # id(ship) -> [ship, damage taken], so each ship's hit points are written once
+        totals: Dict[int, list] = {}
+        for target, amount in zip(targets, damage):
+            total = totals.get(id(target))
+            if total is None:
+                totals[id(target)] = [target, amount]
+            else:
+                total[1] += amount
+        destroyed = []
+        for target, amount in totals.values():
+            hit_points = target.hit_points - amount
+            target.hit_points = hit_points
+            if hit_points <= 0:
+                destroyed.append(target)
+        return destroyed
@@ -0,0 +1,541 @@
+"""
+engine.py
+Headless game engine.
+
+GameSession runs one game as a state machine that is fed one line of player input at a time
+and hands every message to a writer instead of the terminal.  The console game in play_game,
+scripted and agent-driven simulations, and networked sessions are all built on it.
+What the game writes while handling a line is buffered and sent to the writer in one batch.
+
+run_batch spreads many headless games across a process pool and aggregates their outcomes,
+which is how the game is balanced:
+
+`python ./src/engine.py --games 10000`
+"""
+# Python standard library
+import argparse
+import json
+import multiprocessing
+import random
+import time
+from time import perf_counter
+from collections import Counter
+from typing import Callable, Iterable, List, NamedTuple, Optional, Union
+
+# Local modules
+from enums import Actions, BoardEvent, DirectionKeys, GameState, PhraseType, SessionState
+from metrics import MetricsRegistry
+from objects import Game
+from pathfinding import Move
+import phrases
+from renderer import Renderer, null_sink, stdout_sink
+import snapshot
+import utils
+
+PHRASES = utils.PHRASES
+# name of the location the player is trying to reach
+DESTINATION = "destination_planet"
+# name of the ship the player has to protect
+OBJECTIVE = "friendly_objective"
+
+# Upper bound on lines fed to one headless game, so a policy that never ends the game still finishes.
+DEFAULT_MAX_LINES = 200
+
+
+# Writer for headless games that throws every message away.
+discard_output = null_sink
+
+
+class GameSession(object):
+    """
+    One game in progress and the dialog state of its player.
+    Call handle_line with each line the player enters; `prompt` is the question they are being asked.
+    Every line is kept in `input_log`, so the game's seed and the log are enough to replay it.
+    Messages written while handling a line reach `writer` as one string when the line is done.
+    With render=False no messages are chosen or written at all, which is how replays run fast.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        writer: Callable[[str], None] = stdout_sink,
+        game: Optional[Game] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        seed: Optional[int] = None,
+        render: bool = True,
+    ):
+        self.writer = writer
+        self.output = Renderer(writer)
+        self.game = game if game is not None else Game(config, metrics=metrics, seed=seed)
+        self.render = render
+        self.phrase_table = utils.get_phrase_table()
+        self.game.board.output = self.write
+        self.game.board.render = render
+        # looked up once so recording costs no more than the measurement itself
+        self.metrics = self.game.board.metrics
+        self._line_time = self.metrics.histogram("line_seconds")
+        self._parse_time = self.metrics.histogram("command_parse_seconds")
+        self._render_time = self.metrics.histogram("render_seconds")
+        self._turns = self.metrics.counter("turns_total")
+        self.game.gamestate = GameState.RUNNING
+        self.state = SessionState.AWAITING_COMMAND
+        self.lines_handled = 0
+        self.input_log: List[str] = []
+        self._direction = None
+        self._destination: Optional[tuple] = None
+        # whatever the player met this turn, announced when the turn ends
+        self._encounters: list = []
+        if self.player is not None:
+            self.game.board.events.subscribe(
+                BoardEvent.CO_LOCATION, self._encounter, object_=self.player
+            )
+
+    def _dialog(self) -> dict:
+        return {
+            "state": self.state,
+            "direction": self._direction,
+            "lines_handled": self.lines_handled,
+            "input_log": self.input_log,
+        }
+
+    def dumps(self) -> bytes:
+        """
+        Snapshot of the game and the player's place in the dialog.
+        """
+        return snapshot.dumps(self.game, extra={"session": self._dialog()})
+
+    def save(self, path) -> None:
+        """
+        Checkpoint the game and the player's place in the dialog to a snapshot file.
+        """
+        snapshot.save_game(self.game, path, extra={"session": self._dialog()})
+
+    @classmethod
+    def from_snapshot(
+        cls,
+        snap: snapshot.Snapshot,
+        writer: Callable[[str], None] = stdout_sink,
+        render: bool = True,
+        **kwargs,
+    ) -> "GameSession":
+        """
+        Resume a session from a snapshot. Keyword arguments are passed to Snapshot.restore.
+        """
+        game = snap.restore(**kwargs)
+        dialog = snap.extra["session"]
+        gamestate = game.gamestate
+        session = cls(game.config, writer, game=game, render=render)
+        session.game.gamestate = gamestate
+        session.state = dialog["state"]
+        session._direction = dialog["direction"]
+        session.lines_handled = dialog["lines_handled"]
+        session.input_log = list(dialog["input_log"])
+        return session
+
+    @classmethod
+    def loads(cls, data: bytes, writer: Callable[[str], None] = stdout_sink, **kwargs) -> "GameSession":
+        """
+        Resume a session from bytes returned by dumps().
+        """
+        return cls.from_snapshot(snapshot.Snapshot(data), writer, **kwargs)
+
+    @classmethod
+    def restore(cls, path, writer: Callable[[str], None] = stdout_sink, **kwargs) -> "GameSession":
+        """
+        Resume a session saved with save().
+        """
+        with snapshot.Snapshot.open(path) as snap:
+            return cls.from_snapshot(snap, writer, **kwargs)
+
+    @property
+    def player(self):
+        return self.game.board.player
+
+    @property
+    def turn(self) -> int:
+        # kept on the board so everything it records is stamped with the turn
+        return self.game.board.turn
+
+    @property
+    def running(self) -> bool:
+        return self.game.gamestate == GameState.RUNNING
+
+    def write(self, output: Union[str, list]) -> None:
+        start = perf_counter()
+        self.output.write(utils.format_output(output))
+        self._render_time.observe(perf_counter() - start)
+
+    def flush(self) -> None:
+        """
+        Send everything written so far to the writer. handle_line does this after every line.
+        """
+        self.output.flush()
+
+    def say(self, phrase: int, *args) -> None:
+        """
+        Write a phrase, given by its id (see phrases.py), filled in with `args`.
+        """
+        if not self.render:
+            return
+        start = perf_counter()
+        self.output.write(self.phrase_table.render_line(phrase, args))
+        self._render_time.observe(perf_counter() - start)
+
+    @property
+    def destination(self) -> Optional[tuple]:
+        """
+        Square of the destination planet, if the board has one.
+        """
+        if self._destination is None:
+            for square, objects in self.game.board.occupied_squares.items():
+                if any(obj.name == DESTINATION for obj in objects):
+                    self._destination = square
+                    break
+        return self._destination
+
+    def autopilot_move(self, target: Optional[tuple] = None) -> Optional[Move]:
+        """
+        The player's next move on the cheapest route to `target` (the destination planet if not
+        given), or None when already there or it cannot be reached.
+        """
+        target = target if target is not None else self.destination
+        if target is None:
+            return None
+        player = self.player
+        return self.game.pathfinder.next_move(player.coordinates, target, player.movement_speed)
+
+    @property
+    def prompt(self) -> str:
+        """
+        The question the player should be asked before their next line of input.
+        """
+        table = self.phrase_table
+        if self.state == SessionState.AWAITING_COMMAND:
+            return table.render(phrases.DEFAULT_PROMPT)
+        if self.state == SessionState.AWAITING_DIRECTION:
+            return table.render(
+                phrases.MOVEMENT_DIRECTION_QUERY,
+                (self.player.formal_name, self.player.coordinates),
+            )
+        if self.state == SessionState.AWAITING_DISTANCE:
+            return table.render(phrases.MOVEMENT_SPEED_QUERY, (self.player.movement_speed,))
+        if self.state == SessionState.AWAITING_SELF_DESTRUCT_CONFIRMATION:
+            return table.render(
+                phrases.SELF_DESTRUCT_CONFIRMATION,
+                (
+                    PHRASES[PhraseType.SPECIAL.value]["self_destruct_confirm"],
+                    PHRASES[PhraseType.SPECIAL.value]["self_destruct_abort"],
+                ),
+            )
+        return ""
+
+    def handle_line(self, line: str) -> None:
+        """
+        Advance the game with one line of player input.
+        """
+        if not self.running:
+            return
+
+        self.lines_handled += 1
+        self.input_log.append(line)
+        start = perf_counter()
+        self._dispatch(line)
+        self.output.flush()
+        self._line_time.observe(perf_counter() - start)
+
+    def _dispatch(self, line: str) -> None:
+        if self.state == SessionState.AWAITING_COMMAND:
+            self._handle_command(line)
+        elif self.state == SessionState.AWAITING_DIRECTION:
+            self._handle_direction(line)
+        elif self.state == SessionState.AWAITING_DISTANCE:
+            self._handle_distance(line)
+        elif self.state == SessionState.AWAITING_SELF_DESTRUCT_CONFIRMATION:
+            self._handle_self_destruct_confirmation(line)
+
+    def _handle_command(self, line: str) -> None:
+        start = perf_counter()
+        action = utils.check_for_action(line)
+        self._parse_time.observe(perf_counter() - start)
+
+        if not action:
+            self.say(phrases.COMMAND_PARSE_FAIL, line)
+            return
+
+        self.say(phrases.COMMAND_PARSE_SUCCESS, line)
+
+        # Actions that need more input start a dialog. Disallowed actions fall through and fail.
+        if action.value in self.player.allowed_actions:
+            if action == Actions.MOVE:
+                self.state = SessionState.AWAITING_DIRECTION
+                return
+            if action == Actions.SELF_DESTRUCT:
+                self.say(phrases.SELF_DESTRUCT_START)
+                self.state = SessionState.AWAITING_SELF_DESTRUCT_CONFIRMATION
+                return
+
+        self._execute(action)
+
+    def _handle_direction(self, line: str) -> None:
+        start = perf_counter()
+        direction = utils.parse_direction(line)
+        self._parse_time.observe(perf_counter() - start)
+        if not direction:
+            self.say(phrases.DIRECTION_PARSE_FAIL, line)
+            return
+
+        self.say(phrases.DIRECTION_PARSE_SUCCESS, direction.name)
+        self._direction = direction
+        self.state = SessionState.AWAITING_DISTANCE
+
+    def _handle_distance(self, line: str) -> None:
+        start = perf_counter()
+        distance = utils.parse_distance(line, self.player.movement_speed)
+        self._parse_time.observe(perf_counter() - start)
+        if distance is None:
+            self.say(phrases.SPEED_PARSE_FAIL, line)
+            return
+
+        self.say(phrases.SPEED_PARSE_SUCCESS, distance)
+        self._execute(Actions.MOVE, (self._direction, distance))
+
+    def _handle_self_destruct_confirmation(self, line: str) -> None:
+        confirm = PHRASES[PhraseType.SPECIAL.value]["self_destruct_confirm"]
+        abort = PHRASES[PhraseType.SPECIAL.value]["self_destruct_abort"]
+        if line not in (confirm, abort):
+            self.say(phrases.SELF_DESTRUCT_FAIL)
+            return
+
+        self._execute(Actions.SELF_DESTRUCT, line == confirm)
+
+    def _execute(self, action: Actions, args=None) -> None:
+        success = self.game.board.execute_action(action, args)
+        self.state = SessionState.AWAITING_COMMAND
+
+        reply = phrases.ACTION_SUCCESS if success else phrases.ACTION_FAILURE
+        self.say(reply, self.player.formal_name, action.name)
+
+        # If a player's input did not result in a successful action, do not trigger new events
+        if success:
+            self.game.board.turn += 1
+            self._turns.inc()
+            self.game.npcs.run_turn()
+            self._end_turn()
+
+    def _encounter(self, event: BoardEvent, object_, square: tuple, other) -> None:
+        met = other if object_ is self.player else object_
+        if met.phrase_key != "player":
+            self._encounters.append(met)
+
+    def _end_turn(self) -> None:
+        board = self.game.board
+        encounters, self._encounters = self._encounters, []
+
+        if board.player.hit_points <= 0:
+            self.game.gamestate = GameState.GAME_OVER_PLAYER_DESTROYED
+        else:
+            # the board told us as the player and anything else came to share a square
+            for occupant in encounters:
+                discovery = phrases.phrase_id(PhraseType.DISCOVERY, occupant.phrase_key)
+                self.say(discovery, occupant.formal_name)
+
+            if self.game.combat is not None:
+                self._fight()
+
+        if not self.running:
+            self.state = SessionState.FINISHED
+            self._write_game_over()
+
+    def _fight(self) -> None:
+        """
+        Resolve this turn's combat round and tell the player about the shots they were part of.
+        """
+        combat_round = self.game.combat.resolve()
+        player = self.player
+        # the player and every ship they exchanged fire with
+        involved = {id(player)}
+        for attacker, target, damage in combat_round.attacks:
+            if player is attacker or player is target:
+                involved.update((id(attacker), id(target)))
+                self.say(phrases.COMBAT_HIT, attacker.formal_name, target.formal_name, damage)
+        for ship in combat_round.destroyed:
+            if id(ship) in involved:
+                self.say(phrases.COMBAT_DESTROYED, ship.formal_name)
+
+        if player.hit_points <= 0:
+            self.game.gamestate = GameState.GAME_OVER_PLAYER_DESTROYED
+        elif any(ship.name == OBJECTIVE for ship in combat_round.destroyed):
+            self.game.gamestate = GameState.GAME_OVER_OBJECTIVE_DESTROYED
+
+    def _write_game_over(self) -> None:
+        gamestate = self.game.gamestate
+        if gamestate == GameState.GAME_OVER_PLAYER_DESTROYED:
+            self.say(phrases.GAME_OVER_PLAYER_DESTROYED, self.player.formal_name)
+        elif gamestate == GameState.GAME_OVER_OBJECTIVE_DESTROYED:
+            self.say(phrases.GAME_OVER_OBJECTIVE_DESTROYED)
+        elif gamestate == GameState.GAME_OVER_VICTORY:
+            self.say(phrases.GAME_OVER_VICTORY)
+
+
+class GameResult(NamedTuple):
+    """
+    Outcome of one headless game.
+    """
+
+    seed: Optional[int]
+    gamestate: GameState
+    turns: int
+    lines: int
+    player_hit_points: int
+
+
+# A policy looks at the session (board, dialog state) and returns the next line of input.
+Policy = Callable[[GameSession], str]
+
+
+def random_policy(session: GameSession) -> str:
+    """
+    Agent that plays random but well-formed commands. Self destructs now and then to end the game.
+    """
+    if session.state == SessionState.AWAITING_DIRECTION:
+        return random.choice(list(DirectionKeys)).value[0]
+    if session.state == SessionState.AWAITING_DISTANCE:
+        return str(random.randint(0, session.player.movement_speed))
+    if session.state == SessionState.AWAITING_SELF_DESTRUCT_CONFIRMATION:
+        return PHRASES[PhraseType.SPECIAL.value]["self_destruct_confirm"]
+    return random.choices(["scan", "move", "launch fighter", "self destruct"], [4, 8, 1, 1])[0]
+
+
+def autopilot_policy(session: GameSession) -> str:
+    """
+    Agent that flies the player to the destination planet around hazards, then self destructs.
+    """
+    move = session.autopilot_move()
+    if session.state == SessionState.AWAITING_COMMAND:
+        return "move" if move is not None else "self destruct"
+    if session.state == SessionState.AWAITING_DIRECTION:
+        return DirectionKeys[move[0].name].value[0] if move is not None else "north"
+    if session.state == SessionState.AWAITING_DISTANCE:
+        return str(move[1]) if move is not None else "0"
+    return PHRASES[PhraseType.SPECIAL.value]["self_destruct_confirm"]
+
+
+POLICIES = {"random": random_policy, "autopilot": autopilot_policy}
+
+
+def run_headless_game(
+    driver: Union[Iterable[str], Policy],
+    config: Optional[dict] = None,
+    seed: Optional[int] = None,
+    max_lines: int = DEFAULT_MAX_LINES,
+    render: bool = False,
+) -> GameResult:
+    """
+    Play one game with no terminal I/O.
+    `driver` is either a script (iterable of input lines) or a policy called for every line.
+    The game stops when it ends, when the script runs out, or after `max_lines` lines.
+    Messages are not even composed unless `render` is set.
+    """
+    if seed is not None:
+        random.seed(seed)
+
+    session = GameSession(
+        config if config is not None else utils.CONFIG,
+        writer=discard_output,
+        seed=seed,
+        render=render,
+    )
+    script = None if callable(driver) else iter(driver)
+
+    while session.running and session.lines_handled < max_lines:
+        if script is None:
+            line = driver(session)  # type: ignore
+        else:
+            line = next(script, None)
+            if line is None:
+                break
+        session.handle_line(line)
+
+    return GameResult(
+        seed=seed,
+        gamestate=session.game.gamestate,
+        turns=session.turn,
+        lines=session.lines_handled,
+        player_hit_points=session.player.hit_points,
+    )
+
+
+def _run_batch_job(job: tuple) -> GameResult:
+    driver, config, seed, max_lines = job
+    return run_headless_game(driver, config, seed, max_lines)
+
+
+def summarize_results(results: List[GameResult], elapsed: float) -> dict:
+    """
+    Aggregate outcome statistics for a batch of games.
+    """
+    turns = [r.turns for r in results]
+    outcomes = Counter(r.gamestate.name for r in results)
+    return {
+        "games": len(results),
+        "outcomes": dict(outcomes),
+        "turns": {
+            "mean": sum(turns) / len(turns) if turns else 0,
+            "min": min(turns, default=0),
+            "max": max(turns, default=0),
+        },
+        "mean_lines": sum(r.lines for r in results) / len(results) if results else 0,
+        "elapsed_seconds": elapsed,
+        "games_per_second": len(results) / elapsed if elapsed else 0,
+    }
+
+
+def run_batch(
+    n_games: int,
+    driver: Union[Iterable[str], Policy] = random_policy,
+    config: Optional[dict] = None,
+    processes: Optional[int] = None,
+    base_seed: int = 0,
+    max_lines: int = DEFAULT_MAX_LINES,
+    chunksize: int = 64,
+) -> dict:
+    """
+    Play `n_games` headless games across a process pool and summarize the outcomes.
+    Game i is seeded with base_seed + i, so a batch is reproducible.
+    Drivers must be picklable: a list of lines or a module-level policy function.
+    """
+    if config is None:
+        config = utils.CONFIG
+    if not callable(driver):
+        driver = list(driver)
+
+    jobs = [(driver, config, base_seed + i, max_lines) for i in range(n_games)]
+    start = time.perf_counter()
+    if processes == 1:
+        results = [_run_batch_job(job) for job in jobs]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = list(pool.imap_unordered(_run_batch_job, jobs, chunksize))
+    elapsed = time.perf_counter() - start
+
+    return summarize_results(results, elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run headless games with an agent.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-lines", type=int, default=DEFAULT_MAX_LINES)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random")
+    args = parser.parse_args()
+
+    utils.init(utils.LOG_LEVEL)
+    summary = run_batch(
+        args.games,
+        POLICIES[args.policy],
+        processes=args.processes,
+        base_seed=args.seed,
+        max_lines=args.max_lines,
+    )
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,215 @@
+"""
+entity_store.py
+Optional columnar storage for the numeric state of GameObjects.
+
+When a GameBoard is created with an entity store, every object added to the board has its
+coordinates, hit points, scan radius, movement speed and danger moved into NumPy arrays.
+The GameObject keeps working as before but becomes a thin view over its row in the store,
+which lets per-turn work (distances, bounds checks, damage) run as one array operation
+over every entity instead of one Python object at a time.
+
+Requires NumPy, which is only needed (and only imported) if the entity store is switched on.
+"""
+# Python standard library
+from typing import Iterable, List, Optional
+
+# Third-party modules
+# NumPy is imported by the first EntityStore, so boards without a store never pay for it.
+np = None
+
+DEFAULT_CAPACITY = 1024
+
+# Outcome of each move checked by check_moves
+MOVE_OK = 0
+MOVE_NEGATIVE = 1
+MOVE_OUT_OF_RANGE = 2
+
+# attribute name -> (column name, dtype, default for objects that do not have the attribute)
+STORE_COLUMNS = {
+    "hit_points": ("hit_points", "int64", 0),
+    "scan_radius": ("scan_radius", "int64", 0),
+    "movement_speed": ("movement_speed", "int64", 0),
+    "danger": ("danger", "float64", 0.0),
+}
+
+
+def _import_numpy() -> None:
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError(
+                "The entity store requires NumPy. Install it with `python -m pip install numpy`."
+            )
+        np = numpy
+
+
+def numpy_available() -> bool:
+    """
+    Whether NumPy can be imported, importing it if so.
+    """
+    try:
+        _import_numpy()
+    except ImportError:
+        return False
+    return True
+
+
+def check_moves(x, y, dx, dy, columns: int, rows: int) -> tuple:
+    """
+    Where a batch of moves from (x, y) by (dx, dy) ends, as one array operation each.
+    Returns the x and y arrays of the squares reached and the outcome of every move
+    (MOVE_OK, MOVE_NEGATIVE or MOVE_OUT_OF_RANGE) on a board of the given size.
+    """
+    _import_numpy()
+    new_x = np.asarray(x, dtype="int64") + np.asarray(dx, dtype="int64")
+    new_y = np.asarray(y, dtype="int64") + np.asarray(dy, dtype="int64")
+    outcome = np.where((new_x > columns) | (new_y > rows), MOVE_OUT_OF_RANGE, MOVE_OK)
+    outcome[(new_x < 0) | (new_y < 0)] = MOVE_NEGATIVE
+    return new_x, new_y, outcome
+
+
+class EntityStore(object):
+    """
+    Struct-of-arrays container for GameObject state.
+    Rows are handed out by attach() and recycled by detach().
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        _import_numpy()
+
+        capacity = max(int(capacity), 1)
+        self.x = np.zeros(capacity, dtype="int64")
+        self.y = np.zeros(capacity, dtype="int64")
+        for column, dtype, _ in STORE_COLUMNS.values():
+            setattr(self, column, np.zeros(capacity, dtype=dtype))
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.objects: List[Optional[object]] = [None] * capacity
+        self._free_rows: List[int] = []
+        self._next_row = 0
+
+    def __len__(self) -> int:
+        return int(self.alive[: self._next_row].sum())
+
+    @property
+    def capacity(self) -> int:
+        return len(self.objects)
+
+    def _grow(self) -> None:
+        new_capacity = self.capacity * 2
+        for column in ("x", "y", "alive") + tuple(c for c, _, _ in STORE_COLUMNS.values()):
+            old = getattr(self, column)
+            new = np.zeros(new_capacity, dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, column, new)
+        self.objects.extend([None] * (new_capacity - len(self.objects)))
+
+    def attach(self, object_) -> int:
+        """
+        Copy an object's numeric state into the store and turn the object into a view of its row.
+        """
+        if object_._store is self:
+            return object_._store_index
+
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            if self._next_row == self.capacity:
+                self._grow()
+            row = self._next_row
+            self._next_row += 1
+
+        coordinates = object_.coordinates
+        self.x[row] = coordinates[0]
+        self.y[row] = coordinates[1]
+        for attribute, (column, _, default) in STORE_COLUMNS.items():
+            getattr(self, column)[row] = getattr(object_, attribute, default)
+        self.alive[row] = True
+        self.objects[row] = object_
+
+        object_._store = self
+        object_._store_index = row
+        return row
+
+    def detach(self, object_) -> None:
+        """
+        Copy an object's state back onto the object and release its row.
+        """
+        if object_._store is not self:
+            return
+
+        row = object_._store_index
+        coordinates = (int(self.x[row]), int(self.y[row]))
+        values = {
+            attribute: getattr(self, column)[row].item()
+            for attribute, (column, _, _) in STORE_COLUMNS.items()
+            if hasattr(type(object_), attribute)
+        }
+
+        object_._store = None
+        object_._store_index = -1
+        object_.coordinates = coordinates
+        for attribute, value in values.items():
+            setattr(object_, attribute, value)
+
+        self.alive[row] = False
+        self.objects[row] = None
+        self._free_rows.append(row)
+
+    def live_rows(self) -> "np.ndarray":
+        """
+        Indices of every row currently attached to an object.
+        """
+        return np.flatnonzero(self.alive[: self._next_row])
+
+    def objects_at(self, rows: Iterable[int]) -> list:
+        """
+        Map store rows back to their GameObjects.
+        """
+        return [self.objects[row] for row in rows]
+
+    def distances_from(self, coordinates: tuple, rows: Optional["np.ndarray"] = None) -> "np.ndarray":
+        """
+        Board distance (larger of the x and y offsets) from `coordinates` to each row.
+        Defaults to every live row, in the order returned by live_rows().
+        """
+        if rows is None:
+            rows = self.live_rows()
+        return np.maximum(
+            np.abs(self.x[rows] - coordinates[0]), np.abs(self.y[rows] - coordinates[1])
+        )
+
+    def rows_within(self, coordinates: tuple, radius: int) -> "np.ndarray":
+        """
+        Rows whose objects are no more than `radius` sectors from `coordinates`.
+        """
+        rows = self.live_rows()
+        return rows[self.distances_from(coordinates, rows) <= radius]
+
+    def out_of_bounds(self, columns: int, rows: int) -> "np.ndarray":
+        """
+        Rows whose coordinates fall outside a board of the given size.
+        """
+        live = self.live_rows()
+        x = self.x[live]
+        y = self.y[live]
+        bad = (x < 0) | (y < 0) | (x > columns) | (y > rows)
+        return live[bad]
+
+    def apply_damage(self, rows: Iterable[int], amounts) -> "np.ndarray":
+        """
+        Subtract `amounts` (a scalar or one value per row) from the hit points of `rows`.
+        Repeated rows accumulate their damage.  Returns the rows left with hit points at or below zero.
+        """
+        rows = np.asarray(rows, dtype="int64")
+        amounts = np.broadcast_to(np.asarray(amounts, dtype="int64"), rows.shape)
+        np.subtract.at(self.hit_points, rows, amounts)
+        return np.unique(rows[self.hit_points[rows] <= 0])
+
+    def destroyed_rows(self) -> "np.ndarray":
+        """
+        Live rows whose hit points have dropped to zero or below.
+        """
+        live = self.live_rows()
+        return live[self.hit_points[live] <= 0]
@@ -73,3 +73,49 @@ class PhraseType(Enum):
     COMMAND_REPLY = "command_reply"
     ACTION_REPLY = "action_reply"
     GAME_OVER = "game_over"
+
+
+class SessionState(Enum):
+    """
+    What a game session is waiting for from the player.
+    """
+
+    AWAITING_COMMAND = 0
+    AWAITING_DIRECTION = 1
+    AWAITING_DISTANCE = 2
+    AWAITING_SELF_DESTRUCT_CONFIRMATION = 3
+    FINISHED = 4
+
+
+class JournalEvent(Enum):
+    """
+    Kinds of record kept in the event journal.
+    """
+
+    SHIP_ADDED = 0
+    LOCATION_ADDED = 1
+    SQUARE_VACATED = 2
+    OBJECT_MOVED = 3
+    MOVE_VALIDATED = 4
+    MOVE_NEGATIVE = 5
+    MOVE_OUT_OF_RANGE = 6
+    ACTION_NOT_ALLOWED = 7
+    KEYWORD_EXACT_MATCH = 8
+    KEYWORD_MATCH = 9
+    KEYWORD_MISS = 10
+    SENSOR_CONTACT = 11
+    SENSOR_LOST = 12
+    OBJECT_REMOVED = 13
+    MOVE_CONFLICT = 14
+    SHIP_DESTROYED = 15
+
+
+class BoardEvent(Enum):
+    """
+    Kinds of event a GameBoard publishes to its subscribers, see events.py.
+    """
+
+    ENTER_SQUARE = 0
+    LEAVE_SQUARE = 1
+    CO_LOCATION = 2
+    OBJECT_DESTROYED = 3
@@ -0,0 +1,97 @@
+"""
+events.py
+Board events, delivered to the subscribers that asked for them.
+
+The board publishes an event as it happens:
+- ENTER_SQUARE when an object is added to a square or moves onto one,
+- LEAVE_SQUARE when an object moves off a square or is removed from the board,
+- CO_LOCATION for every object already on a square when another one arrives there,
+- OBJECT_DESTROYED when an object's hit points run out.
+
+Handlers are called with (event, object, square, other).  `other` is the object that was
+already on the square for CO_LOCATION and None otherwise.  Handlers can be subscribed to every
+event of a kind, to the events of one object (for CO_LOCATION, either object of the pair) or to
+the events on one square.  Publishing an event nobody has subscribed to costs one lookup, so
+encounters cost time only when someone is listening for them.
+"""
+# Python standard library
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Local modules
+from enums import BoardEvent
+
+Handler = Callable[[BoardEvent, object, tuple, Optional[object]], None]
+
+
+class EventBus(object):
+    """
+    Subscribers to the events of one board.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[BoardEvent, List[Handler]] = {event: [] for event in BoardEvent}
+        # (event, id(object)) -> handlers, and (event, square) -> handlers
+        self._object_handlers: Dict[Tuple[BoardEvent, int], List[Handler]] = {}
+        self._square_handlers: Dict[Tuple[BoardEvent, tuple], List[Handler]] = {}
+        # subscriptions per kind of event, so events nobody listens to are dropped at once
+        self._counts: Dict[BoardEvent, int] = {event: 0 for event in BoardEvent}
+        # all subscriptions, so the board can skip publishing altogether when there are none
+        self.subscriptions = 0
+
+    def listening(self, event: BoardEvent) -> bool:
+        return self._counts[event] > 0
+
+    def _table(self, event: BoardEvent, object_, square: Optional[tuple]) -> Tuple[dict, Any]:
+        if object_ is not None:
+            return self._object_handlers, (event, id(object_))
+        return self._square_handlers, (event, tuple(square))
+
+    def subscribe(
+        self, event: BoardEvent, handler: Handler, object_=None, square: Optional[tuple] = None
+    ) -> None:
+        """
+        Call `handler` for every `event` of `object_`, or on `square`, or anywhere if neither is
+        given.
+        """
+        if object_ is None and square is None:
+            self._handlers[event].append(handler)
+        else:
+            table, key = self._table(event, object_, square)
+            table.setdefault(key, []).append(handler)
+        self._counts[event] += 1
+        self.subscriptions += 1
+
+    def unsubscribe(
+        self, event: BoardEvent, handler: Handler, object_=None, square: Optional[tuple] = None
+    ) -> None:
+        if object_ is None and square is None:
+            self._handlers[event].remove(handler)
+        else:
+            table, key = self._table(event, object_, square)
+            handlers = table[key]
+            handlers.remove(handler)
+            if not handlers:
+                del table[key]
+        self._counts[event] -= 1
+        self.subscriptions -= 1
+
+    def forget(self, object_) -> None:
+        """
+        Drop every subscription to `object_`'s events, once it has left the board.
+        """
+        for event in BoardEvent:
+            handlers = self._object_handlers.pop((event, id(object_)), None)
+            if handlers:
+                self._counts[event] -= len(handlers)
+                self.subscriptions -= len(handlers)
+
+    def publish(self, event: BoardEvent, object_, square: tuple, other=None) -> None:
+        if not self._counts[event]:
+            return
+        handlers = list(self._handlers[event])
+        handlers.extend(self._object_handlers.get((event, id(object_)), ()))
+        if other is not None:
+            handlers.extend(self._object_handlers.get((event, id(other)), ()))
+        handlers.extend(self._square_handlers.get((event, square), ()))
+        for handler in handlers:
+            handler(event, object_, square, other)
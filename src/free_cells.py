@@ -0,0 +1,100 @@
+"""
+free_cells.py
+Free-cell allocator for placing objects on random unoccupied GameBoard squares.
+
+Cells are numbered 0..total_cells-1 and kept in a virtual permutation where the first
+`free_count` entries are the free cells.  Only the entries that have been swapped away from
+their starting position are stored, so an empty 10k x 10k board costs nothing up front
+(a sparse Fisher-Yates shuffle).  Taking a random cell, taking a specific cell and
+releasing a cell are all O(1).
+"""
+# Python standard library
+import random
+from typing import Dict, List, Optional
+
+
+class FreeCellAllocator(object):
+    """
+    Tracks which cells of a fixed-size board are free and hands them out uniformly at random.
+    """
+
+    def __init__(self, total_cells: int, rng: Optional[random.Random] = None):
+        self.total_cells = total_cells
+        self.free_count = total_cells
+        self.rng = rng if rng is not None else random
+        # position in the permutation -> cell id, only for positions that do not hold their own id
+        self._cell_at: Dict[int, int] = {}
+        # cell id -> position in the permutation, only for cells that are not at their own position
+        self._position_of: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return self.free_count
+
+    def _get_cell(self, position: int) -> int:
+        return self._cell_at.get(position, position)
+
+    def _get_position(self, cell: int) -> int:
+        return self._position_of.get(cell, cell)
+
+    def _set(self, position: int, cell: int) -> None:
+        if position == cell:
+            self._cell_at.pop(position, None)
+            self._position_of.pop(cell, None)
+        else:
+            self._cell_at[position] = cell
+            self._position_of[cell] = position
+
+    def _swap(self, position_a: int, position_b: int) -> None:
+        cell_a = self._get_cell(position_a)
+        cell_b = self._get_cell(position_b)
+        self._set(position_a, cell_b)
+        self._set(position_b, cell_a)
+
+    def is_free(self, cell: int) -> bool:
+        return self._get_position(cell) < self.free_count
+
+    def sample(self) -> int:
+        """
+        Return a uniformly random free cell without taking it.
+        """
+        if not self.free_count:
+            raise RuntimeError("Attempted to sample a free cell, but no cells are free.")
+        return self._get_cell(self.rng.randrange(self.free_count))
+
+    def acquire(self, cell: int) -> None:
+        """
+        Mark a specific cell as taken.  Acquiring a cell that is already taken is a no-op.
+        """
+        position = self._get_position(cell)
+        if position >= self.free_count:
+            return
+        self.free_count -= 1
+        self._swap(position, self.free_count)
+
+    def acquire_random(self) -> int:
+        """
+        Take and return a uniformly random free cell.
+        """
+        cell = self.sample()
+        self.acquire(cell)
+        return cell
+
+    def release(self, cell: int) -> None:
+        """
+        Return a cell to the free pool.  Releasing a cell that is already free is a no-op.
+        """
+        position = self._get_position(cell)
+        if position < self.free_count:
+            return
+        self._swap(position, self.free_count)
+        self.free_count += 1
+
+    def place_many(self, n: int) -> List[int]:
+        """
+        Take `n` distinct random free cells in one pass.
+        """
+        if n > self.free_count:
+            raise RuntimeError(
+                f"Attempted to place {n} objects, but only {self.free_count} cells are free."
+            )
+        return [self.acquire_random() for _ in range(n)]
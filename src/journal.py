@@ -0,0 +1,135 @@
+"""
+journal.py
+Structured event journal for the game's hot paths.
+
+Recording an event stores one small tuple of references (event type, object id, coordinates,
+detail, turn) in a preallocated ring buffer; nothing is formatted.  The newest `capacity`
+events are kept and only turned into text when the journal is dumped, for instance after a
+crash or from a debugging session:
+
+    journal.JOURNAL.write_to(logging.getLogger("GameBoard"))
+"""
+# Python standard library
+import logging
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+# Local modules
+from enums import JournalEvent
+
+DEFAULT_CAPACITY = 4096
+
+# How each event reads when the journal is dumped.
+EVENT_FORMATS = {
+    JournalEvent.SHIP_ADDED: "Ship {name} added to board at {coordinates}",
+    JournalEvent.LOCATION_ADDED: "Location {name} added to board at position {coordinates}.",
+    JournalEvent.SQUARE_VACATED: "square{coordinates} unoccupied, deleting key.",
+    JournalEvent.OBJECT_MOVED: "Moved {name} from {detail} to {coordinates}",
+    JournalEvent.MOVE_VALIDATED: "Movement from {detail} to {coordinates} passes validation check",
+    JournalEvent.MOVE_NEGATIVE: (
+        "Movement from {detail} to {coordinates} failed negative coordinate validation check"
+    ),
+    JournalEvent.MOVE_OUT_OF_RANGE: "Movement from {detail} to {coordinates} out of board range",
+    JournalEvent.ACTION_NOT_ALLOWED: "{detail} not in {name} action list",
+    JournalEvent.KEYWORD_EXACT_MATCH: "Exact keyword match found for user input {detail}",
+    JournalEvent.KEYWORD_MATCH: "keyword match. {subject} in {detail}",
+    JournalEvent.KEYWORD_MISS: "no keyword match in {detail}",
+    JournalEvent.SENSOR_CONTACT: "{name} picked up {detail} at {coordinates}",
+    JournalEvent.SENSOR_LOST: "{name} lost sight of {detail} at {coordinates}",
+    JournalEvent.OBJECT_REMOVED: "Removed {name} from board at {coordinates}",
+    JournalEvent.MOVE_CONFLICT: "{name} lost the move from {detail} to {coordinates} to another ship",
+    JournalEvent.SHIP_DESTROYED: "{name} destroyed in combat at {coordinates}",
+}
+
+
+class JournalRecord(NamedTuple):
+    """
+    One decoded journal entry. `subject` is usually the id() of the object concerned.
+    """
+
+    sequence: int
+    event: JournalEvent
+    subject: Any
+    coordinates: Optional[tuple]
+    detail: Any
+    turn: int
+
+    def describe(self, names: Dict[int, str]) -> str:
+        name = self.subject
+        if isinstance(name, int):
+            name = names.get(name, name)
+        text = EVENT_FORMATS[self.event].format(
+            name=name, subject=self.subject, coordinates=self.coordinates, detail=self.detail
+        )
+        return f"[{self.sequence}] turn {self.turn}: {text}"
+
+
+class Journal(object):
+    """
+    Fixed-size ring buffer of events. Old events are overwritten once it is full.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        # a power of two, so the write position is a mask rather than a division
+        self.capacity = 1 << max(int(capacity) - 1, 0).bit_length()
+        self._mask = self.capacity - 1
+        self._records: List[Optional[tuple]] = [None] * self.capacity
+        self.recorded = 0
+        # id() of objects -> the name to print for them
+        self.names: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return min(self.recorded, self.capacity)
+
+    def record(
+        self,
+        event: JournalEvent,
+        subject: Any = None,
+        coordinates: Optional[tuple] = None,
+        detail: Any = None,
+        turn: int = -1,
+    ) -> None:
+        """
+        Store one event. Arguments are kept by reference, so pass values that will not change.
+        """
+        self._records[self.recorded & self._mask] = (event, subject, coordinates, detail, turn)
+        self.recorded += 1
+
+    def name_object(self, object_: Any, name: str) -> None:
+        """
+        Remember what to call an object when its events are dumped.
+        The table is bounded; objects named long ago fall back to their id in dumps.
+        """
+        if len(self.names) >= 4 * self.capacity:
+            self.names.clear()
+        self.names[id(object_)] = name
+
+    def clear(self) -> None:
+        self._records = [None] * self.capacity
+        self.recorded = 0
+        self.names.clear()
+
+    def records(self, last: Optional[int] = None) -> Iterator[JournalRecord]:
+        """
+        Decode the kept events, oldest first. `last` limits it to the newest few.
+        """
+        count = len(self)
+        if last is not None:
+            count = min(count, last)
+        for sequence in range(self.recorded - count, self.recorded):
+            yield JournalRecord(sequence, *self._records[sequence & self._mask])
+
+    def dump(self, last: Optional[int] = None) -> List[str]:
+        return [record.describe(self.names) for record in self.records(last)]
+
+    def write_to(
+        self, logger: logging.Logger, level: int = logging.INFO, last: Optional[int] = None
+    ) -> None:
+        """
+        Send the kept events to a logger, one line each.
+        """
+        for line in self.dump(last):
+            logger.log(level, line)
+
+
+# Journal used by the game unless one is passed in.
+JOURNAL = Journal()
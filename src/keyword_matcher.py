@@ -0,0 +1,110 @@
+"""
+keyword_matcher.py
+Compiled keyword matching for parsing player commands.
+
+A KeywordMatcher is built once from a table of {value: keywords}.  Keywords may be single
+words ("scan") or phrases ("ftl jump").  They are compiled into an Aho-Corasick automaton
+over words, so an input line is tokenized and scanned in a single pass no matter how many
+keywords the table holds.  The root of the automaton doubles as the word -> value index
+for single-word keywords.
+"""
+# Python standard library
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Sentinel priority for automaton states that do not complete any keyword.
+NO_MATCH = -1
+
+
+def tokenize(input_string: str) -> List[str]:
+    """
+    Split player input into lowercase words.
+    """
+    return input_string.lower().split()
+
+
+class KeywordMatcher(object):
+    """
+    Finds which entry of a keyword table an input line refers to.
+
+    When words from several entries appear in the same line, the entry listed first in the table wins,
+    the same precedence the game has always used when checking actions one at a time.
+    """
+
+    def __init__(self, table: Iterable[Tuple[Any, Iterable[str]]]):
+        self.values: List[Any] = []
+        # goto[state] maps a word to the next state; state 0 is the root.
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # best (lowest) priority of any keyword that ends in this state, including via fail links.
+        self._priority: List[int] = [NO_MATCH]
+
+        for value, keywords in table:
+            priority = len(self.values)
+            self.values.append(value)
+            for keyword in keywords:
+                self._add_keyword(tokenize(keyword), priority)
+
+        self._build_fail_links()
+
+    def _add_keyword(self, words: List[str], priority: int) -> None:
+        if not words:
+            return
+        state = 0
+        for word in words:
+            next_state = self._goto[state].get(word)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._priority.append(NO_MATCH)
+                self._goto[state][word] = next_state
+            state = next_state
+        self._priority[state] = self._best(self._priority[state], priority)
+
+    @staticmethod
+    def _best(a: int, b: int) -> int:
+        if a == NO_MATCH:
+            return b
+        if b == NO_MATCH:
+            return a
+        return min(a, b)
+
+    def _build_fail_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(word, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._priority[next_state] = self._best(
+                    self._priority[next_state], self._priority[self._fail[next_state]]
+                )
+
+    def match(self, input_string: str) -> Optional[Any]:
+        """
+        Return the table value whose keyword appears in the input, or None.
+        """
+        goto = self._goto
+        fail = self._fail
+        priorities = self._priority
+
+        best = NO_MATCH
+        state = 0
+        for word in tokenize(input_string):
+            while state and word not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(word, 0)
+            priority = priorities[state]
+            if priority != NO_MATCH and (best == NO_MATCH or priority < best):
+                best = priority
+                if best == 0:
+                    break
+
+        if best == NO_MATCH:
+            return None
+        return self.values[best]
@@ -0,0 +1,257 @@
+"""
+metrics.py
+Lightweight instrumentation for the game loop.
+
+Counters and histograms are plain Python objects that cost an addition or a bisect per
+recording, so they are left on all the time.  Snapshots can be exported as JSON or in the
+Prometheus text format to a local file.  For deeper digging, capture_profile() wraps a block
+of code in cProfile and/or tracemalloc and writes their reports next to the snapshot.
+
+Code that records in a hot path should look its metric up once and keep the object:
+
+    parse_time = metrics.REGISTRY.histogram("command_parse_seconds")
+    with parse_time.time():
+        ...
+"""
+# Python standard library
+import cProfile
+import json
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+METRIC_PREFIX = "soldado_"
+
+# Histogram bucket upper bounds in seconds: 1 microsecond doubling up to about 2 minutes.
+DEFAULT_BUCKETS = tuple(1e-6 * 2 ** i for i in range(28))
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: LabelKey, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter(object):
+    """
+    Monotonically increasing count.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class _Timer(object):
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: "Histogram"):
+        self.histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Histogram(object):
+    """
+    Distribution of observed values in fixed buckets, with count, sum, min and max.
+    Percentiles are estimated from the buckets, so they are accurate to within a factor of two.
+    """
+
+    __slots__ = ("bounds", "buckets", "count", "total", "minimum", "maximum")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        # one bucket per bound plus a final overflow bucket
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def time(self) -> _Timer:
+        """
+        Context manager that observes how long its block took, in seconds.
+        """
+        return _Timer(self)
+
+    def percentile(self, fraction: float) -> float:
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        cumulative = 0
+        for index, bucket in enumerate(self.buckets):
+            cumulative += bucket
+            if cumulative >= target:
+                upper = self.bounds[index] if index < len(self.bounds) else self.maximum
+                return min(upper, self.maximum)
+        return self.maximum
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.minimum if self.count else 0.0,
+            "max": self.maximum,
+            "p50": self.percentile(0.50),
+            "p90": self.percentile(0.90),
+            "p99": self.percentile(0.99),
+        }
+
+
+class MetricsRegistry(object):
+    """
+    Named, labelled counters and histograms.
+    """
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, LabelKey], Counter] = {}
+        self.histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> Tuple[str, LabelKey]:
+        return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+    def counter(self, name: str, **labels) -> Counter:
+        key = self._key(name, labels)
+        counter = self.counters.get(key)
+        if counter is None:
+            counter = self.counters[key] = Counter()
+        return counter
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        key = self._key(name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        return histogram
+
+    def timer(self, name: str, **labels) -> _Timer:
+        """
+        convenience function for timing a block into a histogram
+        """
+        return self.histogram(name, **labels).time()
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        """
+        Current value of every metric as plain data.
+        """
+        return {
+            "timestamp": time.time(),
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": counter.value}
+                for (name, labels), counter in self.counters.items()
+            ],
+            "histograms": [
+                dict(name=name, labels=dict(labels), **histogram.summary())
+                for (name, labels), histogram in self.histograms.items()
+            ],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Every metric in the Prometheus text exposition format.
+        """
+        lines: List[str] = []
+        typed = set()
+        for (name, labels), counter in sorted(self.counters.items()):
+            metric = METRIC_PREFIX + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {counter.value}")
+
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            metric = METRIC_PREFIX + name
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for bound, bucket in zip(histogram.bounds, histogram.buckets):
+                cumulative += bucket
+                le = 'le="%g"' % bound
+                lines.append(f"{metric}_bucket{_format_labels(labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{metric}_bucket{_format_labels(labels, le)} {histogram.count}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.total}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, path: Path) -> None:
+        """
+        Write a snapshot to `path`: Prometheus text for a .prom file, JSON for anything else.
+        The file is replaced atomically so a scraper never reads half a snapshot.
+        """
+        path = Path(path)
+        text = self.to_prometheus() if path.suffix == ".prom" else self.to_json()
+        temp_path = path.with_name(path.name + ".tmp")
+        temp_path.write_text(text)
+        temp_path.replace(path)
+
+
+# Registry used by the game unless one is passed in.
+REGISTRY = MetricsRegistry()
+
+
+@contextmanager
+def capture_profile(
+    output_prefix: Path, cpu: bool = True, memory: bool = False, top: int = 25
+) -> Iterator[None]:
+    """
+    Opt-in deep capture around a block of code.
+    cpu writes cProfile stats to <prefix>.prof (open with pstats or snakeviz).
+    memory writes the `top` allocation sites seen by tracemalloc to <prefix>.memory.txt.
+    """
+    output_prefix = Path(output_prefix)
+    profiler: Optional[cProfile.Profile] = cProfile.Profile() if cpu else None
+    started_tracemalloc = memory and not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    before = tracemalloc.take_snapshot() if memory else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(str(output_prefix.with_name(output_prefix.name + ".prof")))
+        if memory:
+            after = tracemalloc.take_snapshot()
+            stats = after.compare_to(before, "lineno")[:top]
+            report = "\n".join(str(stat) for stat in stats) + "\n"
+            output_prefix.with_name(output_prefix.name + ".memory.txt").write_text(report)
+            if started_tracemalloc:
+                tracemalloc.stop()
@@ -16,19 +16,33 @@ Derived GameObjects: Ship, Location
 # Python standard library
 import logging
 import random
-from pathlib import Path
-from typing import Any, MutableMapping, Optional
-
-# Third-party modules
-import toml
+from time import perf_counter
+from typing import (
+    Any, Callable, Dict, Iterable, List, Mapping, MutableMapping, NamedTuple, Optional, Tuple, Union
+)
 
 # Local modules
-from enums import Actions, PhraseType
+from chunks import ChunkManager
+from combat import CombatResolver
+import entity_store
+from entity_store import EntityStore, STORE_COLUMNS
+from enums import Actions, BoardEvent, JournalEvent, PhraseType
+from events import EventBus
+from free_cells import FreeCellAllocator
+from journal import Journal, JOURNAL
+from metrics import MetricsRegistry, REGISTRY
+from pathfinding import PathFinder
+import phrases
+from renderer import null_sink
+from scheduler import NPCScheduler
+from spatial import SpatialGrid
+from visibility import VisibilityTracker
 import utils
 
 
-RESOURCE_PATHS = utils.RESOURCE_PATHS
 PHRASES = utils.PHRASES
+# Batches of moves smaller than this are checked in a loop: NumPy costs more than it saves.
+NUMPY_MIN_MOVES = 64
 
 
 class Game(object):
@@ -36,15 +50,56 @@ class Game(object):
     Container to hold a game instance and all associated objects
     """
 
-    def __init__(self, config: dict):
+    def __init__(
+        self,
+        config: dict,
+        metrics: Optional[MetricsRegistry] = None,
+        board: Optional["GameBoard"] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Set up a new game from `config`, or resume one on an already populated `board`.
+        Game logic draws only from the board's generator, seeded with `seed` (random if not given),
+        so the seed and the player's input reproduce a game whatever phrases are picked on the way.
+        """
         self.config: dict = config
-        self.resource_paths: MutableMapping[str, Any] = RESOURCE_PATHS
-        self.resources: dict = self.load_game_resources()
-        self.board = GameBoard(
-            config["game_board"]["x_len"], config["game_board"]["y_len"]
+        self.seed = seed if seed is not None else random.SystemRandom().getrandbits(63)
+        self.resource_paths: MutableMapping[str, Any] = utils.get_resource_paths()
+        self.resources = self.load_game_resources()
+        if board is None:
+            self.board = GameBoard(
+                config["game_board"]["x_len"],
+                config["game_board"]["y_len"],
+                use_entity_store=config["game_board"].get("entity_store", False),
+                metrics=metrics,
+                rng=random.Random(self.seed),
+            )
+        else:
+            self.board = board
+        # routes for NPCs and the player's autopilot, around hazardous locations
+        self.pathfinder = PathFinder(self.board)
+        # every ship but the player acts on the turns this books for it
+        self.npcs = NPCScheduler.from_config(self.board, config, self.pathfinder)
+        # ships of hostile alliances fight a round at the end of every turn
+        self.combat = CombatResolver.from_config(self.board, config, self.seed, Ship, self.npcs)
+        # open-ended boards generate their locations sector by sector, as ships get there
+        self.board.chunks = ChunkManager.from_config(
+            self.board,
+            config,
+            self.seed,
+            {
+                name: LocationTemplate.from_config(self.resources["locations"][name])
+                for name in config["game_board"].get("chunk_locations", {})
+            },
+            Location,
         )
-        self.create_start_locations()
-        self.create_start_ships()
+        if board is None:
+            if self.board.chunks is not None:
+                # the starting ships and locations all go in the first sector
+                size = self.board.chunks.chunk_size
+                self.board.restrict_placement(size - 1, size - 1)
+            self.create_start_locations()
+            self.create_start_ships()
         self.gamestate = "RUNNING"
         self.logger = logging.getLogger("Game")
         self.logger.info(f"Game {id(self)} initialized.")
@@ -54,52 +109,42 @@ class Game(object):
         Instantiate Ship objects based on config file and add them to the board in random, unoccupied squares.
         """
 
+        ships = []
         for ship, num in self.config["start_conditions"]["ships"].items():
-            config = self.resources["ships"][ship]
+            template = ShipTemplate.from_config(self.resources["ships"][ship])
 
             for _ in range(0, num):
-                newship = Ship(
-                    name=config["name"],
-                    formal_name=config["formal_name"],
-                    phrase_key=config["phrase_key"],
-                    rules=config["rules"],
-                    alliances=config["alliances"],
-                    nicknames=config["nicknames"],
-                    movement_speed=config["movement_speed"],
-                    scan_radius=config["scan_radius"],
-                    hit_points=config["hit_points"],
-                    actions=config["actions"],
-                )
-                self.board.add_ship_to_board(newship)
+                newship = Ship.from_template(template)
+                ships.append(newship)
 
                 if ship == "player":
                     # we will use this a lot, lets make it easy and give it a reference in the game board too.
                     self.board.player = newship
-        
+
+        self.board.place_many(ships)
+        for newship in ships:
+            if newship is not self.board.player:
+                self.npcs.add(newship)
 
     def create_start_locations(self) -> None:
         """
         Instantiate Location objects based on config file and add them to the board in random, unoccupied squares.
         """
 
+        locations = []
         for location, num in self.config["start_conditions"]["locations"].items():
 
-            config = self.resources["locations"][location]
+            template = LocationTemplate.from_config(self.resources["locations"][location])
             for _ in range(0, num):
-                loc = Location(**config)
-                self.board.add_location_to_board(loc)
+                locations.append(Location.from_template(template))
 
-    def load_game_resources(self) -> dict:
-        resources = {}
-        for key, val in self.resource_paths["game_objects"].items():
-            resource_list = toml.load(Path(utils.PARENT_DIRECTORY, val))[key]
-            r_ = {}
-            for resource in resource_list:
-                for k, v in resource.items():
-                    r_[k] = v
-            resources[key] = r_
+        self.board.place_many(locations)
 
-        return resources
+    def load_game_resources(self) -> Mapping[str, Mapping[str, Any]]:
+        """
+        Ship and location definitions. Shared, read-only and parsed only once per process.
+        """
+        return utils.get_bundle().resources
 
 
 class GameBoard(object):
@@ -109,31 +154,114 @@ class GameBoard(object):
     to move the objects around and introspect the environment
     """
 
-    def __init__(self, x_length: int = 5, y_length: int = 5):
+    def __init__(
+        self,
+        x_length: int = 5,
+        y_length: int = 5,
+        use_entity_store: bool = False,
+        metrics: Optional[MetricsRegistry] = None,
+        journal: Optional[Journal] = None,
+        rng: Optional[random.Random] = None,
+    ):
 
         self.rows = y_length
         self.columns = x_length
         self.total_squares = (self.rows + 1) * (self.columns + 1)
         self.occupied_squares = {}
-        self.logger = logging.getLogger("GameBoard")
+        # every random decision that changes the board comes from here, never from phrase picking
+        self.rng = rng if rng is not None else random
+        # objects without coordinates are placed within (0, 0)-(placement_columns, placement_rows)
+        self.placement_columns = self.columns
+        self.placement_rows = self.rows
+        self.free_squares = FreeCellAllocator(self.total_squares, rng=self.rng)
+        # loads and evicts the sectors of an open-ended board, None when the board is kept whole
+        self.chunks: Optional[ChunkManager] = None
+        self.spatial_index = SpatialGrid()
+        # danger of every square holding a hazardous location, and who to tell when it changes
+        self.danger: Dict[tuple, float] = {}
+        self.danger_watchers: List[Callable[[tuple], None]] = []
+        # what every scanning ship can see, updated as objects are added and move
+        self.visibility = VisibilityTracker(self)
+        # encounters and other board events, for whoever subscribes to them
+        self.events = EventBus()
+        # columnar copy of every object's numeric state, for batch operations over the whole board
+        self.entity_store: Optional[EntityStore] = EntityStore() if use_entity_store else None
+        # board events are recorded here rather than logged, see journal.py
+        self.journal = journal if journal is not None else JOURNAL
+        self.turn = 0
         self.player = None
+        # where messages for the player are sent. Swapped out for headless or networked games.
+        self.output: Callable[[Union[str, list]], None] = utils.print_output
+        # False skips choosing and formatting messages altogether, for fast headless replays
+        self.render = True
+
+        self.metrics = metrics if metrics is not None else REGISTRY
+        self._ships_added = self.metrics.counter("board_mutations_total", kind="add_ship")
+        self._locations_added = self.metrics.counter("board_mutations_total", kind="add_location")
+        self._moves = self.metrics.counter("board_mutations_total", kind="move")
+        # action -> (timer, success counter, failure counter), filled in on first use
+        self._action_metrics: dict = {}
+
+    def _square_to_cell(self, coordinates: tuple) -> Optional[int]:
+        """
+        Number a board square for the free square allocator. Squares off the board have no number.
+        """
+        x, y = coordinates
+        if 0 <= x <= self.placement_columns and 0 <= y <= self.placement_rows:
+            return y * (self.placement_columns + 1) + x
+        return None
+
+    def _cell_to_square(self, cell: int) -> tuple:
+        return (cell % (self.placement_columns + 1), cell // (self.placement_columns + 1))
+
+    def restrict_placement(self, x_max: int, y_max: int) -> None:
+        """
+        Place objects added without coordinates within (0, 0)-(x_max, y_max) only.
+        """
+        self.placement_columns = min(x_max, self.columns)
+        self.placement_rows = min(y_max, self.rows)
+        self.free_squares = FreeCellAllocator(
+            (self.placement_rows + 1) * (self.placement_columns + 1), rng=self.rng
+        )
+        for square in self.occupied_squares:
+            cell = self._square_to_cell(square)
+            if cell is not None:
+                self.free_squares.acquire(cell)
+
+    def _mark_occupied(self, coordinates: tuple) -> None:
+        cell = self._square_to_cell(coordinates)
+        if cell is not None:
+            self.free_squares.acquire(cell)
+        self.spatial_index.insert(coordinates)
+
+    def _mark_unoccupied(self, coordinates: tuple) -> None:
+        cell = self._square_to_cell(coordinates)
+        if cell is not None:
+            self.free_squares.release(cell)
+        self.spatial_index.remove(coordinates)
 
     def get_random_unoccupied_square(self) -> tuple:
         """
         convenience function for finding new unoccupied square on GameBoard
         """
         # raise exception if all squares are occupied
-        if len(self.occupied_squares.keys()) == self.total_squares:
+        if not self.free_squares.free_count:
             raise RuntimeError(
                 "Attempted to get random unoccupied square, but all board squares are occupied."
             )
-        # Number of columns is the width of X and number of rows is the height of Y
-        coords = (random.randint(0, self.columns), random.randint(0, self.rows))
 
-        while coords in self.occupied_squares.keys():
-            coords = (random.randint(0, self.columns), random.randint(0, self.rows))
+        return self._cell_to_square(self.free_squares.sample())
 
-        return coords
+    def place_many(self, objects: list) -> None:
+        """
+        Add a batch of Ships and Locations to distinct random unoccupied squares in one pass.
+        """
+        cells = self.free_squares.place_many(len(objects))
+        for object_, cell in zip(objects, cells):
+            if isinstance(object_, Ship):
+                self.add_ship_to_board(object_, self._cell_to_square(cell))
+            else:
+                self.add_location_to_board(object_, self._cell_to_square(cell))
 
     def add_ship_to_board(self, ship: "Ship", coordinates=()) -> None:
         """
@@ -148,7 +276,14 @@ class GameBoard(object):
 
         ship.coordinates = coordinates
         self.occupied_squares[coordinates] = [ship]
-        self.logger.info(f"Ship {ship.name} added to board at {coordinates}")
+        self._mark_occupied(coordinates)
+        if self.entity_store is not None:
+            self.entity_store.attach(ship)
+        self.visibility.object_added(ship)
+        self.events.publish(BoardEvent.ENTER_SQUARE, ship, coordinates)
+        self._ships_added.inc()
+        self.journal.name_object(ship, ship.name)
+        self.journal.record(JournalEvent.SHIP_ADDED, id(ship), coordinates, None, self.turn)
 
     def add_location_to_board(self, location: "Location", coordinates=()) -> None:
         """
@@ -163,9 +298,15 @@ class GameBoard(object):
 
         location.coordinates = coordinates
         self.occupied_squares[coordinates] = [location]
-        self.logger.info(
-            f"Location {location.name} added to board at position {coordinates}."
-        )
+        self._mark_occupied(coordinates)
+        self.update_danger(coordinates)
+        if self.entity_store is not None:
+            self.entity_store.attach(location)
+        self.visibility.object_added(location)
+        self.events.publish(BoardEvent.ENTER_SQUARE, location, coordinates)
+        self._locations_added.inc()
+        self.journal.name_object(location, location.name)
+        self.journal.record(JournalEvent.LOCATION_ADDED, id(location), coordinates, None, self.turn)
 
     def calculate_updated_location_and_validate(
         self, coordinates: tuple, movement: tuple
@@ -176,25 +317,23 @@ class GameBoard(object):
         """
         speed = movement[1]
         direction = movement[0].value
-        vector = (direction[0] * speed, direction[1] * speed)
-        new_location = tuple(map(lambda loc, vec: loc + vec, coordinates, vector))
+        x = coordinates[0] + direction[0] * speed
+        y = coordinates[1] + direction[1] * speed
+        new_location = (x, y)
 
-        negative_coords = [x for x in new_location if x < 0]
-        if negative_coords:
-            self.logger.info(
-                f"Movement from {coordinates} to {new_location} failed negative coordinate validation check"
+        if x < 0 or y < 0:
+            self.journal.record(
+                JournalEvent.MOVE_NEGATIVE, None, new_location, coordinates, self.turn
             )
             return None
 
-        if new_location[0] > self.columns or new_location[1] > self.rows:
-            self.logger.info(
-                f"Movement from {coordinates} to {new_location} out of board range"
+        if x > self.columns or y > self.rows:
+            self.journal.record(
+                JournalEvent.MOVE_OUT_OF_RANGE, None, new_location, coordinates, self.turn
             )
             return None
 
-        self.logger.info(
-            f"Movement from {coordinates} to {new_location} passes validation check"
-        )
+        self.journal.record(JournalEvent.MOVE_VALIDATED, None, new_location, coordinates, self.turn)
         return new_location
 
     def move_object(self, object_: "GameObject", new_location: tuple) -> None:
@@ -202,82 +341,446 @@ class GameBoard(object):
         Moves an object and updates the occupied squares dict
         """
 
+        if self.chunks is not None:
+            self.chunks.load_area(new_location)
+
         # Find all objects in the square that are NOT the object we are about to move.
-        current_square_objects = self.occupied_squares[object_.coordinates]
+        old_location = object_.coordinates
+        current_square_objects = self.occupied_squares[old_location]
         remaining_square_objects = [
             obj for obj in current_square_objects if id(obj) != id(object_)
         ]
 
         # if there is anything left in the square, update the dict.  Otherwise delete the key
         if remaining_square_objects:
-            self.occupied_squares[object_.coordinates] = remaining_square_objects
+            self.occupied_squares[old_location] = remaining_square_objects
+        else:
+            self.journal.record(JournalEvent.SQUARE_VACATED, None, old_location, None, self.turn)
+            del self.occupied_squares[old_location]
+            self._mark_unoccupied(old_location)
+
+        self._put(object_, new_location)
+        if isinstance(object_, Location):
+            self.update_danger(old_location)
+        self.visibility.object_moved(object_, old_location)
+        if self.events.subscriptions:
+            self.events.publish(BoardEvent.LEAVE_SQUARE, object_, old_location)
+            self._publish_arrival(object_, new_location)
+        self._moves.inc()
+        self.journal.record(
+            JournalEvent.OBJECT_MOVED, id(object_), new_location, old_location, self.turn
+        )
+
+    def place_object(self, object_: "GameObject", coordinates: tuple) -> None:
+        """
+        Put an object on a square, sharing it with anything already there.
+        The object must not be on the board already; see move_object.
+        """
+        self._put(object_, coordinates)
+        self.visibility.object_added(object_)
+        if self.events.subscriptions:
+            self._publish_arrival(object_, coordinates)
+
+    def remove_object(self, object_: "GameObject") -> None:
+        """
+        Take an object off the board.
+        """
+        coordinates = object_.coordinates
+        remaining = [obj for obj in self.occupied_squares[coordinates] if obj is not object_]
+        self._set_square(coordinates, remaining)
+        self._removed(object_, coordinates)
+
+    def remove_objects(self, objects: Iterable["GameObject"]) -> None:
+        """
+        Take a batch of objects off the board, rewriting each square they leave only once.
+        """
+        leaving: Dict[tuple, List["GameObject"]] = {}
+        for object_ in objects:
+            leaving.setdefault(object_.coordinates, []).append(object_)
+        for coordinates, removed in leaving.items():
+            keys = set(map(id, removed))
+            remaining = [obj for obj in self.occupied_squares[coordinates] if id(obj) not in keys]
+            self._set_square(coordinates, remaining)
+            for object_ in removed:
+                self._removed(object_, coordinates)
+
+    def _set_square(self, coordinates: tuple, remaining: List["GameObject"]) -> None:
+        if remaining:
+            self.occupied_squares[coordinates] = remaining
         else:
-            self.logger.info(f"square{object_.coordinates} unoccupied, deleting key.")
-            del self.occupied_squares[object_.coordinates]
+            del self.occupied_squares[coordinates]
+            self._mark_unoccupied(coordinates)
+
+    def _removed(self, object_: "GameObject", coordinates: tuple) -> None:
+        """
+        Everything that follows an object leaving `coordinates` for good.
+        """
+        if isinstance(object_, Location):
+            self.update_danger(coordinates)
+        self.visibility.object_removed(object_)
+        if self.entity_store is not None:
+            self.entity_store.detach(object_)
+        self.events.publish(BoardEvent.LEAVE_SQUARE, object_, coordinates)
+        self.events.forget(object_)
+        self.journal.record(JournalEvent.OBJECT_REMOVED, id(object_), coordinates, None, self.turn)
+
+    def object_destroyed(self, object_: "GameObject") -> None:
+        """
+        Call when an object's hit points run out. It stays on the board until removed.
+        """
+        self.events.publish(BoardEvent.OBJECT_DESTROYED, object_, object_.coordinates)
+
+    def _publish_arrival(self, object_: "GameObject", coordinates: tuple) -> None:
+        events = self.events
+        events.publish(BoardEvent.ENTER_SQUARE, object_, coordinates)
+        if events.listening(BoardEvent.CO_LOCATION):
+            for other in list(self.occupied_squares[coordinates]):
+                if other is not object_:
+                    events.publish(BoardEvent.CO_LOCATION, object_, coordinates, other)
 
-        if new_location in self.occupied_squares.keys():
-            self.occupied_squares[new_location].append(object_)
+    def _put(self, object_: "GameObject", coordinates: tuple) -> None:
+        if coordinates in self.occupied_squares:
+            self.occupied_squares[coordinates].append(object_)
         else:
-            self.occupied_squares[new_location] = [object_]
+            self.occupied_squares[coordinates] = [object_]
+            self._mark_occupied(coordinates)
+
+        object_.coordinates = coordinates
+        if isinstance(object_, Location):
+            self.update_danger(coordinates)
+
+    def update_danger(self, coordinates: tuple) -> None:
+        """
+        Recompute the danger of a square. Call it after changing the danger of a location on it.
+        """
+        danger = max(
+            (
+                obj.danger
+                for obj in self.occupied_squares.get(coordinates, ())
+                if isinstance(obj, Location)
+            ),
+            default=0,
+        )
+        if danger == self.danger.get(coordinates, 0):
+            return
+        if danger:
+            self.danger[coordinates] = danger
+        else:
+            del self.danger[coordinates]
+        for watcher in self.danger_watchers:
+            watcher(coordinates)
+
+    def get_squares_in_radius(self, coordinates: tuple, radius: int) -> list:
+        """
+        Return the occupied squares within `radius` sectors of `coordinates`.
+        """
+        return list(self.spatial_index.query_radius(coordinates, radius))
+
+    def get_squares_in_rect(self, x_min: int, y_min: int, x_max: int, y_max: int) -> list:
+        """
+        Return the occupied squares inside the rectangle, edges included.
+        """
+        return list(self.spatial_index.query_rect(x_min, y_min, x_max, y_max))
+
+    def execute_action(self, action, args: Any = None, ship: Optional["Ship"] = None) -> bool:
+        """
+        Execute action for a ship on the board, the player's unless another `ship` is given.
+        Actions that need more information from the player (movement, self destruct confirmation)
+        prompt for it unless it is passed in `args`; other ships must always pass it.
+        The player's actions are timed and counted per action type and outcome; NPC actions are
+        counted per turn by the NPC scheduler.
+        """
+        if ship is not None and ship is not self.player:
+            return self._execute_action(action, args, ship)
+
+        action_metrics = self._action_metrics.get(action)
+        if action_metrics is None:
+            action_metrics = self._action_metrics[action] = (
+                self.metrics.histogram("action_seconds", action=action.name),
+                self.metrics.counter("actions_total", action=action.name, result="success"),
+                self.metrics.counter("actions_total", action=action.name, result="failure"),
+            )
+        timer, successes, failures = action_metrics
 
-        object_.coordinates = new_location
-        self.logger.info(f"Moved {object_.formal_name} to {object_.coordinates}")
+        start = perf_counter()
+        success = self._execute_action(action, args, self.player)
+        timer.observe(perf_counter() - start)
+        (successes if success else failures).inc()
+        return success
 
-    def execute_action(self, action) -> bool:
+    def execute_actions(self, commands: Iterable[Tuple["Ship", Any, Any]]) -> List[bool]:
         """
-        Execute action for an object on the board. 
+        Execute (ship, action, args) commands for many ships in one tick; returns whether each one
+        succeeded.  Moves are simultaneous: they are checked against the board together, and when
+        several end on the same square only the first command's ship gets there, the rest staying
+        put.  A ship moves at most once.  The other actions then run in the order given.
+        Every command must carry its args, and moves are not reported to the player.
         """
-        if action.value not in self.player.allowed_actions:
-            self.logger.debug(
-                f"{action.value} not in {self.player.name} action list.\n available actions:{self.actions}"
+        commands = list(commands)
+        results = [False] * len(commands)
+        moves = []
+        for index, (ship, action, args) in enumerate(commands):
+            if action == Actions.MOVE:
+                if Actions.MOVE.value in ship.allowed_actions:
+                    moves.append(index)
+                else:
+                    self.journal.record(
+                        JournalEvent.ACTION_NOT_ALLOWED, id(ship), None, action.value, self.turn
+                    )
+        if moves:
+            self._execute_moves(commands, moves, results)
+        for index, (ship, action, args) in enumerate(commands):
+            if action != Actions.MOVE:
+                results[index] = self.execute_action(action, args, ship)
+        return results
+
+    def _execute_moves(self, commands: list, moves: List[int], results: List[bool]) -> None:
+        starts = [commands[index][0].coordinates for index in moves]
+        steps = []
+        for index in moves:
+            direction, distance = commands[index][2]
+            steps.append((direction.value[0] * distance, direction.value[1] * distance))
+
+        if len(moves) >= NUMPY_MIN_MOVES and entity_store.numpy_available():
+            new_x, new_y, outcomes = entity_store.check_moves(
+                [start[0] for start in starts],
+                [start[1] for start in starts],
+                [step[0] for step in steps],
+                [step[1] for step in steps],
+                self.columns,
+                self.rows,
             )
+            targets = list(zip(new_x.tolist(), new_y.tolist()))
+            outcomes = outcomes.tolist()
+        else:
+            targets = [
+                (start[0] + step[0], start[1] + step[1]) for start, step in zip(starts, steps)
+            ]
+            outcomes = [
+                entity_store.MOVE_NEGATIVE if x < 0 or y < 0
+                else entity_store.MOVE_OUT_OF_RANGE if x > self.columns or y > self.rows
+                else entity_store.MOVE_OK
+                for x, y in targets
+            ]
+
+        journal = self.journal
+        turn = self.turn
+        claimed = set()
+        moved = set()
+        for index, start, target, outcome in zip(moves, starts, targets, outcomes):
+            if outcome == entity_store.MOVE_NEGATIVE:
+                journal.record(JournalEvent.MOVE_NEGATIVE, None, target, start, turn)
+                continue
+            if outcome == entity_store.MOVE_OUT_OF_RANGE:
+                journal.record(JournalEvent.MOVE_OUT_OF_RANGE, None, target, start, turn)
+                continue
+            ship = commands[index][0]
+            if target in claimed or id(ship) in moved:
+                journal.record(JournalEvent.MOVE_CONFLICT, id(ship), target, start, turn)
+                continue
+            claimed.add(target)
+            moved.add(id(ship))
+            journal.record(JournalEvent.MOVE_VALIDATED, None, target, start, turn)
+            self.move_object(ship, target)
+            results[index] = True
+
+    def _execute_action(self, action, args: Any, ship: "Ship") -> bool:
+        if action.value not in ship.allowed_actions:
+            self.journal.record(JournalEvent.ACTION_NOT_ALLOWED, id(ship), None, action.value, self.turn)
             return False
 
+        # only what the player does is reported to the player
+        report = self.render and ship is self.player
         if action == Actions.SENSORS:
-            self.player.scan(self.occupied_squares)
+            if report:
+                ship.scan(self)
         elif action == Actions.MOVE:
-            requested_movement = utils.ask_user_how_to_move(self.player)
+            if args is None:
+                requested_movement = utils.ask_user_how_to_move(ship)
+            else:
+                requested_movement = args
             movement = self.calculate_updated_location_and_validate(
-                self.player.coordinates, requested_movement
+                ship.coordinates, requested_movement
             )
             if not movement:
-                out = random.choice(
-                    PHRASES[PhraseType.ACTION_REPLY.value]["movement_failure"]
-                ).format(
-                    requested_movement[0].name,
-                    requested_movement[1],
-                    self.player.coordinates,
-                )
-                utils.print_output(out)
+                if report:
+                    out = utils.get_phrase_table().render(
+                        phrases.MOVEMENT_FAILURE,
+                        (requested_movement[0].name, requested_movement[1], ship.coordinates),
+                    )
+                    self.output(out)
                 return False
-            self.move_object(self.player, movement)
-            out = random.choice(
-                PHRASES[PhraseType.ACTION_REPLY.value]["movement_success"]
-            ).format(self.player.formal_name, self.player.coordinates)
-            utils.print_output(out)
+            self.move_object(ship, movement)
+            if report:
+                out = utils.get_phrase_table().render(
+                    phrases.MOVEMENT_SUCCESS, (ship.formal_name, ship.coordinates)
+                )
+                self.output(out)
         elif action == Actions.SELF_DESTRUCT:
-            self.player.self_destruct()
+            output = self.output if report else null_sink
+            ship.self_destruct(confirmed=args, output=output)
+            if ship.hit_points <= 0:
+                self.object_destroyed(ship)
 
         return True
 
 
+# Interned templates, so every object built from equal configuration shares one template instance.
+_TEMPLATES: dict = {}
+
+
+def shared_template(template: tuple) -> tuple:
+    """
+    Return the shared instance equal to `template`, registering it if it is new.
+    """
+    return _TEMPLATES.setdefault(template, template)
+
+
+class ShipTemplate(NamedTuple):
+    """
+    Immutable configuration shared by every ship of one type (a flyweight).
+    The numbers are starting values; each ship keeps its own copy of them as they change.
+    """
+
+    name: str = ""
+    formal_name: str = ""
+    phrase_key: str = ""
+    actions: tuple = ()
+    rules: tuple = ()
+    alliances: tuple = ()
+    nicknames: tuple = ()
+    hit_points: int = 1
+    scan_radius: int = 0
+    movement_speed: int = 0
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "ShipTemplate":
+        """
+        Build the shared template for a ship definition from ships.toml.
+        """
+        return shared_template(
+            cls(
+                name=config["name"],
+                formal_name=config["formal_name"],
+                phrase_key=config["phrase_key"],
+                actions=tuple(config["actions"]),
+                rules=tuple(config["rules"]),
+                alliances=tuple(config["alliances"]),
+                nicknames=tuple(config["nicknames"]),
+                hit_points=config["hit_points"],
+                scan_radius=config["scan_radius"],
+                movement_speed=config["movement_speed"],
+            )
+        )
+
+
+class LocationTemplate(NamedTuple):
+    """
+    Immutable configuration shared by every location of one type (a flyweight).
+    """
+
+    name: str = ""
+    formal_name: str = ""
+    phrase_key: str = ""
+    rules: tuple = ()
+    alliances: tuple = ()
+    hit_points: int = 1000
+    danger: float = 0
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "LocationTemplate":
+        """
+        Build the shared template for a location definition from locations.toml.
+        """
+        return shared_template(
+            cls(
+                name=config["name"],
+                formal_name=config["formal_name"],
+                phrase_key=config["phrase_key"],
+                rules=tuple(config.get("rules", ())),
+                alliances=tuple(config.get("alliances", ())),
+                hit_points=config.get("hit_points", 1000),
+                danger=config.get("danger", 0),
+            )
+        )
+
+
+def _template_attribute(field: str) -> property:
+    """
+    Property that reads from the object's shared template.
+    Setting it gives this object its own (also shared) template with the field changed.
+    """
+
+    def getter(self):
+        return getattr(self._template, field)
+
+    def setter(self, value):
+        self._template = shared_template(self._template._replace(**{field: value}))
+
+    return property(getter, setter)
+
+
+def _stored_attribute(name: str) -> property:
+    """
+    Property that reads and writes through to the board's entity store while the object is attached to one.
+    """
+    column = STORE_COLUMNS[name][0]
+    private_name = "_" + name
+
+    def getter(self):
+        if self._store is not None:
+            return getattr(self._store, column)[self._store_index].item()
+        return getattr(self, private_name)
+
+    def setter(self, value):
+        if self._store is not None:
+            getattr(self._store, column)[self._store_index] = value
+        else:
+            setattr(self, private_name, value)
+
+    return property(getter, setter)
+
+
 class GameObject(object):
     """
     Base class of objects that will be placed on the board
+    Objects are slotted: everything that is the same for every object of a type lives in a
+    shared template, and the object itself only holds what changes during the game.
     """
 
-    def __init__(
-        self,
-        coordinates: tuple = (0, 0),
-        phrase_key: str = "",
-        name: str = "",
-        formal_name: str = "",
-        rules: tuple = (),
-    ):
+    # _store and _store_index are set by EntityStore.attach when the board keeps this object's
+    # state in columnar storage.
+    __slots__ = ("_template", "_coordinates", "_store", "_store_index")
+
+    name = _template_attribute("name")
+    formal_name = _template_attribute("formal_name")
+    phrase_key = _template_attribute("phrase_key")
+    rules = _template_attribute("rules")
+    alliances = _template_attribute("alliances")
+
+    def __init__(self, template: tuple, coordinates: tuple = (0, 0)):
+        self._store: Optional[EntityStore] = None
+        self._store_index = -1
+        self._template = template
         self.coordinates = coordinates
-        self.phrase_key = phrase_key
-        self.name = name
-        self.formal_name = formal_name
+
+    @property
+    def template(self) -> tuple:
+        return self._template
+
+    @property
+    def coordinates(self) -> tuple:
+        if self._store is not None:
+            return (int(self._store.x[self._store_index]), int(self._store.y[self._store_index]))
+        return self._coordinates
+
+    @coordinates.setter
+    def coordinates(self, value: tuple) -> None:
+        if self._store is not None:
+            self._store.x[self._store_index] = value[0]
+            self._store.y[self._store_index] = value[1]
+        else:
+            self._coordinates = value
 
 
 class Ship(GameObject):
@@ -287,6 +790,14 @@ class Ship(GameObject):
     Ships don't like their hit points being below zero.
     """
 
+    __slots__ = ("_hit_points", "_scan_radius", "_movement_speed")
+
+    hit_points = _stored_attribute("hit_points")
+    scan_radius = _stored_attribute("scan_radius")
+    movement_speed = _stored_attribute("movement_speed")
+    allowed_actions = _template_attribute("actions")
+    nicknames = _template_attribute("nicknames")
+
     def __init__(
         self,
         hit_points: int = 1,
@@ -299,41 +810,45 @@ class Ship(GameObject):
         rules: tuple = (),
         alliances: tuple = (),
         nicknames: tuple = (),
+        template: Optional[ShipTemplate] = None,
     ):
+        if template is None:
+            template = ShipTemplate(
+                name=name,
+                formal_name=formal_name,
+                phrase_key=phrase_key,
+                actions=tuple(actions),
+                rules=tuple(rules),
+                alliances=tuple(alliances),
+                nicknames=tuple(nicknames),
+                hit_points=hit_points,
+                scan_radius=scan_radius,
+                movement_speed=movement_speed,
+            )
+
+        super().__init__(shared_template(template))
         self.hit_points = hit_points
-        self.allowed_actions = actions
         self.scan_radius = scan_radius
         self.movement_speed = movement_speed
-        self.alliances = alliances
-        self.nicknames = nicknames
 
-        super().__init__(
-            self, name=name, formal_name=formal_name, phrase_key=phrase_key, rules=rules
+    @classmethod
+    def from_template(cls, template: ShipTemplate) -> "Ship":
+        """
+        New ship of a template's type, starting with the template's numbers.
+        """
+        return cls(
+            hit_points=template.hit_points,
+            scan_radius=template.scan_radius,
+            movement_speed=template.movement_speed,
+            template=template,
         )
 
-        self.logger = logging.getLogger(f"Ship - {self.formal_name}")
-
-    def scan(self, occupied_sectors: dict) -> None:
+    def scan(self, board: GameBoard) -> None:
         """
         Print information about nearby objects.
         """
-        def _get_scannable_sectors(location: tuple, radius: int) -> set:
-
-            """
-            Return a set of all coordinates in the scan radius of the ship.
-            Makes no attempt to determine if they are on the board.
-            """
-
-            xcoord = location[0]
-            ycoord = location[1]
-
-            scannable_sectors = set()
-
-            for x in range((xcoord - radius), (xcoord + radius + 1)):
-                for y in range((ycoord - radius), (ycoord + radius + 1)):
-                    scannable_sectors.add((x, y))
-
-            return scannable_sectors
+        if not board.render:
+            return None
 
         def _get_distance_between_squares(loc1: tuple, loc2: tuple) -> int:
             """
@@ -345,27 +860,38 @@ class Ship(GameObject):
 
             return max(d1, d2)
 
-        scannable_sectors = _get_scannable_sectors(self.coordinates, self.scan_radius)
-        occupied_coordinates = set(occupied_sectors.keys())
-        scanned = scannable_sectors.intersection(occupied_coordinates)
-        for sq in scanned:
-            objects = occupied_sectors[sq]
-            for obj in objects:
-                pk = obj.phrase_key
-                distance = _get_distance_between_squares(self.coordinates, sq)
-                if pk != "player":
-                    out = random.choice(PHRASES["detection"][pk])
-                    out = out + " This object is {} sectors from here.".format(distance)
-                    utils.print_output(out.format(obj.formal_name))
+        if board.chunks is not None:
+            board.chunks.load_area(self.coordinates, self.scan_radius)
+        table = utils.get_phrase_table()
+        # kept up to date by the board as things move, so there is nothing to search
+        for obj in board.visibility.visible(self):
+            pk = obj.phrase_key
+            if pk != "player":
+                distance = _get_distance_between_squares(self.coordinates, obj.coordinates)
+                out = table.render(phrases.phrase_id(PhraseType.DETECTION, pk), (obj.formal_name,))
+                board.output(out + " This object is %d sectors from here." % distance)
 
         return None
 
-    def self_destruct(self) -> None:
+    def self_destruct(
+        self,
+        confirmed: Optional[bool] = None,
+        output: Callable[[Union[str, list]], None] = utils.print_output,
+    ) -> None:
         """
         Destroys the ship.  If this is the player this ends the game.
+        Asks the player to confirm unless the confirmation is passed in.
         """
 
-        utils.print_output(
+        if confirmed is not None:
+            if confirmed:
+                output(PHRASES[PhraseType.COMMAND_REPLY.value]["self_destruct_confirm"])
+                self.hit_points = -1
+            else:
+                output(PHRASES[PhraseType.COMMAND_REPLY.value]["self_destruct_abort"])
+            return None
+
+        output(
             random.choice(PHRASES[PhraseType.ACTION_REPLY.value]["self_destruct_start"])
         )
         self_destruct_confirm = PHRASES[PhraseType.SPECIAL.value]["self_destruct_confirm"]
@@ -375,26 +901,13 @@ class Ship(GameObject):
         )
         prompt = prompt.format(self_destruct_confirm, self_destruct_abort)
 
-        final_confirmation = False
-        while not final_confirmation:
+        while True:
             response = utils.user_input_prompt(prompt)
-            if response == self_destruct_abort:
-                utils.print_output(
-                    PHRASES[PhraseType.COMMAND_REPLY.value]["self_destruct_abort"]
-                )
-                final_confirmation = True
-            elif response == self_destruct_confirm:
-                utils.print_output(
-                    PHRASES[PhraseType.COMMAND_REPLY.value]["self_destruct_confirm"]
-                )
-                self.hit_points = -1
-                final_confirmation = True
-            else:
-                utils.print_output(
-                    PHRASES[PhraseType.COMMAND_REPLY.value]["self_destruct_fail"]
+            if response in (self_destruct_confirm, self_destruct_abort):
+                return self.self_destruct(
+                    confirmed=response == self_destruct_confirm, output=output
                 )
-
-        return None
+            output(PHRASES[PhraseType.COMMAND_REPLY.value]["self_destruct_fail"])
 
 
 class Location(GameObject):
@@ -403,6 +916,11 @@ class Location(GameObject):
     Locations can be dangerous, which is the probablity the game ends if a player is there.
     """
 
+    __slots__ = ("_hit_points", "_danger")
+
+    hit_points = _stored_attribute("hit_points")
+    danger = _stored_attribute("danger")
+
     def __init__(
         self,
         hit_points: int = 1000,
@@ -413,16 +931,26 @@ class Location(GameObject):
         coordinates: tuple = (0, 0),
         rules: tuple = (),
         alliances: tuple = (),
+        template: Optional[LocationTemplate] = None,
     ):
+        if template is None:
+            template = LocationTemplate(
+                name=name,
+                formal_name=formal_name,
+                phrase_key=phrase_key,
+                rules=tuple(rules),
+                alliances=tuple(alliances),
+                hit_points=hit_points,
+                danger=danger,
+            )
 
+        super().__init__(shared_template(template), coordinates)
         self.hit_points = hit_points
         self.danger = danger
-        self.alliances = alliances
-
-        super().__init__(
-            self,
-            phrase_key=phrase_key,
-            name=name,
-            formal_name=formal_name,
-            rules=rules,
-        )
+
+    @classmethod
+    def from_template(cls, template: LocationTemplate) -> "Location":
+        """
+        New location of a template's type, starting with the template's numbers.
+        """
+        return cls(hit_points=template.hit_points, danger=template.danger, template=template)
@@ -0,0 +1,323 @@
+"""
+pathfinding.py
+Routing ships across the board around hazards.
+
+A ship moves in one of the eight Directions, up to its movement_speed squares per turn, and
+lands on the square at the end of the move.  Entering a square costs one turn plus
+`danger_weight` times the danger of the locations on it, so routes avoid hazards when a
+detour is cheap enough.
+
+PathFinder answers two kinds of question:
+- find_path() runs A* for one ship going somewhere once.
+- field() builds a DistanceField towards a target that many ships share, such as the
+  destination planet: the cost from every square, so each ship's next move is a lookup.
+
+Fields are cached per (target, speed).  When a location arrives, leaves or changes its danger,
+the board tells the PathFinder, and every cached field is repaired around the changed square
+instead of being rebuilt.  Ask field() for a field each time rather than keeping one: a field
+dropped from the cache is no longer repaired.
+"""
+# Python standard library
+import heapq
+import math
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Local modules
+from enums import Directions
+
+# Extra cost of entering a square with a fully dangerous location (danger 1), in turns.
+DEFAULT_DANGER_WEIGHT = 10.0
+# Distance fields kept per PathFinder, least recently used dropped first.
+DEFAULT_MAX_FIELDS = 16
+# Fields cover the whole board, so bigger boards only use A*.
+MAX_FIELD_SQUARES = 250_000
+
+# (direction, distance) of one move
+Move = Tuple[Directions, int]
+
+_STEPS = tuple((direction, direction.value[0], direction.value[1]) for direction in Directions)
+_INFINITY = math.inf
+# slack when comparing sums of float costs
+_EPSILON = 1e-9
+
+
+class PathFinder(object):
+    """
+    Paths and shared distance fields over one board.
+    """
+
+    def __init__(
+        self,
+        board,
+        danger_weight: float = DEFAULT_DANGER_WEIGHT,
+        max_fields: int = DEFAULT_MAX_FIELDS,
+    ):
+        self.board = board
+        self.danger_weight = danger_weight
+        self.max_fields = max_fields
+        self.width = board.columns + 1
+        self.height = board.rows + 1
+        # danger by cell as of the last change applied to the fields
+        self._danger: Dict[int, float] = {
+            self._cell(square): danger
+            for square, danger in board.danger.items()
+            if self._on_board(square)
+        }
+        # squares whose danger changed since the fields were last repaired
+        self._pending: List[tuple] = []
+        self._fields: "OrderedDict[Tuple[tuple, int], DistanceField]" = OrderedDict()
+        board.danger_watchers.append(self._pending.append)
+
+    def _cell(self, square: tuple) -> int:
+        return square[1] * self.width + square[0]
+
+    def _on_board(self, square: tuple) -> bool:
+        return 0 <= square[0] < self.width and 0 <= square[1] < self.height
+
+    def step_cost(self, square: tuple) -> float:
+        """
+        Cost of a move that ends on `square`.
+        """
+        return 1.0 + self.danger_weight * self.board.danger.get(square, 0)
+
+    def _cost(self, cell: int) -> float:
+        return 1.0 + self.danger_weight * self._danger.get(cell, 0)
+
+    def _moves(self, cell: int, speed: int):
+        """
+        Yield (cell reached, direction, distance) for every move from `cell`.
+        Moves are reversible, so these are also the cells a move into `cell` can start from.
+        """
+        x, y = cell % self.width, cell // self.width
+        width, height = self.width, self.height
+        for direction, dx, dy in _STEPS:
+            for distance in range(1, speed + 1):
+                nx, ny = x + dx * distance, y + dy * distance
+                if not (0 <= nx < width and 0 <= ny < height):
+                    break
+                yield ny * width + nx, direction, distance
+
+    def find_path(self, start: tuple, goal: tuple, speed: int) -> Optional[List[Move]]:
+        """
+        Cheapest list of moves from `start` to `goal`, or None if there is none.
+        """
+        if speed < 1 or not (self._on_board(start) and self._on_board(goal)):
+            return None
+        self._apply_pending()
+        start_cell, goal_cell = self._cell(start), self._cell(goal)
+        gx, gy = goal
+
+        def estimate(cell: int) -> float:
+            # every move costs at least 1 and covers at most `speed` squares
+            x, y = cell % self.width, cell // self.width
+            return float(-(-max(abs(x - gx), abs(y - gy)) // speed))
+
+        best = {start_cell: 0.0}
+        came_from: Dict[int, Tuple[int, Directions, int]] = {}
+        frontier = [(estimate(start_cell), 0.0, start_cell)]
+        while frontier:
+            _, cost, cell = heapq.heappop(frontier)
+            if cell == goal_cell:
+                break
+            if cost > best[cell]:
+                continue
+            for next_cell, direction, distance in self._moves(cell, speed):
+                next_cost = cost + self._cost(next_cell)
+                if next_cost < best.get(next_cell, _INFINITY):
+                    best[next_cell] = next_cost
+                    came_from[next_cell] = (cell, direction, distance)
+                    estimated = next_cost + estimate(next_cell)
+                    heapq.heappush(frontier, (estimated, next_cost, next_cell))
+        else:
+            return None
+
+        path: List[Move] = []
+        cell = goal_cell
+        while cell != start_cell:
+            cell, direction, distance = came_from[cell]
+            path.append((direction, distance))
+        path.reverse()
+        return path
+
+    def field(self, target: tuple, speed: int) -> Optional["DistanceField"]:
+        """
+        Shared distance field towards `target` for ships of `speed`, built on first use.
+        None if the board is too big for fields.
+        """
+        if self.width * self.height > MAX_FIELD_SQUARES:
+            return None
+        if speed < 1 or not self._on_board(target):
+            return None
+        self._apply_pending()
+        key = (tuple(target), speed)
+        field = self._fields.get(key)
+        if field is None:
+            field = DistanceField(self, target, speed)
+            self._fields[key] = field
+            if len(self._fields) > self.max_fields:
+                self._fields.popitem(last=False)
+        else:
+            self._fields.move_to_end(key)
+        return field
+
+    def next_move(self, start: tuple, target: tuple, speed: int) -> Optional[Move]:
+        """
+        First move of the cheapest route from `start` to `target`, from the shared field when
+        the board allows one. None when already there or the target cannot be reached.
+        """
+        field = self.field(target, speed)
+        if field is not None:
+            return field.next_move(start)
+        path = self.find_path(start, target, speed)
+        return path[0] if path else None
+
+    def _apply_pending(self) -> None:
+        """
+        Bring every cached field up to date with the danger changes reported by the board.
+        """
+        changes = self._pending[:]
+        del self._pending[:]
+        for square in changes:
+            if not self._on_board(square):
+                continue
+            cell = self._cell(square)
+            old_cost = self._cost(cell)
+            danger = self.board.danger.get(square, 0)
+            if danger:
+                self._danger[cell] = danger
+            else:
+                self._danger.pop(cell, None)
+            new_cost = self._cost(cell)
+            if new_cost == old_cost:
+                continue
+            for field in self._fields.values():
+                if new_cost < old_cost:
+                    field._cost_decreased(cell, new_cost)
+                else:
+                    field._cost_increased(cell, old_cost)
+
+
+class DistanceField(object):
+    """
+    Cost of the cheapest route to one target from every square, for ships of one speed.
+    """
+
+    def __init__(self, finder: PathFinder, target: tuple, speed: int):
+        self.finder = finder
+        self.target = tuple(target)
+        self.speed = speed
+        self._target_cell = finder._cell(target)
+        self.costs: List[float] = [_INFINITY] * (finder.width * finder.height)
+        self.costs[self._target_cell] = 0.0
+        self._propagate([(0.0, self._target_cell)])
+
+    def _propagate(self, frontier: List[Tuple[float, int]], within: Optional[set] = None) -> None:
+        """
+        Dijkstra outwards from `frontier`, lowering costs. With `within`, only those cells change.
+        """
+        costs = self.costs
+        finder = self.finder
+        speed = self.speed
+        heapq.heapify(frontier)
+        while frontier:
+            cost, cell = heapq.heappop(frontier)
+            if cost > costs[cell]:
+                continue
+            # a move from `previous` into `cell` costs what entering `cell` costs
+            through = cost + finder._cost(cell)
+            for previous, _, _ in finder._moves(cell, speed):
+                if through < costs[previous] - _EPSILON and (within is None or previous in within):
+                    costs[previous] = through
+                    heapq.heappush(frontier, (through, previous))
+
+    def _cost_decreased(self, cell: int, new_cost: float) -> None:
+        # cheaper to enter `cell`: only routes into it can improve, and from there outwards
+        if self.costs[cell] == _INFINITY:
+            return
+        self._propagate([(self.costs[cell], cell)])
+
+    def _cost_increased(self, cell: int, old_cost: float) -> None:
+        # dearer to enter `cell`: squares whose every best route went through it are recomputed
+        costs = self.costs
+        finder = self.finder
+        speed = self.speed
+        if costs[cell] == _INFINITY:
+            return
+
+        # Visit candidates cheapest first, so whether the squares they lead to are affected is
+        # already known. A candidate with another best move that avoids them is unaffected.
+        affected = set()
+        candidates = [
+            (costs[previous], previous)
+            for previous, _, _ in finder._moves(cell, speed)
+            if abs(costs[previous] - costs[cell] - old_cost) <= _EPSILON
+        ]
+        heapq.heapify(candidates)
+        seen = set()
+        while candidates:
+            cost, current = heapq.heappop(candidates)
+            if current in seen or current == self._target_cell:
+                continue
+            seen.add(current)
+            if any(
+                next_cell not in affected
+                and abs(costs[next_cell] + finder._cost(next_cell) - cost) <= _EPSILON
+                for next_cell, _, _ in finder._moves(current, speed)
+            ):
+                continue
+            affected.add(current)
+            through = cost + finder._cost(current)
+            for previous, _, _ in finder._moves(current, speed):
+                if previous not in seen and abs(costs[previous] - through) <= _EPSILON:
+                    heapq.heappush(candidates, (costs[previous], previous))
+
+        for previous in affected:
+            costs[previous] = _INFINITY
+        frontier = []
+        for previous in affected:
+            best = _INFINITY
+            for next_cell, _, _ in finder._moves(previous, speed):
+                if next_cell not in affected:
+                    best = min(best, costs[next_cell] + finder._cost(next_cell))
+            if best < _INFINITY:
+                costs[previous] = best
+                frontier.append((best, previous))
+        self._propagate(frontier, within=affected)
+
+    def cost(self, square: tuple) -> float:
+        """
+        Cost of the cheapest route from `square` to the target (inf if unreachable).
+        """
+        self.finder._apply_pending()
+        return self.costs[self.finder._cell(square)]
+
+    def next_move(self, square: tuple) -> Optional[Move]:
+        """
+        The move to make from `square`, or None at the target or when it cannot be reached.
+        """
+        finder = self.finder
+        finder._apply_pending()
+        cell = finder._cell(square)
+        if cell == self._target_cell or self.costs[cell] == _INFINITY:
+            return None
+        best, move = _INFINITY, None
+        for next_cell, direction, distance in finder._moves(cell, self.speed):
+            cost = self.costs[next_cell] + finder._cost(next_cell)
+            if cost < best - _EPSILON:
+                best, move = cost, (direction, distance)
+        return move
+
+    def path(self, square: tuple) -> List[Move]:
+        """
+        Every move from `square` to the target, following the field.
+        """
+        moves: List[Move] = []
+        x, y = square
+        move = self.next_move((x, y))
+        while move is not None:
+            (dx, dy), distance = move[0].value, move[1]
+            x, y = x + dx * distance, y + dy * distance
+            moves.append(move)
+            move = self.next_move((x, y))
+        return moves
@@ -0,0 +1,171 @@
+"""
+phrases.py
+Compiled phrase tables.
+
+The phrase file is compiled once, when the resource bundle is built, into a PhraseTable.
+Every (PhraseType, key) pair gets a small integer id, so the engine finds a phrase's variants
+with one lookup instead of a chain of dictionary lookups on strings.  Each template is parsed
+once into its literal and field segments and stored as a printf-style pattern, so rendering
+a message is a single `%` in C: no parsing of the template happens while the game runs.
+
+The table is part of the cached bundle, so worker processes load it ready-made (or share the
+parent's copy when forked), and use_bundle() can swap in another language.
+
+    line = utils.get_phrase_table().render_line(phrases.ACTION_SUCCESS, (name, action))
+"""
+# Python standard library
+import random
+from string import Formatter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Local modules
+from enums import PhraseType
+
+# (PhraseType, key) -> id. Ids belong to the process, so every table loaded in it agrees on them.
+_IDS: Dict[Tuple[PhraseType, str], int] = {}
+
+
+def phrase_id(phrase_type: PhraseType, key: str) -> int:
+    """
+    Integer id of a phrase, registering the pair if it has not been seen yet.
+    """
+    id_ = _IDS.get((phrase_type, key))
+    if id_ is None:
+        id_ = _IDS[(phrase_type, key)] = len(_IDS)
+    return id_
+
+
+class PhraseTemplate(object):
+    """
+    One phrase, pre-parsed. `fields` is the number of positional fields it takes.
+    """
+
+    __slots__ = ("text", "fields", "printf", "printf_line", "line")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.line = text if text.endswith("\n") else text + "\n"
+        self.fields = 0
+        pattern: Optional[List[str]] = []
+        for literal, field_name, spec, conversion in Formatter().parse(text):
+            if pattern is not None:
+                pattern.append(literal.replace("%", "%%"))
+            if field_name is None:
+                continue
+            # Only plain positional fields ({}, {0}, {!r}) are turned into a printf pattern.
+            # Anything else is rendered with str.format, which is still correct, just slower.
+            if spec or conversion not in (None, "s", "r") or field_name not in ("", str(self.fields)):
+                pattern = None
+            elif pattern is not None:
+                pattern.append("%r" if conversion == "r" else "%s")
+            self.fields += 1
+
+        self.printf = "".join(pattern) if pattern is not None else None
+        self.printf_line = None
+        if self.printf is not None:
+            self.printf_line = self.printf if self.line == self.text else self.printf + "\n"
+
+    def render(self, args: Sequence = ()) -> str:
+        if not self.fields:
+            return self.text
+        if self.printf is not None and len(args) == self.fields:
+            return self.printf % tuple(args)
+        return self.text.format(*args)
+
+    def render_line(self, args: Sequence = ()) -> str:
+        """
+        render() with a newline at the end, as every message shown to the player has.
+        """
+        if not self.fields:
+            return self.line
+        if self.printf_line is not None and len(args) == self.fields:
+            return self.printf_line % tuple(args)
+        return self.line.format(*args)
+
+
+def _variants(value) -> Tuple[PhraseTemplate, ...]:
+    if isinstance(value, str):
+        return (PhraseTemplate(value),)
+    return tuple(PhraseTemplate(v) for v in value if isinstance(v, str))
+
+
+class PhraseTable(object):
+    """
+    Every phrase of one language, indexed by phrase id.
+    """
+
+    def __init__(self, phrases: Dict[str, dict]):
+        self._entries: Dict[int, Tuple[PhraseTemplate, ...]] = {}
+        self._source: Dict[Tuple[PhraseType, str], Tuple[PhraseTemplate, ...]] = {}
+        for phrase_type in PhraseType:
+            for key, value in phrases.get(phrase_type.value, {}).items():
+                self._add(phrase_type, key, _variants(value))
+
+    def _add(self, phrase_type: PhraseType, key: str, variants: Tuple[PhraseTemplate, ...]) -> None:
+        self._source[(phrase_type, key)] = variants
+        if variants:
+            self._entries[phrase_id(phrase_type, key)] = variants
+
+    # Ids are per process, so a pickled table carries its keys and is re-indexed when loaded.
+    def __getstate__(self) -> dict:
+        return {"source": self._source}
+
+    def __setstate__(self, state: dict) -> None:
+        self._entries = {}
+        self._source = {}
+        for (phrase_type, key), variants in state["source"].items():
+            self._add(phrase_type, key, variants)
+
+    def __contains__(self, id_: int) -> bool:
+        return id_ in self._entries
+
+    def keys(self) -> Iterable[Tuple[PhraseType, str]]:
+        return self._source.keys()
+
+    def variants(self, id_: int) -> Tuple[PhraseTemplate, ...]:
+        try:
+            return self._entries[id_]
+        except KeyError:
+            raise KeyError(f"No phrase with id {id_} in this table") from None
+
+    def pick(self, id_: int, rng=random) -> PhraseTemplate:
+        """
+        One variant of a phrase, chosen at random when there are several.
+        """
+        variants = self.variants(id_)
+        if len(variants) == 1:
+            return variants[0]
+        return variants[int(rng.random() * len(variants))]
+
+    def render(self, id_: int, args: Sequence = (), rng=random) -> str:
+        return self.pick(id_, rng).render(args)
+
+    def render_line(self, id_: int, args: Sequence = (), rng=random) -> str:
+        return self.pick(id_, rng).render_line(args)
+
+
+# Ids of the phrases the engine asks for by name. Discovery and detection phrases are looked up
+# by the phrase_key of the object concerned, with phrase_id().
+DEFAULT_PROMPT = phrase_id(PhraseType.USER_PROMPT, "default_prompt")
+MOVEMENT_DIRECTION_QUERY = phrase_id(PhraseType.USER_PROMPT, "movement_direction_query")
+MOVEMENT_SPEED_QUERY = phrase_id(PhraseType.USER_PROMPT, "movement_speed_query")
+SELF_DESTRUCT_CONFIRMATION = phrase_id(PhraseType.USER_PROMPT, "self_destruct_confirmation")
+COMMAND_PARSE_FAIL = phrase_id(PhraseType.COMMAND_REPLY, "command_parse_fail")
+COMMAND_PARSE_SUCCESS = phrase_id(PhraseType.COMMAND_REPLY, "command_parse_success")
+DIRECTION_PARSE_FAIL = phrase_id(PhraseType.COMMAND_REPLY, "direction_parse_fail")
+DIRECTION_PARSE_SUCCESS = phrase_id(PhraseType.COMMAND_REPLY, "direction_parse_success")
+SPEED_PARSE_FAIL = phrase_id(PhraseType.COMMAND_REPLY, "speed_parse_fail")
+SPEED_PARSE_SUCCESS = phrase_id(PhraseType.COMMAND_REPLY, "speed_parse_success")
+SELF_DESTRUCT_FAIL = phrase_id(PhraseType.COMMAND_REPLY, "self_destruct_fail")
+SELF_DESTRUCT_CONFIRMED = phrase_id(PhraseType.COMMAND_REPLY, "self_destruct_confirm")
+SELF_DESTRUCT_ABORTED = phrase_id(PhraseType.COMMAND_REPLY, "self_destruct_abort")
+ACTION_SUCCESS = phrase_id(PhraseType.ACTION_REPLY, "action_success")
+ACTION_FAILURE = phrase_id(PhraseType.ACTION_REPLY, "action_failure")
+MOVEMENT_SUCCESS = phrase_id(PhraseType.ACTION_REPLY, "movement_success")
+MOVEMENT_FAILURE = phrase_id(PhraseType.ACTION_REPLY, "movement_failure")
+SELF_DESTRUCT_START = phrase_id(PhraseType.ACTION_REPLY, "self_destruct_start")
+COMBAT_HIT = phrase_id(PhraseType.ACTION_REPLY, "combat_hit")
+COMBAT_DESTROYED = phrase_id(PhraseType.ACTION_REPLY, "combat_destroyed")
+GAME_OVER_VICTORY = phrase_id(PhraseType.GAME_OVER, "game_over_victory")
+GAME_OVER_PLAYER_DESTROYED = phrase_id(PhraseType.GAME_OVER, "game_over_player_destroyed")
+GAME_OVER_OBJECTIVE_DESTROYED = phrase_id(PhraseType.GAME_OVER, "game_over_objective_destroyed")
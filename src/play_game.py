@@ -5,32 +5,38 @@ Keeps track of the game's state and takes user inputs
 
 """
 # system python
+import argparse
+import contextlib
 import random
+from pathlib import Path
+from typing import Optional
 
 # third-party python
 
 # local packages
-from enums import GameState, PhraseType
-from objects import Game
+from engine import GameSession
+from enums import PhraseType
+import metrics
+from replay import Recording
 import utils
 
 
 PHRASES = utils.PHRASES
-CONFIG = utils.CONFIG
 
 
-def start_new_game(config: dict) -> Game:
+def start_new_game(config: dict) -> GameSession:
 
     utils.print_output(PHRASES[PhraseType.SPECIAL.value]["new_game_start"])
-    game = Game(config)
-    return game
+    session = GameSession(config)
+    return session
 
 
-def play_game() -> None:
+def play_game(record_path: Optional[Path] = None) -> None:
 
     inp = utils.user_input_prompt(PHRASES[PhraseType.SPECIAL.value]["new_game_prompt"])
     if utils.check_for_affirmative(inp):
-        game = start_new_game(CONFIG)
+        session = start_new_game(utils.get_config())
+        game = session.game
         inp = utils.user_input_prompt(
             random.choice(PHRASES[PhraseType.SPECIAL.value]["game_ready"]).format(
                 game.board.player.formal_name
@@ -42,77 +48,46 @@ def play_game() -> None:
                     game.board.player.allowed_actions
                 )
             )
-        game.gamestate = GameState.RUNNING
 
-        successful_last_action = False
-        while game.gamestate == GameState.RUNNING:
-
-            # If a player's input did not result in a successful action, do not trigger new events
-            if successful_last_action:
-
-                if game.board.player.hit_points <= 0:
-                    game.gamestate = GameState.GAME_OVER_PLAYER_DESTROYED
-                    break
-
-                # Check what other objects are in the same location as the player's object
-                occupants = game.board.occupied_squares[game.board.player.coordinates]
-                # shared_occupants will always contain at least the player
-                if len(occupants) > 1:
-                    for occupant in occupants:
-                        if occupant.phrase_key != "player":
-                            out = random.choice(
-                                PHRASES[PhraseType.DISCOVERY.value][occupant.phrase_key]
-                            ).format(occupant.formal_name)
-                            utils.print_output(out)
-
-                game.logger.debug("If there was a combat module it would go here.")
-                successful_last_action = False
-
-            prompt = random.choice(PHRASES[PhraseType.USER_PROMPT.value]["default_prompt"])
-            inp = utils.user_input_prompt(prompt)
-
-            action = utils.check_for_action(inp)
-
-            if not action:
-                out = random.choice(
-                    PHRASES[PhraseType.COMMAND_REPLY.value]["command_parse_fail"]
-                )
-                utils.print_output(out.format(inp))
-            else:
-                out = random.choice(
-                    PHRASES[PhraseType.COMMAND_REPLY.value]["command_parse_success"]
-                )
-                utils.print_output(out.format(inp))
-
-                action_success = game.board.execute_action(action)
-
-                if action_success:
-                    successful_last_action = True
-                    out = random.choice(
-                        PHRASES[PhraseType.ACTION_REPLY.value]["action_success"]
-                    )
-
-                else:
-                    out = random.choice(
-                        PHRASES[PhraseType.ACTION_REPLY.value]["action_failure"]
-                    )
-                utils.print_output(out.format(game.board.player.formal_name, action.name))
-
-        if game.gamestate == GameState.GAME_OVER_PLAYER_DESTROYED:
-            utils.print_output(
-                random.choice(
-                    PHRASES[PhraseType.GAME_OVER.value]["game_over_player_destroyed"]
-                ).format(game.board.player.formal_name)
-            )
-
-        elif game.gamestate == GameState.GAME_OVER_OBJECTIVE_DESTROYED:
-            utils.print_output(
-                PHRASES[PhraseType.GAME_OVER.value]["game_over_objective_destroyed"]
-            )
-
-        elif game.gamestate == GameState.GAME_OVER_VICTORY:
-            utils.print_output(PHRASES[PhraseType.GAME_OVER.value]["game_over_victory"])
+        # The session keeps track of turns, discoveries and the end of the game.
+        try:
+            while session.running:
+                inp = utils.user_input_prompt(session.prompt)
+                session.handle_line(inp)
+        finally:
+            if record_path is not None:
+                Recording.from_session(session).save(record_path)
 
 
 if __name__ == "__main__":
-    play_game()
+    parser = argparse.ArgumentParser(description="Play the game in the terminal.")
+    parser.add_argument(
+        "--metrics-file",
+        type=Path,
+        default=None,
+        help="write game metrics here when the game ends (.prom for Prometheus text, else JSON)",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        help="capture cProfile and tracemalloc reports to files starting with this path",
+    )
+    parser.add_argument(
+        "--record",
+        type=Path,
+        default=None,
+        help="save the game's seed and your input here, to replay it with replay.py",
+    )
+    args = parser.parse_args()
+
+    utils.init(utils.LOG_LEVEL)
+    capture = (
+        metrics.capture_profile(args.profile, cpu=True, memory=True)
+        if args.profile is not None
+        else contextlib.nullcontext()
+    )
+    with capture:
+        play_game(args.record)
+    if args.metrics_file is not None:
+        metrics.REGISTRY.write_snapshot(args.metrics_file)
@@ -0,0 +1,86 @@
+"""
+renderer.py
+Buffered output for game sessions.
+
+Everything a session writes while it handles one line of input (replies, every contact a scan
+reports, discoveries, the game over message) is collected by a Renderer and handed to its sink
+as one string when the line is done.  A turn therefore costs one write and one flush however
+many messages it produced.
+
+A sink is any callable taking a string: a terminal, a socket's buffer, a list.  null_sink
+throws output away without it ever being joined, for headless games.  If a sink is slow to
+drain, pending output is bounded by `max_pending` characters; past that it is flushed early
+rather than growing without limit.
+"""
+# Python standard library
+import sys
+from typing import Callable, List
+
+# Flush before the end of a turn once this many characters are waiting.
+DEFAULT_MAX_PENDING = 64 * 1024
+
+
+def null_sink(output: str) -> None:
+    """
+    Sink for headless games that throws every message away.
+    """
+    return None
+
+
+def stdout_sink(output: str) -> None:
+    """
+    Sink for the terminal: one write and one flush per batch, followed by a blank line.
+    """
+    sys.stdout.write(output + "\n")
+    sys.stdout.flush()
+
+
+class Renderer(object):
+    """
+    Collects messages and writes them to `sink` in batches.
+    `writes` and `messages` count what went to the sink, for tests and metrics.
+    """
+
+    __slots__ = ("sink", "max_pending", "discard", "_pending", "_pending_size", "writes", "messages")
+
+    def __init__(
+        self, sink: Callable[[str], None] = stdout_sink, max_pending: int = DEFAULT_MAX_PENDING
+    ):
+        self.sink = sink
+        self.max_pending = max_pending
+        self.discard = sink is null_sink
+        self._pending: List[str] = []
+        self._pending_size = 0
+        self.writes = 0
+        self.messages = 0
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of messages waiting for the next flush.
+        """
+        return len(self._pending)
+
+    def write(self, message: str) -> None:
+        if self.discard:
+            return
+        self._pending.append(message)
+        self._pending_size += len(message)
+        if self._pending_size >= self.max_pending:
+            self.flush()
+
+    def take(self) -> str:
+        """
+        Everything pending, joined, without writing it to the sink.
+        """
+        output = "".join(self._pending)
+        self.messages += len(self._pending)
+        self._pending.clear()
+        self._pending_size = 0
+        return output
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        self.sink(self.take())
+        self.writes += 1
@@ -0,0 +1,208 @@
+"""
+replay.py
+Deterministic record and replay of games.
+
+Game logic only draws random numbers from the game's own generator (see Game), so a game is
+fully determined by its config, its seed and the lines the player typed.  A Recording holds
+exactly that, plus the outcome seen when it was recorded.  Replays run headless with
+rendering switched off, so no phrase is picked or formatted.
+
+ReplayIndex replays a recording once and keeps a snapshot every few turns, so any turn can be
+reached by restoring the nearest snapshot, and bisect() finds the first turn at which
+something went wrong.
+
+`python ./src/replay.py recordings/*.json` replays recordings and reports any whose outcome changed.
+`python ./src/replay.py game.json --turn 40` shows the game as it was after turn 40.
+"""
+# Python standard library
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional, Tuple, Union
+
+# Local modules
+from engine import GameSession, discard_output
+import utils
+
+RECORDING_FORMAT_VERSION = 1
+# Turns between the snapshots kept by a ReplayIndex.
+DEFAULT_CHECKPOINT_INTERVAL = 25
+
+
+def session_outcome(session: GameSession) -> dict:
+    """
+    What a replay has to reproduce: how the game stands, in plain data.
+    """
+    player = session.player
+    return {
+        "gamestate": getattr(session.game.gamestate, "name", session.game.gamestate),
+        "turn": session.turn,
+        "lines": session.lines_handled,
+        "player_coordinates": list(player.coordinates),
+        "player_hit_points": player.hit_points,
+    }
+
+
+class Recording(NamedTuple):
+    """
+    Everything needed to play a game again.
+    """
+
+    seed: int
+    lines: Tuple[str, ...]
+    config: dict
+    outcome: Optional[dict] = None
+
+    @classmethod
+    def from_session(cls, session: GameSession) -> "Recording":
+        return cls(
+            seed=session.game.seed,
+            lines=tuple(session.input_log),
+            config=session.game.config,
+            outcome=session_outcome(session),
+        )
+
+    def save(self, path: Union[str, Path]) -> None:
+        data = dict(self._asdict(), lines=list(self.lines), version=RECORDING_FORMAT_VERSION)
+        Path(path).write_text(json.dumps(data, indent=1))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "Recording":
+        data = json.loads(Path(path).read_text())
+        if data.get("version") != RECORDING_FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {RECORDING_FORMAT_VERSION} game recording.")
+        return cls(
+            seed=data["seed"],
+            lines=tuple(data["lines"]),
+            config=data["config"],
+            outcome=data.get("outcome"),
+        )
+
+
+def _advance(session: GameSession, lines: Tuple[str, ...], until_turn: Optional[int]) -> None:
+    """
+    Feed recorded lines, starting after the ones the session has handled, until `until_turn`.
+    """
+    for line in lines[session.lines_handled :]:
+        if not session.running or (until_turn is not None and session.turn >= until_turn):
+            return
+        session.handle_line(line)
+
+
+def replay(
+    recording: Recording,
+    until_turn: Optional[int] = None,
+    render: bool = False,
+    writer: Callable[[str], None] = discard_output,
+) -> GameSession:
+    """
+    Play a recording from the start, stopping once `until_turn` turns have been played.
+    """
+    session = GameSession(recording.config, writer=writer, seed=recording.seed, render=render)
+    _advance(session, recording.lines, until_turn)
+    return session
+
+
+def verify(recording: Recording) -> List[str]:
+    """
+    Replay a recording and describe every way its outcome differs from the recorded one.
+    """
+    if recording.outcome is None:
+        return []
+    outcome = session_outcome(replay(recording))
+    return [
+        f"{key}: recorded {expected!r}, replayed {outcome.get(key)!r}"
+        for key, expected in recording.outcome.items()
+        if outcome.get(key) != expected
+    ]
+
+
+class ReplayIndex(object):
+    """
+    A recording replayed once, with a snapshot kept every `interval` turns for fast seeking.
+    """
+
+    def __init__(self, recording: Recording, interval: int = DEFAULT_CHECKPOINT_INTERVAL):
+        self.recording = recording
+        self.interval = max(int(interval), 1)
+        # (turn, snapshot bytes) in turn order, starting with turn 0
+        self.checkpoints: List[Tuple[int, bytes]] = []
+
+        session = replay(recording, until_turn=0)
+        self.checkpoints.append((0, session.dumps()))
+        for line in recording.lines:
+            if not session.running:
+                break
+            turn = session.turn
+            session.handle_line(line)
+            if session.turn != turn and session.turn % self.interval == 0:
+                self.checkpoints.append((session.turn, session.dumps()))
+        self.final_turn = session.turn
+
+    def _restore(self, index: int) -> GameSession:
+        return GameSession.loads(
+            self.checkpoints[index][1], writer=discard_output, render=False, restore_rng=False
+        )
+
+    def _checkpoint_before(self, turn: int) -> int:
+        index = 0
+        for i, (checkpoint_turn, _) in enumerate(self.checkpoints):
+            if checkpoint_turn > turn:
+                break
+            index = i
+        return index
+
+    def seek(self, turn: int) -> GameSession:
+        """
+        The game as it stood once `turn` turns had been played (or at its end, if sooner).
+        """
+        session = self._restore(self._checkpoint_before(turn))
+        _advance(session, self.recording.lines, turn)
+        return session
+
+    def bisect(self, predicate: Callable[[GameSession], bool]) -> Optional[int]:
+        """
+        First turn after which `predicate(session)` holds, or None if it never does.
+        The predicate must stay true once it has become true, e.g. "the player has lost hit points".
+        """
+        low, high = 0, len(self.checkpoints) - 1
+        if predicate(self._restore(0)):
+            return 0
+        # find the last checkpoint where the predicate is still false
+        while low < high:
+            middle = (low + high + 1) // 2
+            if predicate(self._restore(middle)):
+                high = middle - 1
+            else:
+                low = middle
+
+        session = self._restore(low)
+        for line in self.recording.lines[session.lines_handled :]:
+            if not session.running:
+                break
+            turn = session.turn
+            session.handle_line(line)
+            if session.turn != turn and predicate(session):
+                return session.turn
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded games.")
+    parser.add_argument("recordings", nargs="+", type=Path)
+    parser.add_argument("--turn", type=int, default=None, help="show each game after this turn")
+    args = parser.parse_args()
+
+    utils.init(utils.LOG_LEVEL)
+    failures = 0
+    for path in args.recordings:
+        recording = Recording.load(path)
+        if args.turn is not None:
+            print(path, json.dumps(session_outcome(ReplayIndex(recording).seek(args.turn))))
+            continue
+        mismatches = verify(recording)
+        failures += bool(mismatches)
+        print(path, "ok" if not mismatches else "CHANGED: " + "; ".join(mismatches))
+    if failures:
+        sys.exit(1)
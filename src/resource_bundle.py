@@ -0,0 +1,209 @@
+"""
+resource_bundle.py
+Compiles the game's resource files into one cached bundle.
+
+Every file named in resource_paths.toml (phrases, configs, ships and locations) is parsed and
+validated once, then written to a pickle next to the sources.  Later runs load the pickle
+instead of parsing TOML; it is rebuilt automatically when a source file's modification time
+and content hash no longer match what the bundle was built from.
+
+The phrase file is also compiled into an indexed PhraseTable (see phrases.py) at build time.
+
+Within a process the bundle is loaded once and shared.  The ship and location definitions are
+read-only (mappings become MappingProxyType and lists become tuples), so every Game can use the
+same copy safely.
+"""
+# Python standard library
+import hashlib
+import logging
+import os
+import pickle
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+# Third-party modules
+import toml
+
+# Local modules
+from phrases import PhraseTable
+
+SOURCE_DIRECTORY = Path(__file__).parent.resolve()
+RESOURCE_PATH_FILE = Path(SOURCE_DIRECTORY, "resource_paths.toml")
+DEFAULT_CACHE_PATH = Path(SOURCE_DIRECTORY, ".cache", "resource_bundle.pickle")
+
+# Bump when the layout of the bundle changes so stale caches are rebuilt.
+BUNDLE_FORMAT_VERSION = 2
+
+LOGGER = logging.getLogger("ResourceBundle")
+
+
+class ResourceBundle(NamedTuple):
+    """
+    Everything the game loads from disk.
+    `resources` holds the read-only ship and location definitions keyed by type, then by name.
+    """
+
+    resource_paths: dict
+    phrases: dict
+    config: dict
+    resources: Mapping[str, Mapping[str, Any]]
+    errors: Mapping[str, Any]
+    phrase_table: PhraseTable
+
+
+_BUNDLE: Optional[ResourceBundle] = None
+
+
+def freeze(value: Any) -> Any:
+    """
+    Recursively turn dicts into read-only mappings and lists into tuples.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def _source_files(resource_paths: dict) -> Dict[str, Path]:
+    sources = {"resource_paths": RESOURCE_PATH_FILE}
+    for section in ("phrases", "configs", "game_objects"):
+        for key, path in resource_paths.get(section, {}).items():
+            sources[f"{section}.{key}"] = Path(SOURCE_DIRECTORY, path)
+    return sources
+
+
+def _file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _fingerprint(sources: Dict[str, Path]) -> Dict[str, Tuple[int, int]]:
+    """
+    Cheap per-file signature: modification time and size.
+    """
+    fingerprint = {}
+    for name, path in sources.items():
+        stat = path.stat()
+        fingerprint[name] = (stat.st_mtime_ns, stat.st_size)
+    return fingerprint
+
+
+def compile_resources(resource_paths: dict) -> dict:
+    """
+    Parse and validate every resource file.  Returns plain data ready to be pickled.
+    """
+    phrases = toml.load(Path(SOURCE_DIRECTORY, resource_paths["phrases"]["phrases_english"]))
+    config = toml.load(Path(SOURCE_DIRECTORY, resource_paths["configs"]["config"]))
+
+    resources = {}
+    for key, val in resource_paths["game_objects"].items():
+        resource_list = toml.load(Path(SOURCE_DIRECTORY, val))[key]
+        r_ = {}
+        for resource in resource_list:
+            for k, v in resource.items():
+                r_[k] = v
+        resources[key] = r_
+
+    return {
+        "resource_paths": resource_paths,
+        "phrases": phrases["phrases"][0],
+        "phrase_table": PhraseTable(phrases["phrases"][0]),
+        "config": config["config"],
+        "resources": resources,
+        "errors": validate(resources),
+    }
+
+
+def validate(resources: dict) -> dict:
+    """
+    Run schema validation over the ship and location definitions.
+    Returns {resource type: {name: errors}} for anything that fails.
+    """
+    from validate_schema import validate_resources
+
+    errors = validate_resources(resources)
+    for resource_type, failures in errors.items():
+        for name, error in failures.items():
+            LOGGER.warning(f"{resource_type} {name} fails schema validation: {error}")
+    return errors
+
+
+def _read_cache(cache_path: Path) -> Optional[dict]:
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+    if not isinstance(cached, dict) or cached.get("format") != BUNDLE_FORMAT_VERSION:
+        return None
+
+    # resource_paths.toml is one of the sources, so a change to the file list is caught here too.
+    sources = {name: Path(path) for name, path in cached["sources"].items()}
+    try:
+        fingerprint = _fingerprint(sources)
+        if fingerprint == cached["fingerprint"]:
+            return cached
+
+        # Something was touched. Only rebuild if the content actually changed.
+        hashes = {name: _file_hash(path) for name, path in sources.items()}
+    except OSError:
+        return None
+    if hashes != cached["hashes"]:
+        return None
+
+    cached["fingerprint"] = fingerprint
+    _write_cache(cache_path, cached)
+    return cached
+
+
+def _write_cache(cache_path: Path, cached: dict) -> None:
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "wb") as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        LOGGER.info(f"Could not write resource bundle cache {cache_path}: {e}")
+
+
+def build_bundle(cache_path: Optional[Path] = DEFAULT_CACHE_PATH) -> ResourceBundle:
+    """
+    Load the bundle from the cache, recompiling it from the sources when they have changed.
+    Pass cache_path=None to always compile from the sources without touching the cache.
+    """
+    cached = _read_cache(cache_path) if cache_path is not None else None
+    if cached is None:
+        resource_paths = toml.load(RESOURCE_PATH_FILE)
+        sources = _source_files(resource_paths)
+        cached = {
+            "format": BUNDLE_FORMAT_VERSION,
+            "sources": {name: str(path) for name, path in sources.items()},
+            "fingerprint": _fingerprint(sources),
+            "hashes": {name: _file_hash(path) for name, path in sources.items()},
+            "data": compile_resources(resource_paths),
+        }
+        if cache_path is not None:
+            _write_cache(cache_path, cached)
+
+    data = cached["data"]
+    return ResourceBundle(
+        resource_paths=data["resource_paths"],
+        phrases=data["phrases"],
+        config=data["config"],
+        resources=freeze(data["resources"]),
+        errors=freeze(data["errors"]),
+        phrase_table=data["phrase_table"],
+    )
+
+
+def get_bundle() -> ResourceBundle:
+    """
+    The bundle shared by everything in this process, loaded on first use.
+    """
+    global _BUNDLE
+    if _BUNDLE is None:
+        _BUNDLE = build_bundle()
+    return _BUNDLE
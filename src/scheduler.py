@@ -0,0 +1,239 @@
+"""
+scheduler.py
+Turn scheduling for ships that are not the player.
+
+Every active NPC ship is booked for the turn it next acts on.  Bookings live in a timing wheel,
+one slot per upcoming turn, so ending a turn only touches the ships due on it: a board with
+100k NPCs that act every few turns costs in proportion to the ships that act, and idle ships
+(never booked) cost nothing.  Bookings further ahead than the wheel wait in a heap until their
+turn comes near.
+
+Ships due on the same turn decide in the order they were booked and then move together through
+the board's batch API, and every random decision comes from the board's generator, so NPCs
+replay exactly with the rest of the game.  A ship given a
+destination heads there along the pathfinder's shared distance field; the rest wander.
+"""
+# Python standard library
+import heapq
+import itertools
+from time import perf_counter
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+# Local modules
+from enums import Actions, Directions
+from pathfinding import PathFinder
+
+# Turns covered by the wheel. Bookings further ahead go to the heap.
+DEFAULT_WHEEL_SIZE = 64
+# Turns between a ship's actions, drawn uniformly from this range unless the config says otherwise.
+DEFAULT_MIN_INTERVAL = 1
+DEFAULT_MAX_INTERVAL = 3
+
+_DIRECTIONS = tuple(Directions)
+
+
+class TurnScheduler(object):
+    """
+    Timing wheel of objects waiting for the turn they next act on.
+    An object has at most one booking; booking it again replaces the old one.
+    """
+
+    def __init__(self, wheel_size: int = DEFAULT_WHEEL_SIZE, now: int = 0):
+        size = 1 << max(int(wheel_size) - 1, 1).bit_length()
+        self._mask = size - 1
+        # slot turn % size holds (turn, sequence, object) bookings for that turn
+        self._wheel: List[List[Tuple[int, int, Any]]] = [[] for _ in range(size)]
+        self._later: List[Tuple[int, int, Any]] = []
+        self._sequence = itertools.count()
+        # id(object) -> (turn, sequence, object) of its live booking, in the order they were made.
+        # Replaced and cancelled bookings stay in the wheel and are skipped when their turn comes.
+        self._booked: Dict[int, Tuple[int, int, Any]] = {}
+        self.now = now
+
+    def __len__(self) -> int:
+        return len(self._booked)
+
+    def __contains__(self, object_) -> bool:
+        return id(object_) in self._booked
+
+    def due(self, object_) -> Optional[int]:
+        """
+        Turn `object_` is booked for, or None.
+        """
+        booking = self._booked.get(id(object_))
+        return booking[0] if booking is not None else None
+
+    def bookings(self) -> List[Tuple[Any, int]]:
+        """
+        (object, turn) for every live booking, in the order they were made.
+        """
+        return [(object_, turn) for turn, _, object_ in self._booked.values()]
+
+    def schedule(self, object_, turn: int) -> None:
+        """
+        Book `object_` for `turn`, or the next turn if that has already passed.
+        """
+        turn = max(turn, self.now + 1)
+        booking = (turn, next(self._sequence), object_)
+        # re-inserting keeps _booked in booking order
+        self._booked.pop(id(object_), None)
+        self._booked[id(object_)] = booking
+        if turn - self.now <= self._mask:
+            self._wheel[turn & self._mask].append(booking)
+        else:
+            heapq.heappush(self._later, booking)
+
+    def cancel(self, object_) -> None:
+        self._booked.pop(id(object_), None)
+
+    def advance(self, turn: int) -> List[Any]:
+        """
+        Move the clock to `turn` and return every object due on the turns passed, in booking order.
+        Their bookings are used up; schedule them again for their next action.
+        """
+        due: List[Any] = []
+        mask = self._mask
+        wheel = self._wheel
+        later = self._later
+        booked = self._booked
+        while self.now < turn:
+            self.now += 1
+            now = self.now
+            while later and later[0][0] - now <= mask:
+                booking = heapq.heappop(later)
+                wheel[booking[0] & mask].append(booking)
+
+            slot = wheel[now & mask]
+            if not slot:
+                continue
+            wheel[now & mask] = []
+            if len(slot) > 1:
+                slot.sort(key=lambda booking: booking[1])
+            for booking in slot:
+                key = id(booking[2])
+                if booked.get(key) is booking:
+                    del booked[key]
+                    due.append(booking[2])
+        return due
+
+
+class NPCScheduler(object):
+    """
+    Runs the NPC ships of one board: each acts every `min_interval` to `max_interval` turns.
+    With max_interval 0 ships are never booked and stay idle.
+    """
+
+    def __init__(
+        self,
+        board,
+        min_interval: int = DEFAULT_MIN_INTERVAL,
+        max_interval: int = DEFAULT_MAX_INTERVAL,
+        wheel_size: int = DEFAULT_WHEEL_SIZE,
+        pathfinder: Optional[PathFinder] = None,
+    ):
+        self.board = board
+        self.pathfinder = pathfinder if pathfinder is not None else PathFinder(board)
+        # id(ship) -> (ship, square it is heading for)
+        self.destinations: Dict[int, Tuple[Any, tuple]] = {}
+        self.min_interval = max(int(min_interval), 1)
+        self.max_interval = max(int(max_interval), 0)
+        if self.max_interval and self.max_interval < self.min_interval:
+            raise ValueError("NPC max_interval must not be less than min_interval.")
+        self.queue = TurnScheduler(max(wheel_size, self.max_interval + 1), now=board.turn)
+        self._actions = board.metrics.counter("npc_actions_total")
+        self._turn_time = board.metrics.histogram("npc_turn_seconds")
+
+    @classmethod
+    def from_config(
+        cls, board, config: Mapping[str, Any], pathfinder: Optional[PathFinder] = None
+    ) -> "NPCScheduler":
+        npc = config.get("npc", {})
+        return cls(
+            board,
+            npc.get("min_interval", DEFAULT_MIN_INTERVAL),
+            npc.get("max_interval", DEFAULT_MAX_INTERVAL),
+            pathfinder=pathfinder,
+        )
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def add(self, ship, delay: Optional[int] = None) -> None:
+        """
+        Book `ship` to act in `delay` turns, or after a random interval if not given.
+        """
+        if delay is None:
+            if not self.max_interval:
+                return
+            delay = self.board.rng.randint(self.min_interval, self.max_interval)
+        self.queue.schedule(ship, self.board.turn + delay)
+
+    def remove(self, ship) -> None:
+        self.queue.cancel(ship)
+        self.destinations.pop(id(ship), None)
+        self.destinations.pop(id(ship), None)
+
+    def set_destination(self, ship, square: Optional[tuple]) -> None:
+        """
+        Send `ship` to `square` on its turns, or back to wandering with None.
+        """
+        if square is None:
+            self.destinations.pop(id(ship), None)
+        else:
+            self.destinations[id(ship)] = (ship, tuple(square))
+
+    def run_turn(self) -> int:
+        """
+        Let every ship due by the board's current turn act, and book its next action.
+        Returns the number of ships that acted.
+        """
+        start = perf_counter()
+        ships = self.queue.advance(self.board.turn)
+        acted = 0
+        commands = []
+        for ship in ships:
+            # destroyed ships drop out of the schedule
+            if ship.hit_points <= 0:
+                self.destinations.pop(id(ship), None)
+                continue
+            command = self.decide(ship)
+            if command is not None:
+                commands.append(command)
+            self.add(ship)
+            acted += 1
+        # everyone's moves happen at once
+        self.board.execute_actions(commands)
+        self._actions.inc(acted)
+        self._turn_time.observe(perf_counter() - start)
+        return acted
+
+    def decide(self, ship) -> Optional[Tuple[Any, Actions, Any]]:
+        """
+        What a ship does on its turn, as a (ship, action, args) command: head for its destination
+        if it has one, otherwise move a random distance, up to its speed, in a random direction.
+        None if it does nothing.
+        """
+        speed = ship.movement_speed
+        if not speed:
+            return None
+        destination = self.destinations.get(id(ship))
+        if destination is not None:
+            move = self.pathfinder.next_move(ship.coordinates, destination[1], speed)
+            if move is None:
+                # arrived, or there is no way there
+                del self.destinations[id(ship)]
+                return None
+            return ship, Actions.MOVE, move
+
+        rng = self.board.rng
+        direction = _DIRECTIONS[int(rng.random() * len(_DIRECTIONS))]
+        return ship, Actions.MOVE, (direction, rng.randint(1, speed))
+
+    def act(self, ship) -> bool:
+        """
+        Let one ship take its turn on its own.
+        """
+        command = self.decide(ship)
+        if command is None:
+            return False
+        return self.board.execute_action(command[1], command[2], ship)
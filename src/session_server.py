@@ -0,0 +1,239 @@
+"""
+session_server.py
+Hosts many independent games in one process on a single asyncio event loop.
+
+Each TCP connection (telnet or netcat is enough) gets its own GameSession.  Only the network
+reads and writes are asynchronous; every line of input is handed to the session's synchronous
+game logic, and everything the game writes during that line is sent back in one write.
+
+A client that stops reading is not sent more than it can take: the server waits for its
+socket buffer to drain before reading its next line, and disconnects it if that takes longer
+than `drain_timeout` seconds.
+
+`python ./src/session_server.py --port 4000`
+`telnet localhost 4000`
+"""
+# Python standard library
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+
+# Local modules
+from engine import GameSession
+from enums import PhraseType
+import metrics
+from replay import Recording
+import utils
+
+PHRASES = utils.PHRASES
+LOGGER = logging.getLogger("SessionServer")
+
+# Number of recent turns per session kept for latency statistics.
+LATENCY_WINDOW = 1024
+# Bytes buffered for a client before the server waits for it to catch up.
+CLIENT_BUFFER_LIMIT = 64 * 1024
+# Seconds a client may take to accept a turn's output before it is disconnected.
+DEFAULT_DRAIN_TIMEOUT = 30.0
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class HostedSession(object):
+    """
+    A GameSession plus the connection bookkeeping the server needs for it.
+    """
+
+    def __init__(self, session_id: int, config: dict):
+        self.session_id = session_id
+        self.pending_output: List[str] = []
+        self.session = GameSession(config, writer=self.pending_output.append)
+        self.turn_latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.lines = 0
+
+    def take_output(self) -> bytes:
+        """
+        Everything written since the last call, with the next prompt appended while the game is running.
+        """
+        self.session.flush()
+        if self.session.running:
+            self.pending_output.append(utils.format_prompt(self.session.prompt))
+        data = "".join(self.pending_output).encode()
+        self.pending_output.clear()
+        return data
+
+    def latency_summary(self) -> dict:
+        latencies = sorted(self.turn_latencies)
+        return {
+            "lines": self.lines,
+            "mean_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50_ms": 1000 * _percentile(latencies, 0.50),
+            "p99_ms": 1000 * _percentile(latencies, 0.99),
+            "max_ms": 1000 * latencies[-1] if latencies else 0.0,
+        }
+
+
+class SessionServer(object):
+    """
+    asyncio TCP server that runs one game per connection.
+    """
+
+    def __init__(
+        self,
+        config: Optional[dict] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        record_dir: Optional[Path] = None,
+        drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+    ):
+        self.config = config if config is not None else utils.CONFIG
+        self.host = host
+        self.port = port
+        self.drain_timeout = drain_timeout
+        # every session's seed and input is saved here when it ends, for replay.py
+        self.record_dir = record_dir
+        self.sessions: Dict[int, HostedSession] = {}
+        self.finished_sessions = 0
+        self.slow_clients = 0
+        # latency summaries of recently finished sessions, so stats survive clients disconnecting
+        self.finished_summaries: Deque[tuple] = deque(maxlen=LATENCY_WINDOW)
+        self._session_ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        # port 0 asks the OS for a free port; record the one we actually got
+        self.port = self._server.sockets[0].getsockname()[1]
+        LOGGER.info(f"Session server listening on {self.host}:{self.port}")
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:  # type: ignore
+            await self._server.serve_forever()  # type: ignore
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _send(self, writer: asyncio.StreamWriter, data: bytes) -> None:
+        writer.write(data)
+        await asyncio.wait_for(writer.drain(), self.drain_timeout)
+
+    async def _handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        hosted = HostedSession(next(self._session_ids), self.config)
+        self.sessions[hosted.session_id] = hosted
+        writer.transport.set_write_buffer_limits(high=CLIENT_BUFFER_LIMIT)
+        try:
+            hosted.session.write(PHRASES[PhraseType.SPECIAL.value]["new_game_start"])
+            await self._send(writer, hosted.take_output())
+
+            while hosted.session.running:
+                raw = await reader.readline()
+                if not raw:
+                    break
+
+                start = time.perf_counter()
+                hosted.session.handle_line(raw.decode(errors="replace").strip())
+                await self._send(writer, hosted.take_output())
+                hosted.turn_latencies.append(time.perf_counter() - start)
+                hosted.lines += 1
+        except ConnectionError:
+            LOGGER.info(f"Session {hosted.session_id} disconnected")
+        except asyncio.TimeoutError:
+            self.slow_clients += 1
+            LOGGER.warning(f"Session {hosted.session_id} dropped: client stopped reading output")
+        finally:
+            del self.sessions[hosted.session_id]
+            self.finished_sessions += 1
+            self.finished_summaries.append((hosted.session_id, hosted.latency_summary()))
+            if self.record_dir is not None:
+                recording = Recording.from_session(hosted.session)
+                name = f"session-{hosted.session_id}-{recording.seed}.json"
+                recording.save(Path(self.record_dir, name))
+            writer.close()
+
+    def latency_report(self) -> dict:
+        """
+        Per-session turn latency for active and recently finished sessions.
+        """
+        report = {
+            "active_sessions": len(self.sessions),
+            "finished_sessions": self.finished_sessions,
+            "slow_clients": self.slow_clients,
+            "sessions": {},
+        }
+        for session_id, summary in self.finished_summaries:
+            report["sessions"][session_id] = summary
+        for session_id, hosted in self.sessions.items():
+            report["sessions"][session_id] = hosted.latency_summary()
+        return report
+
+
+async def _main(
+    host: str,
+    port: int,
+    report_interval: float,
+    metrics_file: Optional[Path] = None,
+    record_dir: Optional[Path] = None,
+) -> None:
+    server = SessionServer(host=host, port=port, record_dir=record_dir)
+    await server.start()
+    print(f"Listening on {server.host}:{server.port}")
+
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(report_interval)
+            LOGGER.warning(json.dumps(server.latency_report()))
+            if metrics_file is not None:
+                metrics.REGISTRY.write_snapshot(metrics_file)
+
+    reporter = asyncio.ensure_future(report()) if report_interval else None
+    try:
+        await server.serve_forever()
+    finally:
+        if reporter is not None:
+            reporter.cancel()
+        if metrics_file is not None:
+            metrics.REGISTRY.write_snapshot(metrics_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host many games over TCP on one event loop.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4000)
+    parser.add_argument(
+        "--report-interval", type=float, default=0, help="seconds between latency reports, 0 for none"
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=Path,
+        default=None,
+        help="write game metrics here at every report and on shutdown (.prom for Prometheus text, else JSON)",
+    )
+    parser.add_argument(
+        "--record-dir",
+        type=Path,
+        default=None,
+        help="save a replayable recording of every session here",
+    )
+    args = parser.parse_args()
+    utils.init(utils.LOG_LEVEL)
+    if args.record_dir is not None:
+        args.record_dir.mkdir(parents=True, exist_ok=True)
+    asyncio.run(
+        _main(args.host, args.port, args.report_interval, args.metrics_file, args.record_dir)
+    )
@@ -0,0 +1,388 @@
+"""
+sharding.py
+Simulating one large board across several worker processes.
+
+The board is cut into vertical strips, one per shard, and every shard is a process with a board
+of its own holding the ships in its strip.  A turn is a synchronized step: every shard lets its
+due ships act at the same time, and ships whose move takes them across a strip edge are taken off
+their old shard's board and handed to the coordinator, which delivers them to their new shard
+with the next step.  Shards only exchange messages between steps, so each one runs at the full
+speed of its core.
+
+Scans are answered by every shard whose strip is within range, so a ship near an edge sees the
+ships on the other side.  Every shard draws from its own generator, seeded from the world seed and
+its index, and hand-offs are delivered in shard order, so a world replays exactly from its seed
+and shard count, whether the shards run in worker processes or in the calling process.
+
+    with ShardedWorld(10_000, 10_000, shards=4, seed=1) as world:
+        world.populate(template, 100_000)
+        moves = world.step(100)
+"""
+# Python standard library
+import argparse
+import json
+import multiprocessing
+import random
+import time
+from typing import Any, Iterable, List, Optional, Tuple
+
+# Local modules
+from journal import Journal
+from metrics import MetricsRegistry
+from objects import GameBoard, Ship, ShipTemplate
+from scheduler import DEFAULT_MAX_INTERVAL, DEFAULT_MIN_INTERVAL, NPCScheduler
+import utils
+
+# (template, coordinates, hit_points, scan_radius, movement_speed, turn booked to act on or None)
+ShipState = Tuple[Any, tuple, int, int, int, Optional[int]]
+# (name, coordinates) of a scan contact
+Contact = Tuple[str, tuple]
+
+# Records kept per shard journal. Shards are for throughput, not for reading what happened.
+SHARD_JOURNAL_CAPACITY = 1024
+
+
+def _ship_state(ship: Ship, turn: Optional[int]) -> ShipState:
+    return (
+        ship.template,
+        ship.coordinates,
+        ship.hit_points,
+        ship.scan_radius,
+        ship.movement_speed,
+        turn,
+    )
+
+
+class ShardBoard(GameBoard):
+    """
+    A board that owns the squares from x_min to x_max, edges included, of a larger board.
+    Ships that move off its strip are taken off the board and kept in `leaving`.
+    """
+
+    def __init__(self, x_min: int, x_max: int, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.x_min = x_min
+        self.x_max = x_max
+        self.leaving: List[Ship] = []
+
+    def owns(self, coordinates: tuple) -> bool:
+        return self.x_min <= coordinates[0] <= self.x_max
+
+    def move_object(self, object_, new_location: tuple) -> None:
+        if self.owns(new_location):
+            super().move_object(object_, new_location)
+            return
+        self.remove_object(object_)
+        object_.coordinates = new_location
+        self.leaving.append(object_)
+
+
+class Shard(object):
+    """
+    One strip of a sharded world. Runs in a worker process, or in the caller's for a single shard.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        x_min: int,
+        x_max: int,
+        columns: int,
+        rows: int,
+        seed: int,
+        min_interval: int = DEFAULT_MIN_INTERVAL,
+        max_interval: int = DEFAULT_MAX_INTERVAL,
+    ):
+        self.index = index
+        self.board = ShardBoard(
+            x_min,
+            x_max,
+            columns,
+            rows,
+            metrics=MetricsRegistry(),
+            journal=Journal(SHARD_JOURNAL_CAPACITY),
+            rng=random.Random(f"{seed}:{index}"),
+        )
+        self.npcs = NPCScheduler(self.board, min_interval, max_interval)
+
+    def add(self, states: Iterable[ShipState]) -> int:
+        """
+        Put ships on this shard's board, keeping the turn they were booked for.
+        """
+        board = self.board
+        added = 0
+        for template, coordinates, hit_points, scan_radius, movement_speed, turn in states:
+            ship = Ship.from_template(template)
+            ship.hit_points = hit_points
+            ship.scan_radius = scan_radius
+            ship.movement_speed = movement_speed
+            board.place_object(ship, coordinates)
+            if turn is None:
+                self.npcs.add(ship)
+            else:
+                self.npcs.queue.schedule(ship, turn)
+            added += 1
+        return added
+
+    def step(self, turn: int, arriving: List[ShipState]) -> Tuple[int, List[ShipState]]:
+        """
+        Take in the ships handed over since the last step, then play `turn`.
+        Returns how many ships acted and the ships that left the strip.
+        """
+        self.add(arriving)
+        board = self.board
+        board.turn = turn
+        acted = self.npcs.run_turn()
+        leaving = []
+        for ship in board.leaving:
+            leaving.append(_ship_state(ship, self.npcs.queue.due(ship)))
+            self.npcs.remove(ship)
+        board.leaving = []
+        return acted, leaving
+
+    def scan(self, coordinates: tuple, radius: int) -> List[Contact]:
+        board = self.board
+        return [
+            (object_.name, object_.coordinates)
+            for square in board.get_squares_in_radius(coordinates, radius)
+            for object_ in board.occupied_squares[square]
+        ]
+
+    def count(self) -> int:
+        return sum(map(len, self.board.occupied_squares.values()))
+
+    def ships(self) -> List[ShipState]:
+        """
+        Every ship on the shard, for checkpoints and checks.
+        """
+        queue = self.npcs.queue
+        return [
+            _ship_state(ship, queue.due(ship))
+            for objects in self.board.occupied_squares.values()
+            for ship in objects
+        ]
+
+
+def _serve(connection, shard_arguments: tuple) -> None:
+    """
+    Worker process: build a shard and answer (method, arguments) requests until told to stop.
+    """
+    shard = Shard(*shard_arguments)
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        method, arguments = request
+        connection.send(getattr(shard, method)(*arguments))
+    connection.close()
+
+
+class _LocalShard(object):
+    """
+    Same interface as a worker connection, for a shard in the calling process.
+    """
+
+    def __init__(self, shard_arguments: tuple):
+        self.shard = Shard(*shard_arguments)
+        self._reply = None
+
+    def send(self, request: Tuple[str, tuple]) -> None:
+        method, arguments = request
+        self._reply = getattr(self.shard, method)(*arguments)
+
+    def recv(self) -> Any:
+        return self._reply
+
+
+class ShardedWorld(object):
+    """
+    A board of `columns` x `rows` squares split across `shards` strips.
+    With processes=False every shard runs in the calling process, one after another.
+    """
+
+    def __init__(
+        self,
+        columns: int,
+        rows: int,
+        shards: int = 0,
+        seed: int = 0,
+        min_interval: int = DEFAULT_MIN_INTERVAL,
+        max_interval: int = DEFAULT_MAX_INTERVAL,
+        processes: bool = True,
+    ):
+        shards = shards or multiprocessing.cpu_count()
+        self.columns = columns
+        self.rows = rows
+        self.seed = seed
+        self.turn = 0
+        # ships that have crossed a strip edge
+        self.handoffs = 0
+        width = -(-(columns + 1) // shards)
+        # x_min of every strip, plus one past the end of the board
+        self.edges = [min(index * width, columns + 1) for index in range(shards + 1)]
+        self._connections = []
+        self._processes = []
+        self._arriving: List[List[ShipState]] = [[] for _ in range(shards)]
+        for index in range(shards):
+            arguments = (
+                index,
+                self.edges[index],
+                self.edges[index + 1] - 1,
+                columns,
+                rows,
+                seed,
+                min_interval,
+                max_interval,
+            )
+            if not processes:
+                self._connections.append(_LocalShard(arguments))
+                continue
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_serve, args=(child, arguments), daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    def __enter__(self) -> "ShardedWorld":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for connection in self._connections:
+            if not isinstance(connection, _LocalShard):
+                connection.send(None)
+                connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+    @property
+    def shards(self) -> int:
+        return len(self._connections)
+
+    def shard_of(self, coordinates: tuple) -> int:
+        width = self.edges[1]
+        return coordinates[0] // width
+
+    def _call_all(self, requests: List[Tuple[str, tuple]]) -> list:
+        # send everything first so the shards work at the same time
+        for connection, request in zip(self._connections, requests):
+            connection.send(request)
+        return [connection.recv() for connection in self._connections]
+
+    def _call(self, index: int, method: str, *arguments) -> Any:
+        connection = self._connections[index]
+        connection.send((method, arguments))
+        return connection.recv()
+
+    def add(self, states: Iterable[ShipState]) -> None:
+        """
+        Put ships on the world, each on the shard that owns its square.
+        """
+        by_shard: List[List[ShipState]] = [[] for _ in range(self.shards)]
+        for state in states:
+            by_shard[self.shard_of(state[1])].append(state)
+        self._call_all([("add", (shard_states,)) for shard_states in by_shard])
+
+    def populate(self, template, count: int) -> None:
+        """
+        Add `count` ships of a template to distinct random squares.
+        """
+        rng = random.Random(f"{self.seed}:populate:{self.count()}")
+        width = self.columns + 1
+        cells = rng.sample(range(width * (self.rows + 1)), count)
+        self.add(
+            (
+                template,
+                (cell % width, cell // width),
+                template.hit_points,
+                template.scan_radius,
+                template.movement_speed,
+                None,
+            )
+            for cell in cells
+        )
+
+    def step(self, turns: int = 1) -> int:
+        """
+        Play `turns` synchronized turns. Returns how many ship actions were taken.
+        """
+        acted = 0
+        for _ in range(turns):
+            self.turn += 1
+            arriving, self._arriving = self._arriving, [[] for _ in range(self.shards)]
+            replies = self._call_all([("step", (self.turn, states)) for states in arriving])
+            for shard_acted, leaving in replies:
+                acted += shard_acted
+                self.handoffs += len(leaving)
+                for state in leaving:
+                    self._arriving[self.shard_of(state[1])].append(state)
+        return acted
+
+    def scan(self, coordinates: tuple, radius: int) -> List[Contact]:
+        """
+        (name, coordinates) of every ship within `radius` of `coordinates`, from every shard
+        whose strip is in range.
+        """
+        first = self.shard_of((max(coordinates[0] - radius, 0), 0))
+        last = self.shard_of((min(coordinates[0] + radius, self.columns), 0))
+        contacts: List[Contact] = []
+        for index in range(first, last + 1):
+            contacts.extend(self._call(index, "scan", coordinates, radius))
+        # ships handed over but not yet delivered are still in the world
+        for states in self._arriving[first:last + 1]:
+            for state in states:
+                x, y = state[1]
+                if max(abs(x - coordinates[0]), abs(y - coordinates[1])) <= radius:
+                    contacts.append((state[0].name, state[1]))
+        return contacts
+
+    def count(self) -> int:
+        in_transit = sum(map(len, self._arriving))
+        return sum(self._call_all([("count", ())] * self.shards)) + in_transit
+
+    def ships(self) -> List[ShipState]:
+        """
+        Every ship in the world, shard by shard.
+        """
+        states = []
+        replies = self._call_all([("ships", ())] * self.shards)
+        for shard_states, arriving in zip(replies, self._arriving):
+            states.extend(shard_states)
+            states.extend(arriving)
+        return states
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure ship moves per second across shards.")
+    parser.add_argument("--ships", type=int, default=100_000)
+    parser.add_argument("--size", type=int, default=10_000)
+    parser.add_argument("--shards", type=int, default=0)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    template = ShipTemplate.from_config(utils.get_bundle().resources["ships"]["enemy_capital"])
+    template = template._replace(movement_speed=max(template.movement_speed, 1))
+    with ShardedWorld(args.size, args.size, args.shards, args.seed, 1, 1) as world:
+        world.populate(template, args.ships)
+        start = time.perf_counter()
+        moves = world.step(args.turns)
+        elapsed = time.perf_counter() - start
+        print(
+            json.dumps(
+                {
+                    "shards": world.shards,
+                    "ships": world.count(),
+                    "turns": args.turns,
+                    "moves": moves,
+                    "elapsed_seconds": elapsed,
+                    "moves_per_second": moves / elapsed if elapsed else 0,
+                },
+                indent=2,
+            )
+        )
@@ -0,0 +1,359 @@
+"""
+snapshot.py
+Binary checkpoints of a whole game.
+
+A snapshot holds the board size and turn, every object on the board, the game state and the
+state of the random number generator.  Object state is stored column by column in fixed-width
+little-endian arrays, so a snapshot is written with one buffer copy per column and can be
+memory-mapped and read without parsing anything:
+
+    header | metadata (pickle) | kind | template | x | y | hit_points | scan_radius | ...
+
+Every column starts on an 8 byte boundary.  The metadata holds what is not numeric: the game
+config and seed, the distinct object templates, the game state, the turn every NPC ship is
+booked to act on and where it is heading, the sectors an open-ended board has loaded, and the
+state of both the game's own random generator and the global one used for phrases and agents.
+
+Opening a snapshot only reads the header and metadata; objects are built when it is restored,
+and a snapshot can be restored any number of times to fork simulations from one position.
+
+    snapshot.save_game(game, "turn_40.snap")
+    with snapshot.Snapshot.open("turn_40.snap") as snap:
+        forks = [snap.restore() for _ in range(100)]
+"""
+# Python standard library
+import mmap
+import os
+import pickle
+import random
+import struct
+import sys
+from array import array
+from itertools import chain
+from operator import attrgetter
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+# Local modules
+import entity_store
+from entity_store import STORE_COLUMNS
+from journal import Journal
+from metrics import MetricsRegistry
+from objects import Game, GameBoard, Location, Ship, shared_template
+
+MAGIC = b"SLDS"
+# Bump when the layout changes. Snapshots of another version are refused rather than misread.
+SNAPSHOT_FORMAT_VERSION = 4
+
+# magic, version, reserved, columns, rows, turn, player index (-1 for none), objects, metadata bytes
+HEADER = struct.Struct("<4sHHqqqqqq")
+
+# Object kinds, by their index in the kind column.
+KINDS = (Ship, Location)
+
+_ARRAY_TYPECODES = {"int64": "q", "float64": "d"}
+
+# column name -> array typecode, in file order
+COLUMNS: Dict[str, str] = dict(
+    [("kind", "B"), ("template", "I"), ("x", "q"), ("y", "q")]
+    + [(column, _ARRAY_TYPECODES[dtype]) for column, dtype, _ in STORE_COLUMNS.values()]
+)
+
+# the stored attributes each kind of object has
+_KIND_ATTRIBUTES = {
+    kind: [attribute for attribute in STORE_COLUMNS if hasattr(kind, attribute)] for kind in KINDS
+}
+
+_SWAP_BYTES = sys.byteorder != "little"
+
+
+def _padding(length: int) -> int:
+    return -length % 8
+
+
+def _column_layout(offset: int, count: int) -> Dict[str, Tuple[int, int]]:
+    """
+    Byte offset and length of every column, given where the first one starts.
+    """
+    layout = {}
+    for column, typecode in COLUMNS.items():
+        length = count * array(typecode).itemsize
+        layout[column] = (offset, length)
+        offset += length + _padding(length)
+    return layout
+
+
+def _board_objects(board: GameBoard) -> list:
+    return list(chain.from_iterable(board.occupied_squares.values()))
+
+
+def _gather_columns(board: GameBoard, objects: list) -> Dict[str, array]:
+    """
+    Every column as an array, taken straight from the entity store when the board has one.
+    """
+    kind_index = {kind: index for index, kind in enumerate(KINDS)}
+    columns = {"kind": array("B", map(kind_index.__getitem__, map(type, objects)))}
+
+    store = board.entity_store
+    if store is not None:
+        rows = entity_store.np.fromiter(
+            map(attrgetter("_store_index"), objects), dtype="int64", count=len(objects)
+        )
+        for column in COLUMNS:
+            if column not in columns and column != "template":
+                columns[column] = array(COLUMNS[column], getattr(store, column)[rows].tobytes())
+        return columns
+
+    coordinates = list(map(attrgetter("coordinates"), objects))
+    columns["x"] = array("q", [c[0] for c in coordinates])
+    columns["y"] = array("q", [c[1] for c in coordinates])
+    for attribute, (column, _, default) in STORE_COLUMNS.items():
+        columns[column] = array(
+            COLUMNS[column], [getattr(object_, attribute, default) for object_ in objects]
+        )
+    return columns
+
+
+def dumps(game: Game, extra: Optional[dict] = None) -> bytes:
+    """
+    Snapshot a game to bytes. `extra` is stored with the metadata for the caller's own state.
+    """
+    board = game.board
+    objects = _board_objects(board)
+
+    # Templates are interned, so identity finds the distinct ones, numbered in order of first use.
+    object_templates = list(map(attrgetter("_template"), objects))
+    distinct = dict(zip(map(id, object_templates), object_templates))
+    templates = list(distinct.values())
+    template_index = {key: index for index, key in enumerate(distinct)}
+    template_column = array("I", map(template_index.__getitem__, map(id, object_templates)))
+
+    columns = _gather_columns(board, objects)
+    columns["template"] = template_column
+
+    # (object index, turn) of every NPC booking, in booking order, and (object index, square)
+    # of every NPC destination
+    bookings = game.npcs.queue.bookings()
+    destinations = list(game.npcs.destinations.values())
+    if bookings or destinations:
+        object_index = dict(zip(map(id, objects), range(len(objects))))
+        bookings = [(object_index[id(ship)], turn) for ship, turn in bookings]
+        destinations = [(object_index[id(ship)], square) for ship, square in destinations]
+
+    metadata = pickle.dumps(
+        {
+            "config": game.config,
+            "seed": game.seed,
+            "templates": templates,
+            "gamestate": game.gamestate,
+            "npc_schedule": bookings,
+            "npc_destinations": destinations,
+            "chunks": board.chunks.state() if board.chunks is not None else None,
+            "rng_state": board.rng.getstate(),
+            "global_rng_state": random.getstate(),
+            "extra": extra or {},
+        },
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+
+    player_index = objects.index(board.player) if board.player is not None else -1
+
+    header = HEADER.pack(
+        MAGIC,
+        SNAPSHOT_FORMAT_VERSION,
+        0,
+        board.columns,
+        board.rows,
+        board.turn,
+        player_index,
+        len(objects),
+        len(metadata),
+    )
+    parts = [header, metadata, bytes(_padding(len(header) + len(metadata)))]
+    for column in COLUMNS:
+        values = columns[column]
+        if _SWAP_BYTES:
+            values.byteswap()
+        data = values.tobytes()
+        parts.append(data)
+        parts.append(bytes(_padding(len(data))))
+    return b"".join(parts)
+
+
+def save_game(game: Game, path: Union[str, Path], extra: Optional[dict] = None) -> None:
+    """
+    Write a snapshot of `game` to `path`, replacing the file atomically.
+    """
+    path = Path(path)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temp_path.write_bytes(dumps(game, extra))
+    os.replace(temp_path, path)
+
+
+class Snapshot(object):
+    """
+    Read-only view of a snapshot in memory or in a memory-mapped file.
+    Columns are exposed as memoryviews over the data; nothing is copied until restore().
+    """
+
+    def __init__(self, data: Union[bytes, mmap.mmap], _file=None):
+        self._data = data
+        self._file = _file
+        view = memoryview(data)
+        self._view = view
+
+        if len(view) < HEADER.size:
+            raise ValueError("Not a game snapshot: file is too short.")
+        (
+            magic,
+            version,
+            _,
+            self.board_columns,
+            self.board_rows,
+            self.turn,
+            self.player_index,
+            self.object_count,
+            metadata_length,
+        ) = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("Not a game snapshot.")
+        if version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(
+                f"Snapshot format version {version} is not supported "
+                f"(expected {SNAPSHOT_FORMAT_VERSION})."
+            )
+
+        metadata_end = HEADER.size + metadata_length
+        self.metadata: Dict[str, Any] = pickle.loads(view[HEADER.size : metadata_end])
+        self._layout = _column_layout(metadata_end + _padding(metadata_end), self.object_count)
+        end = max(offset + length for offset, length in self._layout.values())
+        if len(view) < end:
+            raise ValueError("Snapshot is truncated.")
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> "Snapshot":
+        """
+        Memory-map a snapshot file. Close it (or use it as a context manager) when done.
+        """
+        f = open(path, "rb")
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            f.close()
+            raise
+        return cls(data, f)
+
+    def close(self) -> None:
+        self._view.release()
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def gamestate(self):
+        return self.metadata["gamestate"]
+
+    @property
+    def extra(self) -> dict:
+        return self.metadata["extra"]
+
+    def column(self, name: str) -> Union[memoryview, array]:
+        """
+        One column of object state, indexed like the objects. Zero-copy on little-endian machines,
+        so release the view (or copy it with tolist()) before closing the snapshot.
+        """
+        offset, length = self._layout[name]
+        raw = self._view[offset : offset + length]
+        if _SWAP_BYTES:
+            values = array(COLUMNS[name], raw.tobytes())
+            values.byteswap()
+            return values
+        return raw.cast(COLUMNS[name])
+
+    def restore(
+        self,
+        config: Optional[dict] = None,
+        restore_rng: bool = True,
+        use_entity_store: Optional[bool] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        journal: Optional[Journal] = None,
+    ) -> Game:
+        """
+        Build a new Game in the saved position, with its own random generator where it was.
+        restore_rng also puts the global random generator (phrases, agents) back where it was.
+        """
+        if config is None:
+            config = self.metadata["config"]
+        if use_entity_store is None:
+            use_entity_store = config["game_board"].get("entity_store", False)
+
+        board = GameBoard(
+            self.board_columns,
+            self.board_rows,
+            use_entity_store=use_entity_store,
+            metrics=metrics,
+            journal=journal,
+            rng=random.Random(),
+        )
+        board.rng.setstate(self.metadata["rng_state"])
+        board.turn = self.turn
+
+        templates = [shared_template(template) for template in self.metadata["templates"]]
+        kinds = self.column("kind").tolist()
+        template_column = self.column("template").tolist()
+        xs = self.column("x").tolist()
+        ys = self.column("y").tolist()
+        values = {
+            attribute: self.column(column).tolist()
+            for attribute, (column, _, _) in STORE_COLUMNS.items()
+        }
+
+        objects = []
+        for i in range(self.object_count):
+            kind = KINDS[kinds[i]]
+            object_ = kind.from_template(templates[template_column[i]])
+            for attribute in _KIND_ATTRIBUTES[kind]:
+                setattr(object_, attribute, values[attribute][i])
+            board.place_object(object_, (xs[i], ys[i]))
+            objects.append(object_)
+
+        if board.entity_store is not None:
+            for object_ in objects:
+                board.entity_store.attach(object_)
+        if self.player_index >= 0:
+            board.player = objects[self.player_index]
+
+        game = Game(config, board=board, seed=self.metadata["seed"])
+        game.gamestate = self.gamestate
+        for index, turn in self.metadata["npc_schedule"]:
+            game.npcs.queue.schedule(objects[index], turn)
+        for index, square in self.metadata.get("npc_destinations", ()):
+            game.npcs.set_destination(objects[index], square)
+        chunks = self.metadata.get("chunks")
+        if chunks is not None and game.board.chunks is not None:
+            game.board.chunks.set_state(chunks)
+        if restore_rng:
+            random.setstate(self.metadata["global_rng_state"])
+        return game
+
+
+def loads(data: bytes, **kwargs) -> Game:
+    """
+    Restore a game from bytes returned by dumps().
+    """
+    return Snapshot(data).restore(**kwargs)
+
+
+def load_game(path: Union[str, Path], **kwargs) -> Game:
+    """
+    Restore a game from a snapshot file. Keyword arguments are passed to Snapshot.restore.
+    """
+    with Snapshot.open(path) as snap:
+        return snap.restore(**kwargs)
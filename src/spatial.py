@@ -0,0 +1,110 @@
+"""
+spatial.py
+Spatial index for the GameBoard.
+
+The board keeps a dictionary of occupied squares, which is fine for looking up a single square
+but forces a full pass over the dictionary (or over every square in an area) to answer
+"what is near this point?".  SpatialGrid buckets occupied squares into fixed-size cells so
+rectangle and radius queries only touch the cells that actually contain something.
+"""
+# Python standard library
+from typing import Dict, Iterator, Set, Tuple
+
+DEFAULT_BUCKET_SIZE = 16
+
+
+class SpatialGrid(object):
+    """
+    Uniform bucket grid over board coordinates.
+    Each bucket holds the set of occupied squares that fall inside it.
+    Empty buckets are never stored, so memory is proportional to the number of occupied squares.
+    """
+
+    def __init__(self, bucket_size: int = DEFAULT_BUCKET_SIZE):
+        if bucket_size < 1:
+            raise ValueError("SpatialGrid bucket size must be at least 1")
+        self.bucket_size = bucket_size
+        self.buckets: Dict[Tuple[int, int], Set[tuple]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(squares) for squares in self.buckets.values())
+
+    def __contains__(self, coordinates: tuple) -> bool:
+        squares = self.buckets.get(self._bucket_key(coordinates))
+        return bool(squares) and coordinates in squares
+
+    def _bucket_key(self, coordinates: tuple) -> Tuple[int, int]:
+        return (coordinates[0] // self.bucket_size, coordinates[1] // self.bucket_size)
+
+    def insert(self, coordinates: tuple) -> None:
+        """
+        Mark a square as occupied.  Inserting an already indexed square is a no-op.
+        """
+        key = self._bucket_key(coordinates)
+        squares = self.buckets.get(key)
+        if squares is None:
+            self.buckets[key] = {coordinates}
+        else:
+            squares.add(coordinates)
+
+    def remove(self, coordinates: tuple) -> None:
+        """
+        Mark a square as unoccupied.  Removing a square that is not indexed is a no-op.
+        """
+        key = self._bucket_key(coordinates)
+        squares = self.buckets.get(key)
+        if squares is None:
+            return
+        squares.discard(coordinates)
+        if not squares:
+            del self.buckets[key]
+
+    def move(self, old_coordinates: tuple, new_coordinates: tuple) -> None:
+        """
+        convenience function for moving a square's index entry
+        """
+        self.remove(old_coordinates)
+        self.insert(new_coordinates)
+
+    def query_rect(self, x_min: int, y_min: int, x_max: int, y_max: int) -> Iterator[tuple]:
+        """
+        Yield every indexed square with x_min <= x <= x_max and y_min <= y <= y_max.
+
+        Walks whichever is smaller: the buckets overlapping the rectangle or the non-empty buckets.
+        Either way the cost is bounded by the occupied part of the board, not the rectangle's area.
+        """
+        if x_min > x_max or y_min > y_max:
+            return
+
+        bx_min, by_min = self._bucket_key((x_min, y_min))
+        bx_max, by_max = self._bucket_key((x_max, y_max))
+        covered_buckets = (bx_max - bx_min + 1) * (by_max - by_min + 1)
+
+        if covered_buckets <= len(self.buckets):
+            candidates = (
+                self.buckets.get((bx, by))
+                for bx in range(bx_min, bx_max + 1)
+                for by in range(by_min, by_max + 1)
+            )
+        else:
+            candidates = (
+                squares
+                for (bx, by), squares in self.buckets.items()
+                if bx_min <= bx <= bx_max and by_min <= by <= by_max
+            )
+
+        for squares in candidates:
+            if not squares:
+                continue
+            for square in squares:
+                if x_min <= square[0] <= x_max and y_min <= square[1] <= y_max:
+                    yield square
+
+    def query_radius(self, center: tuple, radius: int) -> Iterator[tuple]:
+        """
+        Yield every indexed square within `radius` sectors of `center`.
+        Distance is measured the same way as ship movement: the larger of the x and y offsets.
+        """
+        return self.query_rect(
+            center[0] - radius, center[1] - radius, center[0] + radius, center[1] + radius
+        )
@@ -0,0 +1,86 @@
+"""
+test_chunks.py
+Unit tests for lazily generated board sectors.
+"""
+# Python standard library
+import random
+
+# Third-party modules
+import pytest
+
+# Local modules
+from chunks import ChunkManager
+from objects import Game, GameBoard, Location, LocationTemplate, Ship
+import utils
+
+ROCK = LocationTemplate(name="rock", formal_name="Rock", hit_points=10, danger=0.5)
+
+
+def chunked_board(**kwargs) -> GameBoard:
+    board = GameBoard(10 ** 6, 10 ** 6, rng=random.Random(1))
+    board.chunks = ChunkManager(board, 8, 3, [(ROCK, 0.1)], Location, **kwargs)
+    return board
+
+
+def locations(board: GameBoard) -> list:
+    return sorted(
+        (obj.coordinates, obj.hit_points)
+        for objects in board.occupied_squares.values()
+        for obj in objects
+        if isinstance(obj, Location)
+    )
+
+
+def test_sectors_are_generated_on_arrival():
+
+    """
+    Tests nothing is generated until a ship gets there, and a sector always comes out the same
+    """
+    board = chunked_board()
+    ship = Ship(formal_name="ship", actions=("movements",), scan_radius=0, movement_speed=9)
+    board.add_ship_to_board(ship, (0, 0))
+    assert locations(board) == []
+
+    board.move_object(ship, (20, 4))
+    assert (2, 0) in board.chunks and len(board.chunks) == 1
+    specs = board.chunks.generate((2, 0))
+    assert specs == chunked_board().chunks.generate((2, 0))
+    assert locations(board) == sorted((square, 10) for _, square, _, _ in specs)
+
+    ship.scan_radius = 8
+    board.render = False
+    board.chunks.load_area(ship.coordinates, ship.scan_radius)
+    assert len(board.chunks) == 6
+
+    config = dict(utils.CONFIG, game_board=dict(utils.CONFIG["game_board"], chunk_size=16))
+    config["game_board"].update(x_len=10 ** 9, y_len=10 ** 9)
+    game = Game(config, seed=1)
+    assert all(x < 16 and y < 16 for x, y in game.board.occupied_squares)
+
+
+@pytest.mark.parametrize("on_disk", [False, True])
+def test_evicted_sectors_come_back_as_they_were(tmp_path, on_disk):
+
+    """
+    Tests cold sectors leave the board, and come back changed only if they had changed
+    """
+    board = chunked_board(max_chunks=1, chunk_dir=tmp_path if on_disk else None)
+    first = {square for _, square, _, _ in board.chunks.generate((0, 0))}
+    second = {square for _, square, _, _ in board.chunks.generate((1, 0))}
+    start = next((x, 1) for x in range(8) if (x, 1) not in first)
+    ship = Ship(formal_name="ship", actions=("movements",), movement_speed=9)
+    board.add_ship_to_board(ship, (0, 7))
+    board.move_object(ship, start)
+    damaged = next(obj for obj in board.occupied_squares[min(first)] if isinstance(obj, Location))
+    damaged.hit_points = 1
+    before = locations(board)
+
+    board.move_object(ship, next((x, 1) for x in range(8, 16) if (x, 1) not in second))
+    assert list(board.chunks.state()["loaded"]) == [(1, 0)]
+    assert all(square[0] >= 8 for square, _ in locations(board))
+
+    board.move_object(ship, start)
+    assert locations(board) == before
+    # the untouched sector was dropped, to be generated again
+    assert board.chunks.state()["saved"] == {}
+    assert list(tmp_path.iterdir()) == []
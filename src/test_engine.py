@@ -0,0 +1,146 @@
+"""
+test_engine.py
+Unit tests for headless game sessions and batch simulation.
+"""
+# Python standard library
+import json
+
+# Third-party modules
+import pytest
+
+# Local modules
+from engine import GameSession, random_policy, run_batch, run_headless_game
+from enums import GameState, SessionState
+from metrics import MetricsRegistry
+from renderer import Renderer, null_sink
+import utils
+
+
+SELF_DESTRUCT_SCRIPT = ["scan", "self destruct", "not the pass phrase", "000-DESTRUCT-0"]
+
+
+def test_session_dialog():
+
+    """
+    Tests a session walks through the movement dialog and collects output instead of printing
+    """
+    messages = []
+    session = GameSession(utils.CONFIG, writer=messages.append)
+    start = session.player.coordinates
+
+    session.handle_line("move")
+    assert session.state == SessionState.AWAITING_DIRECTION
+    session.handle_line("sideways")
+    assert session.state == SessionState.AWAITING_DIRECTION
+    session.handle_line("north")
+    session.handle_line("0")
+
+    assert session.state == SessionState.AWAITING_COMMAND
+    assert session.turn == 1
+    assert session.player.coordinates == start
+    assert all(message.endswith("\n") for message in messages)
+
+
+def test_output_is_written_once_per_line():
+
+    """
+    Tests everything a scan reports reaches the writer in one write, however many contacts it has
+    """
+    batches = []
+    session = GameSession(utils.CONFIG, writer=batches.append)
+    board = session.game.board
+    session.player.scan_radius = max(board.columns, board.rows)
+    contacts = sum(len(objects) for objects in board.occupied_squares.values()) - 1
+
+    session.handle_line("scan")
+    assert len(batches) == 1
+    assert batches[0].count("sectors from here") == contacts
+    assert session.output.writes == 1 and session.output.pending == 0
+
+    renderer = Renderer(batches.append, max_pending=10)
+    renderer.write("0123456789")
+    assert len(batches) == 2
+    headless = Renderer(null_sink)
+    headless.write("discarded")
+    assert headless.pending == 0
+
+
+def test_discoveries_are_announced_on_arrival():
+
+    """
+    Tests the player hears about what they run into once, when they get there
+    """
+    messages = []
+    config = dict(utils.CONFIG, npc={"max_interval": 0})
+    session = GameSession(config, writer=messages.append, seed=3)
+    board = session.game.board
+    x, y = session.player.coordinates
+    direction, step = ("north", 1) if y < board.rows else ("south", -1)
+    planet = next(
+        obj for objects in board.occupied_squares.values() for obj in objects
+        if obj.name == "destination_planet"
+    )
+    board.move_object(planet, (x, y + step))
+
+    for line in ["move", direction, "1", "scan"]:
+        session.handle_line(line)
+    assert [message.count("At long last") for message in messages[-2:]] == [1, 0]
+
+
+def test_scripted_game_ends_in_self_destruct(capfd: pytest.fixture):
+
+    """
+    Tests a scripted game runs to completion without terminal output
+    """
+    result = run_headless_game(SELF_DESTRUCT_SCRIPT, seed=1)
+
+    assert result.gamestate == GameState.GAME_OVER_PLAYER_DESTROYED
+    assert result.turns == 2
+    assert result.lines == 4
+    out, err = capfd.readouterr()
+    assert out == ""
+
+
+def test_run_batch_is_reproducible():
+
+    """
+    Tests batches of policy-driven games are seeded per game and summarized
+    """
+    summary = run_batch(20, random_policy, processes=1, base_seed=7)
+    again = run_batch(20, random_policy, processes=1, base_seed=7)
+
+    assert summary["games"] == 20
+    assert sum(summary["outcomes"].values()) == 20
+    assert summary["outcomes"] == again["outcomes"]
+    assert summary["turns"] == again["turns"]
+
+
+def test_session_metrics(tmp_path):
+
+    """
+    Tests a session records action, parse and render metrics and exports them
+    """
+    registry = MetricsRegistry()
+    # idle NPCs, so every board mutation is the player's
+    config = dict(utils.CONFIG, npc={"max_interval": 0})
+    session = GameSession(config, writer=lambda output: None, metrics=registry)
+    for line in ["scan", "move", "north", "0", "gibberish"]:
+        session.handle_line(line)
+
+    assert registry.histogram("action_seconds", action="SENSORS").count == 1
+    assert registry.histogram("action_seconds", action="MOVE").count == 1
+    assert registry.counter("actions_total", action="MOVE", result="success").value == 1
+    assert registry.counter("board_mutations_total", kind="move").value == 1
+    assert registry.counter("turns_total").value == 2
+    assert registry.histogram("command_parse_seconds").count == 5
+    assert registry.histogram("line_seconds").count == 5
+    assert registry.histogram("render_seconds").count >= 5
+
+    registry.write_snapshot(tmp_path / "metrics.json")
+    snapshot = json.loads((tmp_path / "metrics.json").read_text())
+    assert {h["name"] for h in snapshot["histograms"]} >= {"action_seconds", "render_seconds"}
+
+    registry.write_snapshot(tmp_path / "metrics.prom")
+    text = (tmp_path / "metrics.prom").read_text()
+    assert '# TYPE soldado_action_seconds histogram' in text
+    assert 'soldado_action_seconds_count{action="MOVE"} 1' in text
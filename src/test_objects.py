@@ -3,13 +3,16 @@ test_objects.py
 Unit tests for Game and GameObject methods. 
 """
 # Python standard library
+import random
 
 # Third-party modules
 import pytest
 
 # Local modules
-from objects import GameBoard, Ship
-from enums import Directions
+import objects
+from objects import GameBoard, Location, Ship, ShipTemplate
+from enums import Actions, BoardEvent, Directions, JournalEvent
+from journal import Journal
 
 
 @pytest.fixture(scope="function")
@@ -70,7 +73,7 @@ def test_scan(gameboard: GameBoard, ship: ship, newship: ship, capfd: pytest.fix
     gameboard.add_ship_to_board(ship, (0, 0))
     gameboard.add_ship_to_board(newship, (0, 1))
 
-    ship.scan(gameboard.occupied_squares)
+    ship.scan(gameboard)
     out, err = capfd.readouterr()
     EXPECTED_SCAN_OUTPUT = '\nTarget: USS Reliant detected. This object is 1 sectors from here.\nTarget: MCRN Donnager detected. This object is 0 sectors from here.\n'
     assert out == EXPECTED_SCAN_OUTPUT
@@ -118,3 +121,221 @@ def test_add_ship_to_board(gameboard, ship):
 
     with pytest.raises(ValueError):
         gameboard.add_ship_to_board(ship, (0, 0))
+
+
+def test_spatial_index_tracks_board(gameboard: GameBoard, ship: Ship):
+
+    """
+    Tests the spatial index follows objects as they are added and moved around the board
+    """
+
+    gameboard.add_ship_to_board(ship, (0, 0))
+    assert gameboard.get_squares_in_radius((1, 1), 1) == [(0, 0)]
+    assert gameboard.get_squares_in_rect(1, 0, 1, 1) == []
+
+    gameboard.move_object(ship, (1, 0))
+    assert gameboard.get_squares_in_rect(1, 0, 1, 1) == [(1, 0)]
+    assert gameboard.get_squares_in_radius((0, 1), 0) == []
+
+
+def test_entity_store_views():
+
+    """
+    Tests objects on a board with an entity store read and write through to the store's arrays
+    """
+    pytest.importorskip("numpy")
+
+    gameboard = GameBoard(3, 3, use_entity_store=True)
+    near = Ship(hit_points=10, scan_radius=1, formal_name="near")
+    far = Ship(hit_points=10, scan_radius=1, formal_name="far")
+    gameboard.add_ship_to_board(near, (0, 0))
+    gameboard.add_ship_to_board(far, (3, 3))
+
+    store = gameboard.entity_store
+    gameboard.move_object(near, (1, 1))
+    assert near.coordinates == (1, 1)
+    assert store.objects_at(store.rows_within((0, 0), 1)) == [near]
+
+    destroyed = store.apply_damage([near._store_index, near._store_index], 5)
+    assert near.hit_points == 0
+    assert store.objects_at(destroyed) == [near]
+    assert far.hit_points == 10
+
+    store.detach(far)
+    assert far.coordinates == (3, 3) and far.hit_points == 10
+    assert len(store) == 1
+
+
+def test_place_many_and_release(gameboard: GameBoard):
+
+    """
+    Tests bulk placement fills distinct squares and moving off a square makes it available again
+    """
+    ships = [Ship(formal_name=f"ship {i}") for i in range(3)]
+    gameboard.place_many(ships)
+
+    assert len(gameboard.occupied_squares) == 3
+    free_square = gameboard.get_random_unoccupied_square()
+    assert free_square not in gameboard.occupied_squares
+
+    with pytest.raises(RuntimeError):
+        gameboard.place_many([Ship(), Ship()])
+
+    vacated = ships[0].coordinates
+    gameboard.move_object(ships[0], free_square)
+    assert gameboard.get_random_unoccupied_square() == vacated
+
+
+def test_ships_share_templates():
+
+    """
+    Tests ships built from the same configuration share one template and have no per-instance dict
+    """
+    first = Ship(name="raider", formal_name="Cylon Raider", hit_points=5)
+    second = Ship.from_template(ShipTemplate(name="raider", formal_name="Cylon Raider", hit_points=5))
+
+    assert first.template is second.template
+    assert not hasattr(second, "__dict__")
+
+    second.hit_points -= 1
+    assert first.hit_points == 5
+
+    # renaming one ship must not rename the other
+    second.formal_name = "Heavy Raider"
+    assert first.formal_name == "Cylon Raider"
+    assert first.template is not second.template
+
+
+def test_journal_records_board_events():
+
+    """
+    Tests board mutations are journalled as records and only formatted when dumped
+    """
+    journal = Journal(capacity=4)
+    gameboard = GameBoard(3, 3, journal=journal)
+    ship = Ship(name="viper", formal_name="Viper")
+    gameboard.add_ship_to_board(ship, (0, 0))
+    assert gameboard.calculate_updated_location_and_validate((0, 0), (Directions.SOUTH, 1)) is None
+    gameboard.turn = 2
+    gameboard.move_object(ship, (1, 1))
+
+    events = [record.event for record in journal.records()]
+    assert events == [
+        JournalEvent.SHIP_ADDED,
+        JournalEvent.MOVE_NEGATIVE,
+        JournalEvent.SQUARE_VACATED,
+        JournalEvent.OBJECT_MOVED,
+    ]
+    assert journal.dump(last=1) == ["[3] turn 2: Moved viper from (0, 0) to (1, 1)"]
+
+    # the ring buffer keeps only the newest events
+    gameboard.calculate_updated_location_and_validate((1, 1), (Directions.NORTH, 1))
+    assert len(journal) == 4
+    assert next(journal.records()).event == JournalEvent.MOVE_NEGATIVE
+
+
+def test_visibility_follows_moves():
+
+    """
+    Tests tracked contacts match a full rescan after every move, with enter and leave events
+    """
+    rng = random.Random(6)
+    gameboard = GameBoard(15, 15, journal=Journal(), rng=rng)
+    events = []
+    gameboard.visibility.watchers.append(lambda ship, obj, entered: events.append(entered))
+    observer = Ship(formal_name="observer", scan_radius=3)
+    gameboard.add_ship_to_board(observer, (7, 7))
+    gameboard.visibility.track(observer)
+    others = [Ship(formal_name=f"ship {i}", scan_radius=i % 3) for i in range(30)]
+    gameboard.place_many(others + [Location() for _ in range(10)])
+    for ship in others[:5]:
+        gameboard.visibility.track(ship)
+
+    for _ in range(300):
+        mover = rng.choice(others + [observer])
+        gameboard.move_object(mover, (rng.randint(0, 15), rng.randint(0, 15)))
+
+    for ship in [observer] + others[:5]:
+        expected = {
+            id(obj)
+            for square in gameboard.get_squares_in_radius(ship.coordinates, ship.scan_radius)
+            for obj in gameboard.occupied_squares[square]
+        }
+        assert {id(obj) for obj in gameboard.visibility.visible(ship)} == expected
+    assert True in events and False in events
+    recorded = {record.event for record in gameboard.journal.records()}
+    assert {JournalEvent.SENSOR_CONTACT, JournalEvent.SENSOR_LOST} <= recorded
+
+
+def test_board_events():
+
+    """
+    Tests the board tells each subscriber about the events it asked for, as they happen
+    """
+    gameboard = GameBoard(5, 5)
+    ship = Ship(formal_name="ship", actions=("self_destruct",))
+    planet = Location(name="planet")
+    events = []
+
+    def record(event, obj, square, other):
+        events.append((event, obj, square, other))
+
+    gameboard.events.subscribe(BoardEvent.CO_LOCATION, record, object_=planet)
+    gameboard.events.subscribe(BoardEvent.LEAVE_SQUARE, record, square=(1, 1))
+    gameboard.events.subscribe(BoardEvent.OBJECT_DESTROYED, record)
+    gameboard.add_location_to_board(planet, (2, 2))
+    gameboard.add_ship_to_board(ship, (1, 1))
+    gameboard.move_object(ship, (3, 3))
+    gameboard.move_object(ship, (2, 2))
+    gameboard.execute_action(Actions.SELF_DESTRUCT, True, ship)
+    assert events == [
+        (BoardEvent.LEAVE_SQUARE, ship, (1, 1), None),
+        (BoardEvent.CO_LOCATION, ship, (2, 2), planet),
+        (BoardEvent.OBJECT_DESTROYED, ship, (2, 2), None),
+    ]
+
+    gameboard.remove_object(planet)
+    assert not gameboard.events.listening(BoardEvent.CO_LOCATION)
+
+
+def test_execute_actions():
+
+    """
+    Tests a batch of moves is checked together, with the first ship winning a contested square
+    """
+    gameboard = GameBoard(9, 9)
+    ships = [Ship(formal_name=name, actions=("movements", "sensors")) for name in "abc"]
+    for ship, square in zip(ships, [(0, 0), (2, 2), (5, 0)]):
+        gameboard.add_ship_to_board(ship, square)
+    idle = Ship(formal_name="idle")
+    gameboard.add_ship_to_board(idle, (9, 9))
+    a, b, c = ships
+    commands = [
+        (a, Actions.MOVE, (Directions.NORTH, 2)),
+        (b, Actions.MOVE, (Directions.WEST, 2)),
+        (c, Actions.MOVE, (Directions.SOUTH, 1)),
+        (a, Actions.MOVE, (Directions.EAST, 1)),
+        (idle, Actions.MOVE, (Directions.SOUTH, 1)),
+        (b, Actions.SENSORS, None),
+    ]
+    assert gameboard.execute_actions(commands) == [True, False, False, False, False, True]
+    assert [ship.coordinates for ship in ships + [idle]] == [(0, 2), (2, 2), (5, 0), (9, 9)]
+
+    def fleet_moves(numpy_min: int) -> tuple:
+        rng = random.Random(8)
+        board = GameBoard(30, 30, rng=random.Random(8))
+        fleet = [Ship(formal_name=str(i), actions=("movements",)) for i in range(300)]
+        board.place_many(fleet)
+        commands = [
+            (rng.choice(fleet), Actions.MOVE, (rng.choice(list(Directions)), rng.randint(0, 4)))
+            for _ in range(400)
+        ]
+        objects.NUMPY_MIN_MOVES, saved = numpy_min, objects.NUMPY_MIN_MOVES
+        try:
+            results = board.execute_actions(commands)
+        finally:
+            objects.NUMPY_MIN_MOVES = saved
+        return results, [ship.coordinates for ship in fleet]
+
+    pytest.importorskip("numpy")
+    assert fleet_moves(1) == fleet_moves(10 ** 9)
@@ -0,0 +1,76 @@
+"""
+test_pathfinding.py
+Unit tests for routing ships around hazards.
+"""
+# Python standard library
+import random
+
+# Third-party modules
+
+# Local modules
+from engine import GameSession, autopilot_policy, discard_output
+from objects import GameBoard, Location
+from pathfinding import DistanceField, PathFinder
+import utils
+
+
+def route_cost(finder: PathFinder, start: tuple, moves: list) -> float:
+    x, y = start
+    cost = 0.0
+    for direction, distance in moves:
+        x, y = x + direction.value[0] * distance, y + direction.value[1] * distance
+        cost += finder.step_cost((x, y))
+    return cost
+
+
+def test_find_path_avoids_hazards():
+
+    """
+    Tests A* reaches the goal in the fewest moves, and pays for a detour around a hazard
+    """
+    board = GameBoard(10, 10)
+    finder = PathFinder(board)
+    assert len(finder.find_path((0, 0), (9, 6), 3)) == 3
+
+    board.add_location_to_board(Location(danger=1), (2, 2))
+    path = finder.find_path((0, 0), (4, 4), 2)
+    assert route_cost(finder, (0, 0), path) == 3.0
+    assert finder.find_path((0, 0), (20, 0), 2) is None
+
+
+def test_fields_are_repaired_incrementally():
+
+    """
+    Tests cached fields follow hazards arriving and leaving exactly as a rebuilt field would
+    """
+    board = GameBoard(30, 30, rng=random.Random(2))
+    finder = PathFinder(board)
+    target = (25, 20)
+    field = finder.field(target, 2)
+    assert finder.field(target, 2) is field
+
+    hazards = [Location(danger=random.Random(i).random()) for i in range(40)]
+    board.place_many(hazards)
+    for hazard in hazards[:20]:
+        board.move_object(hazard, (hazard.coordinates[0] // 2, hazard.coordinates[1]))
+
+    rebuilt = DistanceField(PathFinder(board), target, 2)
+    assert all(abs(a - b) < 1e-9 for a, b in zip(finder.field(target, 2).costs, rebuilt.costs))
+    start = (0, 0)
+    moves = field.path(start)
+    assert abs(route_cost(finder, start, moves) - field.cost(start)) < 1e-9
+    searched = finder.find_path(start, target, 2)
+    assert abs(route_cost(finder, start, searched) - field.cost(start)) < 1e-9
+
+
+def test_autopilot_reaches_destination():
+
+    """
+    Tests the autopilot agent flies the player to the destination planet
+    """
+    random.seed(4)
+    session = GameSession(utils.CONFIG, writer=discard_output, seed=4)
+    while session.autopilot_move() is not None and session.lines_handled < 100:
+        session.handle_line(autopilot_policy(session))
+
+    assert session.player.coordinates == session.destination
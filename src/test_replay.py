@@ -0,0 +1,61 @@
+"""
+test_replay.py
+Unit tests for recording and replaying games.
+"""
+# Python standard library
+import random
+
+# Third-party modules
+import pytest
+
+# Local modules
+from engine import GameSession, discard_output, random_policy
+from replay import Recording, ReplayIndex, replay, session_outcome, verify
+import utils
+
+
+@pytest.fixture(scope="module")
+def recording() -> Recording:
+    """
+    Fixture recording a long game played with rendering on, without self destructs
+    """
+    random.seed(11)
+    session = GameSession(utils.CONFIG, writer=discard_output)
+    while session.lines_handled < 300:
+        line = random_policy(session)
+        session.handle_line("scan" if line == "self destruct" else line)
+    return Recording.from_session(session)
+
+
+def test_replay_reproduces_outcome(recording: Recording, tmp_path):
+
+    """
+    Tests a saved recording replays without rendering to the recorded outcome
+    """
+    path = tmp_path / "game.json"
+    recording.save(path)
+    loaded = Recording.load(path)
+
+    assert loaded == recording
+    assert verify(loaded) == []
+    # scrambling the phrase generator must not change the game
+    random.seed(12345)
+    assert session_outcome(replay(loaded, render=True)) == recording.outcome
+
+
+def test_seek_and_bisect(recording: Recording):
+
+    """
+    Tests seeking through checkpoints matches a straight replay, and bisect finds the first turn
+    """
+    index = ReplayIndex(recording, interval=10)
+    assert len(index.checkpoints) > 5
+
+    for turn in (0, 7, 30, 41, index.final_turn + 10):
+        assert session_outcome(index.seek(turn)) == session_outcome(replay(recording, turn))
+
+    target = session_outcome(replay(recording, 37))["player_coordinates"]
+    first = index.bisect(lambda s: s.turn >= 37)
+    assert first == 37
+    assert session_outcome(index.seek(first))["player_coordinates"] == target
+    assert index.bisect(lambda s: False) is None
@@ -0,0 +1,60 @@
+"""
+test_scheduler.py
+Unit tests for NPC turn scheduling.
+"""
+# Python standard library
+import random
+
+# Third-party modules
+
+# Local modules
+from objects import GameBoard, Ship
+from scheduler import NPCScheduler, TurnScheduler
+
+
+def test_turn_scheduler_order():
+
+    """
+    Tests objects come due on their turn in booking order, including bookings past the wheel
+    """
+    queue = TurnScheduler(wheel_size=4)
+    for name, turn in [("a", 2), ("b", 1), ("c", 2), ("far", 11), ("gone", 2)]:
+        queue.schedule(name, turn)
+    queue.schedule("a", 3)
+    queue.cancel("gone")
+
+    assert len(queue) == 4
+    assert queue.advance(1) == ["b"]
+    assert queue.advance(2) == ["c"]
+    assert queue.advance(3) == ["a"]
+    assert queue.due("far") == 11
+    assert queue.advance(10) == []
+    assert queue.advance(20) == ["far"]
+    assert len(queue) == 0
+
+
+def test_only_due_ships_act():
+
+    """
+    Tests idle ships are never visited and active ships act on their turns, moving on the board
+    """
+    board = GameBoard(200, 200, rng=random.Random(5))
+    ships = [
+        Ship(formal_name=f"ship {i}", actions=("movements",), movement_speed=2) for i in range(5000)
+    ]
+    board.place_many(ships)
+    npcs = NPCScheduler(board, 2, 2)
+    active = ships[:50]
+    for ship in active:
+        npcs.add(ship)
+    start = {id(ship): ship.coordinates for ship in ships}
+
+    board.turn = 1
+    assert npcs.run_turn() == 0
+    board.turn = 2
+    assert npcs.run_turn() == 50
+    assert len(npcs) == 50
+
+    moved = {id(ship) for ship in ships if ship.coordinates != start[id(ship)]}
+    assert moved and moved <= {id(ship) for ship in active}
+    assert board.metrics.counter("npc_actions_total").value >= 50
@@ -0,0 +1,49 @@
+"""
+test_session_server.py
+Tests for hosting concurrent games over local sockets.
+"""
+# Python standard library
+import asyncio
+
+# Third-party modules
+
+# Local modules
+from session_server import SessionServer
+
+SELF_DESTRUCT_SCRIPT = ["scan", "self destruct", "000-DESTRUCT-0"]
+
+
+async def _play(port: int) -> str:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for line in SELF_DESTRUCT_SCRIPT:
+        writer.write((line + "\r\n").encode())
+    await writer.drain()
+    received = await reader.read()
+    writer.close()
+    return received.decode()
+
+
+async def _run_clients(n_clients: int) -> tuple:
+    server = SessionServer()
+    await server.start()
+    transcripts = await asyncio.gather(*(_play(server.port) for _ in range(n_clients)))
+    report = server.latency_report()
+    await server.stop()
+    return transcripts, report
+
+
+def test_concurrent_sessions():
+
+    """
+    Tests many clients each get an independent game that runs to completion, with latency stats per session
+    """
+    transcripts, report = asyncio.run(_run_clients(25))
+
+    for transcript in transcripts:
+        assert transcript.startswith("Starting game...")
+        assert "GAME OVER" in transcript
+
+    assert report["active_sessions"] == 0
+    assert report["finished_sessions"] == 25
+    assert len(report["sessions"]) == 25
+    assert all(s["lines"] == 3 for s in report["sessions"].values())
@@ -0,0 +1,48 @@
+"""
+test_sharding.py
+Unit tests for simulating a board across worker processes.
+"""
+# Python standard library
+
+# Third-party modules
+
+# Local modules
+from objects import ShipTemplate
+from sharding import ShardedWorld
+
+SCOUT = ShipTemplate(name="scout", actions=("movements",), hit_points=5, movement_speed=3)
+
+
+def positions(world: ShardedWorld) -> list:
+    return sorted((state[1], state[5]) for state in world.ships())
+
+
+def test_sharded_world_replays_across_processes():
+
+    """
+    Tests ships cross strip edges, none are lost, and worker processes play the same world
+    as shards run in the calling process
+    """
+    worlds = [ShardedWorld(59, 59, 3, seed=2, processes=processes) for processes in (False, True)]
+    try:
+        for world in worlds:
+            world.populate(SCOUT, 300)
+        assert worlds[0].step(10) == worlds[1].step(10) > 300
+        assert worlds[0].handoffs == worlds[1].handoffs > 0
+        assert positions(worlds[0]) == positions(worlds[1])
+        assert worlds[0].count() == worlds[1].count() == 300
+    finally:
+        for world in worlds:
+            world.close()
+
+
+def test_scans_reach_across_strip_edges():
+
+    """
+    Tests a scan next to a strip edge finds the ships on the neighbouring shard
+    """
+    with ShardedWorld(19, 9, 2, processes=False) as world:
+        assert world.edges == [0, 10, 20]
+        world.add([(SCOUT, (9, 4), 5, 0, 3, None), (SCOUT, (11, 5), 5, 0, 3, None)])
+        assert sorted(world.scan((9, 4), 2)) == [("scout", (9, 4)), ("scout", (11, 5))]
+        assert world.scan((3, 4), 2) == []
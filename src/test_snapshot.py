@@ -0,0 +1,72 @@
+"""
+test_snapshot.py
+Unit tests for saving and restoring games.
+"""
+# Python standard library
+import random
+
+# Third-party modules
+import pytest
+
+# Local modules
+from engine import GameSession, discard_output, random_policy
+import snapshot
+import utils
+
+
+def board_state(game) -> dict:
+    return {
+        square: sorted((o.formal_name, o.hit_points) for o in objects)
+        for square, objects in game.board.occupied_squares.items()
+    }
+
+
+def test_snapshot_round_trip(tmp_path):
+
+    """
+    Tests a saved game restores to the same board, player, turn and game state
+    """
+    session = GameSession(utils.CONFIG, writer=discard_output)
+    for line in ["move", "north", "1", "scan"]:
+        session.handle_line(line)
+    session.player.hit_points -= 3
+
+    path = tmp_path / "game.snap"
+    snapshot.save_game(session.game, path)
+    with snapshot.Snapshot.open(path) as snap:
+        assert snap.object_count == sum(len(v) for v in session.game.board.occupied_squares.values())
+        assert list(snap.column("x"))[snap.player_index] == session.player.coordinates[0]
+        restored = snap.restore()
+
+    assert board_state(restored) == board_state(session.game)
+    assert restored.board.player.coordinates == session.player.coordinates
+    assert restored.board.player.hit_points == session.player.hit_points
+    assert restored.board.turn == session.turn
+    assert restored.gamestate == session.game.gamestate
+
+    with pytest.raises(ValueError):
+        snapshot.Snapshot(b"not a snapshot" * 10)
+
+
+def test_forked_sessions_replay_identically(tmp_path):
+
+    """
+    Tests sessions restored from one snapshot continue identically, RNG included
+    """
+    random.seed(3)
+    session = GameSession(utils.CONFIG, writer=discard_output)
+    for _ in range(10):
+        session.handle_line(random_policy(session))
+    path = tmp_path / "session.snap"
+    session.save(path)
+
+    outputs = []
+    for _ in range(2):
+        lines = []
+        fork = GameSession.restore(path, writer=lines.append)
+        assert fork.state == session.state
+        for _ in range(20):
+            fork.handle_line(random_policy(fork))
+        outputs.append((lines, board_state(fork.game)))
+
+    assert outputs[0] == outputs[1]
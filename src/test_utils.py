@@ -0,0 +1,114 @@
+"""
+test_utils.py
+Unit tests for input parsing helpers.
+"""
+# Python standard library
+import pickle
+import subprocess
+import sys
+
+# Third-party modules
+import pytest
+
+# Local modules
+from enums import Actions, Directions
+from keyword_matcher import KeywordMatcher
+import phrases
+from phrases import PhraseTable, PhraseTemplate
+import resource_bundle
+import utils
+
+
+@pytest.mark.parametrize(
+    "input_string, expected",
+    [
+        ("scan", Actions.SENSORS),
+        ("Fire up the DRADIS", Actions.SENSORS),
+        ("prepare an FTL jump", Actions.MOVE),
+        ("jump the ship", Actions.MOVE),
+        ("initiate self destruct", Actions.SELF_DESTRUCT),
+        ("jump", None),
+        ("", None),
+    ],
+)
+def test_check_for_action(input_string: str, expected: Actions):
+
+    """
+    Tests single words and multi-word phrases are matched anywhere in the input
+    """
+
+    assert utils.check_for_action(input_string) == expected
+
+
+def test_keyword_matcher_precedence():
+
+    """
+    Tests overlapping phrases resolve to the entry listed first in the table
+    """
+    matcher = KeywordMatcher(
+        [("first", ["b c"]), ("second", ["a b c d", "c"]), ("third", ["x"])]
+    )
+
+    assert matcher.match("a b c d") == "first"
+    assert matcher.match("x c") == "second"
+    assert matcher.match("a b x") == "third"
+    assert utils.DIRECTION_MATCHER.match("head sw") == Directions.SOUTHWEST
+
+
+def test_resource_bundle_cache(tmp_path):
+
+    """
+    Tests the resource bundle is written to the cache, reloaded from it and shared read-only
+    """
+    cache_path = tmp_path / "bundle.pickle"
+    compiled = resource_bundle.build_bundle(cache_path)
+    assert cache_path.exists()
+
+    cached = resource_bundle.build_bundle(cache_path)
+    assert cached.resources["ships"]["player"] == compiled.resources["ships"]["player"]
+    assert cached.phrases == utils.PHRASES
+
+    with pytest.raises(TypeError):
+        cached.resources["ships"]["player"]["hit_points"] = 1
+
+
+def test_phrase_table():
+
+    """
+    Tests compiled phrases render like str.format and survive the bundle cache
+    """
+    for text, args in [
+        ("{} moved {} sectors", ("Scout", 3)),
+        ("100% sure about {0!r}", ("it",)),
+        ("{:>5}|{}", ("a", "b")),
+        ("no fields", ()),
+    ]:
+        template = PhraseTemplate(text)
+        assert template.render(args) == text.format(*args)
+        assert template.render_line(args) == text.format(*args) + "\n"
+
+    table = PhraseTable({"action_reply": {"action_success": ["{} did {}", "{1} by {0}"]}})
+    assert table.render(phrases.ACTION_SUCCESS, ("A", "B")) in ("A did B", "B by A")
+    with pytest.raises(KeyError):
+        table.render(phrases.ACTION_FAILURE)
+
+    compiled = utils.get_phrase_table()
+    assert phrases.GAME_OVER_VICTORY in compiled
+    loaded = pickle.loads(pickle.dumps(compiled))
+    assert set(loaded.keys()) == set(compiled.keys())
+    assert loaded.render(phrases.SELF_DESTRUCT_FAIL) == compiled.render(phrases.SELF_DESTRUCT_FAIL)
+
+
+def test_import_is_lazy():
+
+    """
+    Tests importing the game loads no resources and leaves logging alone
+    """
+    check = (
+        "import logging, objects, play_game, resource_bundle, utils; "
+        "assert resource_bundle._BUNDLE is None; "
+        "assert not logging.getLogger().handlers; "
+        "assert utils.PHRASES['special']['new_game_start']; "
+        "assert resource_bundle._BUNDLE is not None"
+    )
+    subprocess.run([sys.executable, "-c", check], cwd=utils.PARENT_DIRECTORY, check=True)
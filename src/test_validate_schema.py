@@ -0,0 +1,76 @@
+"""
+test_validate_schema.py
+Unit tests for validating resource files.
+"""
+# Python standard library
+import random
+
+# Third-party modules
+import pytest
+
+# Local modules
+import validate_schema
+from validate_schema import LOCATION_SCHEMA, SHIP_SCHEMA, compile_schema
+
+VALUES = [None, True, 0, 1, -1, 2, 0.5, 1.5, "text", [], ["a"], {}]
+
+
+def ship_pack(path, count: int, broken: set) -> None:
+    lines = ["# generated content pack\n"]
+    for i in range(count):
+        hit_points = 0 if i in broken else 10
+        lines.append(
+            f'[[ships]]\n[ships.ship_{i}]\nname = "ship_{i}"\nformal_name = "Ship {i}"\n'
+            f'hit_points = {hit_points}\nactions = ["movements"]\nscan_radius = 2\n\n'
+        )
+    path.write_text("".join(lines))
+
+
+def test_compiled_schemas_match_cerberus():
+
+    """
+    Tests compiled checkers report exactly what Cerberus reports, for random records
+    """
+    cerberus = pytest.importorskip("cerberus")
+    rng = random.Random(3)
+    for schema in (SHIP_SCHEMA, LOCATION_SCHEMA):
+        check = compile_schema(schema)
+        validator = cerberus.Validator(schema)
+        fields = list(schema) + ["unknown"]
+        for _ in range(2000):
+            record = {field: rng.choice(VALUES) for field in rng.sample(fields, 3)}
+            expected = {} if validator.validate(record) else validator.errors
+            assert check(record) == expected
+
+
+def test_validate_files_streams_and_caches(tmp_path):
+
+    """
+    Tests a content pack is validated in batches, in parallel or not, and only once until it changes
+    """
+    pack = tmp_path / "ships.toml"
+    ship_pack(pack, 500, {3, 250, 499})
+    cache = tmp_path / "validation.pickle"
+    files = {"ships": pack}
+
+    serial = validate_schema.validate_files(files, processes=1, cache_path=None, batch_size=64)
+    assert serial["records"] == 500 and serial["cached"] == 0
+    assert sorted(serial["errors"]["ships"]) == ["ship_250", "ship_3", "ship_499"]
+    assert serial["errors"]["ships"]["ship_3"] == {"hit_points": ["min value is 1"]}
+
+    validate_schema.PARALLEL_MIN_BYTES, saved = 0, validate_schema.PARALLEL_MIN_BYTES
+    try:
+        parallel = validate_schema.validate_files(
+            files, processes=2, cache_path=cache, batch_size=64
+        )
+    finally:
+        validate_schema.PARALLEL_MIN_BYTES = saved
+    assert parallel == serial
+    assert validate_schema.validate_files(files, cache_path=cache)["cached"] == 1
+
+    ship_pack(pack, 10, set())
+    assert validate_schema.validate_files(files, cache_path=cache) == {
+        "errors": {},
+        "records": 10,
+        "cached": 0,
+    }
@@ -2,33 +2,142 @@
 utils.py
 Module containing links to game resources and utility methods for the game.
 
+Resources are loaded the first time they are needed, not when this module is imported.
+Call init() to load them up front (and optionally set up logging), or use_bundle() to run
+code against a different set of resources.
+Module attributes PHRASES, CONFIG and RESOURCE_PATHS are kept for convenience and resolve lazily.
 """
 # Python standard library
+from collections.abc import Mapping
+from contextlib import contextmanager
 import logging
 from pathlib import Path
 import random
-from typing import Iterable, Type, Union
-
-#third-party Python
-import toml
+from typing import Any, Iterable, Iterator, Optional, Type, Union
 
 # Local modules
-from enums import Actions, DirectionKeys, Directions, PhraseType
+from enums import Actions, DirectionKeys, Directions, JournalEvent, PhraseType
+from journal import JOURNAL
+from keyword_matcher import KeywordMatcher
+from phrases import PhraseTable
+import resource_bundle
 
-PARENT_DIRECTORY = Path(__file__).parent.resolve()
+PARENT_DIRECTORY = Path(__file__).parent
 RESOURCE_PATH_FILE = Path(PARENT_DIRECTORY, "resource_paths.toml")
-RESOURCE_PATHS = toml.load(RESOURCE_PATH_FILE)
-PHRASE_PATH = Path(PARENT_DIRECTORY, RESOURCE_PATHS["phrases"]["phrases_english"])
-PHRASES = toml.load(PHRASE_PATH)["phrases"][0]
-
-CONFIGPATH = Path(PARENT_DIRECTORY, RESOURCE_PATHS["configs"]["config"])
-CONFIG = toml.load(CONFIGPATH)["config"]
-
 
 LOG_LEVEL = logging.WARNING
-logging.basicConfig(level=LOG_LEVEL, format="%(name)s - %(message)s")
+LOG_FORMAT = "%(name)s - %(message)s"
 LOGGER = logging.getLogger("Utils")
 
+# Direction keywords live in enums.py, so this table costs no file I/O to build.
+DIRECTION_MATCHER = KeywordMatcher((Directions[dk.name], dk.value) for dk in DirectionKeys)
+
+_ACTIVE_BUNDLE: Optional[resource_bundle.ResourceBundle] = None
+_ACTION_MATCHER: Optional[KeywordMatcher] = None
+
+
+def configure_logging(log_level: int = LOG_LEVEL) -> None:
+    """
+    Set up the game's log format. Entry points call this; importing the game's modules never does.
+    """
+    logging.basicConfig(level=log_level, format=LOG_FORMAT)
+
+
+def init(log_level: Optional[int] = None) -> resource_bundle.ResourceBundle:
+    """
+    Load the game's resources now instead of on first use, and configure logging if a level is given.
+    """
+    if log_level is not None:
+        configure_logging(log_level)
+    return get_bundle()
+
+
+def get_bundle() -> resource_bundle.ResourceBundle:
+    """
+    The resource bundle in use, loaded on first call.
+    """
+    if _ACTIVE_BUNDLE is not None:
+        return _ACTIVE_BUNDLE
+    return resource_bundle.get_bundle()
+
+
+@contextmanager
+def use_bundle(bundle: resource_bundle.ResourceBundle) -> Iterator[resource_bundle.ResourceBundle]:
+    """
+    Temporarily make `bundle` the game's resources, e.g. for tools or tests with their own content.
+    """
+    global _ACTIVE_BUNDLE, _ACTION_MATCHER
+    previous_bundle, previous_matcher = _ACTIVE_BUNDLE, _ACTION_MATCHER
+    _ACTIVE_BUNDLE, _ACTION_MATCHER = bundle, None
+    try:
+        yield bundle
+    finally:
+        _ACTIVE_BUNDLE, _ACTION_MATCHER = previous_bundle, previous_matcher
+
+
+def get_phrases() -> dict:
+    return get_bundle().phrases
+
+
+def get_phrase_table() -> PhraseTable:
+    return get_bundle().phrase_table
+
+
+def get_config() -> dict:
+    return get_bundle().config
+
+
+def get_resource_paths() -> dict:
+    return get_bundle().resource_paths
+
+
+def get_action_matcher() -> KeywordMatcher:
+    """
+    Action keyword table, compiled once from the phrases in precedence order of Actions.
+    """
+    global _ACTION_MATCHER
+    if _ACTION_MATCHER is None:
+        keywords = get_phrases()["action_keywords"]
+        _ACTION_MATCHER = KeywordMatcher((ac, keywords[ac.value]) for ac in Actions)
+    return _ACTION_MATCHER
+
+
+class _LazyPhrases(Mapping):
+    """
+    Read-only view of the phrases that loads them on first lookup.
+    Lets modules keep a PHRASES reference at import time without loading anything.
+    """
+
+    def __getitem__(self, key: str) -> Any:
+        return get_phrases()[key]
+
+    def __iter__(self):
+        return iter(get_phrases())
+
+    def __len__(self) -> int:
+        return len(get_phrases())
+
+    def __repr__(self) -> str:
+        return f"<lazy phrases from {RESOURCE_PATH_FILE.name}>"
+
+
+PHRASES = _LazyPhrases()
+
+_LAZY_ATTRIBUTES = {
+    "CONFIG": get_config,
+    "RESOURCE_PATHS": get_resource_paths,
+    "RESOURCE_BUNDLE": get_bundle,
+    "ACTION_MATCHER": get_action_matcher,
+    "PHRASE_PATH": lambda: Path(PARENT_DIRECTORY, get_resource_paths()["phrases"]["phrases_english"]),
+    "CONFIGPATH": lambda: Path(PARENT_DIRECTORY, get_resource_paths()["configs"]["config"]),
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def check_for_affirmative(input_string: str) -> bool:
 
@@ -88,9 +197,9 @@ def check_for_negative(input_string: str) -> bool:
 
 
 
-def print_output(output: Union[str, list]) -> None:
+def format_output(output: Union[str, list]) -> str:
     """
-    Prints output from a list or string.  Adds newline characters when missing
+    Picks one message from a list or returns the string.  Adds newline characters when missing
     """
     if type(output) == list:
         i = random.randint(0, len(output) - 1)
@@ -99,13 +208,19 @@ def print_output(output: Union[str, list]) -> None:
     if not output.endswith("\n"):  # type: ignore
         output += "\n"
 
-    print(output)
+    return output  # type: ignore
 
 
-def user_input_prompt(prompts: Union[str, list], input_line_prompt: str = "-> ") -> str:
+def print_output(output: Union[str, list]) -> None:
+    """
+    Prints output from a list or string.  Adds newline characters when missing
+    """
+    print(format_output(output))
+
 
+def format_prompt(prompts: Union[str, list], input_line_prompt: str = "-> ") -> str:
     """
-    convenience function for displaying user input prompt
+    Builds the text shown when asking the user for input
     """
     if type(prompts) == list:
         i = random.randint(0, len(prompts) - 1)
@@ -120,7 +235,15 @@ def user_input_prompt(prompts: Union[str, list], input_line_prompt: str = "-> ")
     if not input_string.endswith(" "):
         input_string += " " # type: ignore
 
-    return input(input_string)
+    return input_string  # type: ignore
+
+
+def user_input_prompt(prompts: Union[str, list], input_line_prompt: str = "-> ") -> str:
+
+    """
+    convenience function for displaying user input prompt
+    """
+    return input(format_prompt(prompts, input_line_prompt))
 
 
 def check_for_keywords(input_string: str, action_keywords: Iterable[str] = []) -> bool:
@@ -129,23 +252,21 @@ def check_for_keywords(input_string: str, action_keywords: Iterable[str] = []) -
     Parse string and check to see if it contains a word from a list
     """
 
-    LOGGER.info(
-        f"checking {input_string} for action_keywords {' '.join(action_keywords)}"
-    )
     found = False
     # check for exact match
     exact = [x for x in action_keywords if x == input_string.lower()]
 
     if exact:
-        LOGGER.info(f"Exact keyword match found for user input {input_string}")
+        JOURNAL.record(JournalEvent.KEYWORD_EXACT_MATCH, None, None, input_string)
         found = True
     else:
         sentence = input_string.split(" ")
         for word in sentence:
             for kw in action_keywords:
                 if word.lower() == kw:
-                    LOGGER.info(f"keyword match. {kw}")
+                    JOURNAL.record(JournalEvent.KEYWORD_MATCH, kw, None, input_string)
                     return True
+        JOURNAL.record(JournalEvent.KEYWORD_MISS, None, None, input_string)
     return found
 
 
@@ -153,12 +274,28 @@ def check_for_action(input_string: str) -> Union[Actions, None]:
     """
     Check an input string for action keywords
     """
-    for ac in Actions:
-        keywords = PHRASES["action_keywords"][ac.value]
-        if check_for_keywords(input_string, keywords):
-            return ac
+    return get_action_matcher().match(input_string)
+
+def parse_direction(input_string: str) -> Optional[Directions]:
+    """
+    Check an input string for a direction keyword
+    """
+    return DIRECTION_MATCHER.match(input_string)
+
+
+def parse_distance(input_string: str, max_distance: int) -> Optional[int]:
+    """
+    Parse a movement distance, returning None if it is not a whole number between 0 and max_distance
+    """
+    try:
+        distance = int(input_string)
+    except ValueError:
+        return None
+    if 0 <= distance <= max_distance:
+        return distance
     return None
 
+
 def ask_user_how_to_move(user: Type['Ship']) -> tuple:
     """
     If the user selects the movement action, prompt for direction and distance inputs.
@@ -172,43 +309,38 @@ def ask_user_how_to_move(user: Type['Ship']) -> tuple:
             ).format(user.formal_name, user.coordinates)
         )
 
-        for dk in DirectionKeys:
-            if check_for_keywords(response, dk.value):
-                print_output(
-                    random.choice(
-                        PHRASES[PhraseType.COMMAND_REPLY.value]["direction_parse_success"]
-                    ).format(dk.name)
-                )
-                direction = Directions[dk.name]
-                break
-        if not direction:
+        direction = parse_direction(response)
+        if direction:
+            print_output(
+                random.choice(
+                    PHRASES[PhraseType.COMMAND_REPLY.value]["direction_parse_success"]
+                ).format(direction.name)
+            )
+        else:
             print_output(
                 random.choice(
                     PHRASES[PhraseType.COMMAND_REPLY.value]["direction_parse_fail"]
                 ).format(response)
             )
 
-    distance = None
-    while not distance:
+    while True:
         response = user_input_prompt(
             random.choice(
                 PHRASES[PhraseType.USER_PROMPT.value]["movement_speed_query"]
             ).format(user.movement_speed)
         )
 
-        try:
-            input_distance = int(response)
-            if 0 <= input_distance <= user.movement_speed:
-                print_output(
-                    random.choice(
-                        PHRASES[PhraseType.COMMAND_REPLY.value]["speed_parse_success"]
-                    ).format(input_distance)
-                )
-                distance = input_distance
-                return (direction, distance)
-        except ValueError as e:
+        distance = parse_distance(response, user.movement_speed)
+        if distance is not None:
             print_output(
                 random.choice(
-                    PHRASES[PhraseType.COMMAND_REPLY.value]["speed_parse_fail"]
-                ).format(response)
+                    PHRASES[PhraseType.COMMAND_REPLY.value]["speed_parse_success"]
+                ).format(distance)
             )
+            return (direction, distance)
+
+        print_output(
+            random.choice(
+                PHRASES[PhraseType.COMMAND_REPLY.value]["speed_parse_fail"]
+            ).format(response)
+        )
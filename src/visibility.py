@@ -0,0 +1,194 @@
+"""
+visibility.py
+Incremental sensor contacts for every ship on a board.
+
+A ship that scans keeps the set of objects within its scan_radius (itself included, at
+distance 0), from its first scan on or from track().  The board reports every object that is
+added or moves, and only the sets of the ships near the old and new squares change, so a scan
+is a read of the ship's set instead of a search of the board.  Ships that never scan are not
+tracked and cost nothing.  Every change is also a sensor event: the contact is recorded in the
+journal and passed to the tracker's watchers as (ship, object, entered).
+
+A ship's set is rebuilt the next time it is read if its scan_radius has changed.
+"""
+# Python standard library
+from typing import Callable, Dict, List, Set
+
+# Local modules
+from enums import JournalEvent
+from spatial import SpatialGrid
+
+
+def _distance(a: tuple, b: tuple) -> int:
+    return max(abs(a[0] - b[0]), abs(a[1] - b[1]))
+
+
+class VisibilityTracker(object):
+    """
+    What every scanning ship on one board can see, kept up to date as objects move.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        # id(ship) -> {id(object): object} of everything the ship can see, in order of contact
+        self._visible: Dict[int, dict] = {}
+        # id(ship) -> the scan radius its set was built for
+        self._radius: Dict[int, int] = {}
+        # id(object) -> ids of the ships that can see it
+        self._seen_by: Dict[int, Set[int]] = {}
+        # where the scanning ships are, to find the ones near a square
+        self._observers: Dict[int, object] = {}
+        self._observer_squares: Dict[tuple, List] = {}
+        self._observer_index = SpatialGrid()
+        self.max_radius = 0
+        # called with (ship, object, entered) for every contact gained or lost
+        self.watchers: List[Callable[[object, object, bool], None]] = []
+
+    def __contains__(self, ship) -> bool:
+        return id(ship) in self._observers
+
+    def track(self, ship) -> None:
+        """
+        Start keeping `ship`'s contacts up to date, if it is not tracked already.
+        """
+        if id(ship) not in self._observers:
+            self._add_observer(ship)
+
+    def visible(self, ship) -> List:
+        """
+        Everything `ship` can see, itself included, in the order they came into range.
+        """
+        key = id(ship)
+        if key not in self._observers:
+            self._add_observer(ship)
+        elif self._radius[key] != ship.scan_radius:
+            self._rebuild(ship)
+        return list(self._visible[key].values())
+
+    def can_see(self, ship, object_) -> bool:
+        contacts = self._visible.get(id(ship))
+        return contacts is not None and id(object_) in contacts
+
+    def seen_by(self, object_) -> List:
+        """
+        The ships that can see `object_`.
+        """
+        return [self._observers[key] for key in self._seen_by.get(id(object_), ())]
+
+    def _notify(self, ship, object_, entered: bool) -> None:
+        board = self.board
+        event = JournalEvent.SENSOR_CONTACT if entered else JournalEvent.SENSOR_LOST
+        board.journal.record(event, id(ship), object_.coordinates, object_.name, board.turn)
+        for watcher in self.watchers:
+            watcher(ship, object_, entered)
+
+    def _enter(self, ship, object_) -> None:
+        self._visible[id(ship)][id(object_)] = object_
+        self._seen_by.setdefault(id(object_), set()).add(id(ship))
+        if object_ is not ship:
+            self._notify(ship, object_, True)
+
+    def _leave(self, ship, object_) -> None:
+        del self._visible[id(ship)][id(object_)]
+        seers = self._seen_by[id(object_)]
+        seers.discard(id(ship))
+        if not seers:
+            del self._seen_by[id(object_)]
+        if object_ is not ship:
+            self._notify(ship, object_, False)
+
+    def _index_observer(self, ship, square: tuple) -> None:
+        ships = self._observer_squares.get(square)
+        if ships is None:
+            self._observer_squares[square] = [ship]
+            self._observer_index.insert(square)
+        else:
+            ships.append(ship)
+
+    def _unindex_observer(self, ship, square: tuple) -> None:
+        ships = self._observer_squares[square]
+        ships.remove(ship)
+        if not ships:
+            del self._observer_squares[square]
+            self._observer_index.remove(square)
+
+    def _add_observer(self, ship) -> None:
+        key = id(ship)
+        self._observers[key] = ship
+        self._visible[key] = {}
+        self._radius[key] = ship.scan_radius
+        self.max_radius = max(self.max_radius, ship.scan_radius)
+        self._index_observer(ship, ship.coordinates)
+        self._rebuild(ship)
+
+    def _rebuild(self, ship) -> None:
+        """
+        Recompute one ship's contacts from the board, reporting only the differences.
+        """
+        key = id(ship)
+        radius = self._radius[key] = ship.scan_radius
+        self.max_radius = max(self.max_radius, radius)
+        board = self.board
+        in_range = {}
+        for square in board.spatial_index.query_radius(ship.coordinates, radius):
+            for object_ in board.occupied_squares[square]:
+                in_range[id(object_)] = object_
+
+        contacts = self._visible[key]
+        for object_key in [object_key for object_key in contacts if object_key not in in_range]:
+            self._leave(ship, contacts[object_key])
+        for object_key, object_ in in_range.items():
+            if object_key not in contacts:
+                self._enter(ship, object_)
+
+    def _arrive(self, object_, square: tuple) -> None:
+        """
+        Give `object_`, now on `square`, to every scanning ship in range that cannot see it yet.
+        """
+        for observer_square in self._observer_index.query_radius(square, self.max_radius):
+            distance = _distance(observer_square, square)
+            for ship in self._observer_squares[observer_square]:
+                if (
+                    distance <= self._radius[id(ship)]
+                    and id(object_) not in self._visible[id(ship)]
+                ):
+                    self._enter(ship, object_)
+
+    def object_added(self, object_) -> None:
+        """
+        Called by the board once `object_` is on its square.
+        """
+        if self._observers:
+            self._arrive(object_, object_.coordinates)
+
+    def object_moved(self, object_, old_square: tuple) -> None:
+        """
+        Called by the board once `object_` has moved from `old_square` to its new square.
+        """
+        if not self._observers:
+            return
+        square = object_.coordinates
+        key = id(object_)
+        for ship_key in list(self._seen_by.get(key, ())):
+            ship = self._observers[ship_key]
+            if ship is not object_ and _distance(ship.coordinates, square) > self._radius[ship_key]:
+                self._leave(ship, object_)
+
+        if key in self._observers:
+            self._unindex_observer(object_, old_square)
+            self._index_observer(object_, square)
+            self._rebuild(object_)
+        self._arrive(object_, square)
+
+    def object_removed(self, object_) -> None:
+        """
+        Called by the board when `object_` leaves it: every ship loses sight of it.
+        """
+        key = id(object_)
+        for ship_key in list(self._seen_by.get(key, ())):
+            self._leave(self._observers[ship_key], object_)
+        if key in self._observers:
+            for contact in list(self._visible[key].values()):
+                self._leave(object_, contact)
+            self._unindex_observer(object_, object_.coordinates)
+            del self._observers[key], self._visible[key], self._radius[key]